@@ -1,17 +1,346 @@
-import openai
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
 import config
+from modules.db_pool import ConnectionPool
+from modules.lazy import lazy_import
 
-class AIContentGenerator:
-    def __init__(self):
-        openai.api_key = config.OPENAI_KEY
+# נטען בבקשת התוכן הראשונה, לא ב-import של השרת
+httpx = lazy_import("httpx")
+
+logger = logging.getLogger("EmpireOS.ContentGen")
+
+# תבניות תוכן - המפתח הוא חלק ממפתח המטמון
+TEMPLATES = {
+    "tiktok": "Create a viral TikTok script for {title} priced at ${price}",
+    "ad_he": "כתוב מודעת פייסבוק קצרה בעברית עבור {title} במחיר ${price}",
+}
+
+SYSTEM_PROMPT = (
+    "You write marketing copy for e-commerce products. You receive a JSON array of tasks, each with an "
+    "'id' and a 'prompt'. Answer with a JSON object {\"items\": [{\"id\": <id>, \"content\": <text>}]} "
+    "containing exactly one item per task, in any order, and nothing else."
+)
+
+
+class ContentGenerationError(Exception):
+    """הקריאה ל-completion נכשלה או שהתשובה לא הכילה את המוצר"""
+
+
+class ContentBudgetExceeded(ContentGenerationError):
+    """תקרת הטוקנים הכוללת נוצלה - לא נשלחות בקשות נוספות"""
+
+
+@dataclass
+class _Task:
+    key: str
+    prompt: str
+    future: "asyncio.Future[str]"
 
-    def generate_assets(self, data):
-        prompt = f"Create a viral TikTok script for {data['title']} priced at ${data['suggested_price']}"
-        res = openai.ChatCompletion.create(model="gpt-3.5-turbo", messages=[{"role": "user", "content": prompt}])
-        return res.choices[0].message.content
+
+# =================================================================
+# TOKEN / REQUEST BUDGET (חלון נע של דקה + תקרה כוללת)
+# =================================================================
+class ContentBudget:
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_total_tokens: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_total_tokens = max_total_tokens
+        self.total_tokens = 0
+        # טוקנים ששוריינו לבקשות שעוד לא חזרו - נספרים מול התקרה הכוללת עד שה-usage מגיע
+        self.reserved_tokens = 0
+        self._window: Deque[Tuple[float, int]] = deque()
+        self._lock = asyncio.Lock()
+
+    def _trim(self, now: float):
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+
+    async def acquire(self, tokens: int) -> int:
+        """מחכה עד שיש מקום בחלון לבקשה אחת + tokens (הערכה) ומשריין אותם מול התקרה הכוללת.
+        מחזיר את השריון - לשחרר ב-release כשהבקשה הסתיימה. זורק אם התקרה הכוללת נוצלה"""
+        window_tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                # הבדיקה והשריון תחת אותה נעילה: batches מקבילים לא עוברים יחד את אותה בדיקה
+                committed = self.total_tokens + self.reserved_tokens
+                if self.max_total_tokens is not None and committed + tokens > self.max_total_tokens:
+                    raise ContentBudgetExceeded(f"token budget exhausted ({committed}/{self.max_total_tokens})")
+                now = time.monotonic()
+                self._trim(now)
+                used = sum(t for _, t in self._window)
+                if len(self._window) < self.requests_per_minute and used + window_tokens <= self.tokens_per_minute:
+                    self._window.append((now, window_tokens))
+                    self.reserved_tokens += tokens
+                    return tokens
+                await asyncio.sleep(max(0.05, 60 - (now - self._window[0][0])))
+
+    def record(self, tokens: int):
+        self.total_tokens += tokens
+
+    def release(self, reserved: int):
+        """סוף הבקשה (הצלחה או כשל): השריון יוצא, ומה שנוצל בפועל כבר נספר ב-record"""
+        self.reserved_tokens -= reserved
+
+
+# =================================================================
+# ASYNC BATCHED CONTENT SERVICE
+# =================================================================
 class AIContentGenerator:
-    # ... (הקוד הקיים) ...
-    
-    def generate_image_prompt(self, product_title):
+    """שירות תוכן אסינכרוני: מוצרים שמגיעים יחד נשלחים ב-completion אחד (JSON מובנה),
+    תוצאות נשמרות לפי (title, price, template), ויש תקציב טוקנים/בקשות ומדדי latency ועלות"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS content_cache (
+            key TEXT PRIMARY KEY,
+            template TEXT NOT NULL,
+            title TEXT NOT NULL,
+            price REAL,
+            content TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, model: Optional[str] = None,
+                 cache_path: Optional[str] = None, cache_ttl: float = 7 * 24 * 3600,
+                 batch_size: int = 8, batch_window: float = 0.2, max_output_tokens: int = 250,
+                 requests_per_minute: int = 60, tokens_per_minute: int = 60000,
+                 max_total_tokens: Optional[int] = None, retries: int = 2, timeout: float = 60.0,
+                 price_per_1k_input: float = 0.0005, price_per_1k_output: float = 0.0015):
+        # base_url: כל endpoint תואם OpenAI (כולל mock מקומי - ראו benchmarks/bench_content_gen.py)
+        # batch_window: כמה זמן מוצר ראשון מחכה שמוצרים נוספים יצטרפו ל-completion שלו
+        self.api_key = api_key or config.OPENAI_KEY
+        self.base_url = (base_url or config.OPENAI_BASE_URL).rstrip("/")
+        self.model = model or config.OPENAI_MODEL
+        self.pool = ConnectionPool(cache_path or config.CONTENT_CACHE_PATH)
+        self.cache_ttl = cache_ttl
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_output_tokens = max_output_tokens
+        self.retries = retries
+        self.timeout = timeout
+        self.price_per_1k_input = price_per_1k_input
+        self.price_per_1k_output = price_per_1k_output
+        self.budget = ContentBudget(requests_per_minute, tokens_per_minute, max_total_tokens)
+        self.requests = 0
+        self.items = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._latencies: Deque[float] = deque(maxlen=500)
+        self._ready = False
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, List[_Task]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._in_flight: Dict[str, "asyncio.Future[str]"] = {}
+        self._batches: set = set()
+
+    # --- helpers ---
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    @staticmethod
+    def cache_key(title: str, price: Any, template: str) -> str:
+        raw = json.dumps([" ".join(str(title).split()), round(float(price or 0), 2), template])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def render(template: str, title: str, price: Any) -> str:
+        if template not in TEMPLATES:
+            raise ValueError(f"Unknown content template '{template}' (available: {', '.join(TEMPLATES)})")
+        return TEMPLATES[template].format(title=title, price=price)
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # ~4 תווים לטוקן - מספיק לתקציב, הספירה המדויקת מגיעה מ-usage בתשובה
+        return len(text) // 4 + 1
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout,
+                                             headers={"Authorization": f"Bearer {self.api_key or ''}"})
+            self._loop = loop
+        return self._client
+
+    # --- cache ---
+    def _cache_conn(self, conn):
+        if not self._ready:
+            conn.execute(self.SCHEMA)
+            conn.commit()
+            self._ready = True
+        return conn
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        def _get(conn):
+            row = self._cache_conn(conn).execute(
+                "SELECT content, created_at FROM content_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or time.time() - row["created_at"] > self.cache_ttl:
+                return None
+            return row["content"]
+        return await self.pool.run(_get)
+
+    async def _cache_put(self, rows: List[Tuple[str, str, str, Any, str]]):
+        def _put(conn):
+            self._cache_conn(conn).executemany(
+                "INSERT OR REPLACE INTO content_cache (key, template, title, price, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", [(*row, time.time()) for row in rows])
+        await self.pool.run_transaction(_put)
+
+    # --- public API ---
+    async def generate_assets(self, data: Dict[str, Any], template: str = "tiktok") -> str:
+        """תוכן שיווקי למוצר (dict עם title ו-suggested_price). מטמון -> הצטרפות לבקשה זהה -> batch"""
+        title, price = data["title"], data.get("suggested_price")
+        prompt = self.render(template, title, price)
+        key = self.cache_key(title, price, template)
+
+        cached = await self._cache_get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+        if key in self._in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._in_flight[key] = future
+        batch = self._pending.setdefault(template, [])
+        batch.append(_Task(key, prompt, future))
+        if len(batch) >= self.batch_size:
+            self._flush(template)
+        elif len(batch) == 1:
+            self._timers[template] = loop.call_later(self.batch_window, self._flush, template)
+        try:
+            content = await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._in_flight.pop(key, None)
+        await self._cache_put([(key, template, title, price, content)])
+        return content
+
+    async def ad_copy(self, title: str, price: Any, fallback: str, template: str = "ad_he") -> str:
+        """מודעה למוצר מסריקה. בלי מפתח, או כשהקריאה נכשלה/התקציב נוצל - fallback (הסריקה לא נכשלת בגלל התוכן)"""
+        if not self.enabled:
+            return fallback
+        try:
+            return await self.generate_assets({"title": title, "suggested_price": price}, template)
+        except ContentGenerationError as e:
+            logger.warning(f"Ad copy for '{title}' fell back to the template: {e}")
+            return fallback
+
+    async def generate_many(self, products: List[Dict[str, Any]], template: str = "tiktok") -> List[Any]:
+        """כמה מוצרים במקביל - מתאחדים ל-batches. כשל של מוצר מוחזר כ-exception במקומו"""
+        return await asyncio.gather(*(self.generate_assets(p, template) for p in products), return_exceptions=True)
+
+    def generate_image_prompt(self, product_title: str) -> str:
         """שדרוג 2: יצירת פקודה לתמונת פרסום מקצועית"""
-        return f"High-end commercial photography of {product_title}, cinematic lighting, studio background, 8k resolution, professional product shot."
+        return (f"High-end commercial photography of {product_title}, cinematic lighting, studio background, "
+                f"8k resolution, professional product shot.")
+
+    # --- batching ---
+    def _flush(self, template: str):
+        timer = self._timers.pop(template, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(template, [])
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: List[_Task]):
+        tasks = [{"id": i, "prompt": task.prompt} for i, task in enumerate(batch)]
+        messages = [{"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": json.dumps(tasks, ensure_ascii=False)}]
+        max_tokens = self.max_output_tokens * len(batch)
+        try:
+            reserved = await self.budget.acquire(
+                self.estimate_tokens(json.dumps(messages, ensure_ascii=False)) + max_tokens)
+            try:
+                body = await self._complete(messages, max_tokens)
+            finally:
+                self.budget.release(reserved)
+            items = {int(item["id"]): item["content"]
+                     for item in json.loads(body["choices"][0]["message"]["content"]).get("items", [])
+                     if isinstance(item, dict) and "id" in item and item.get("content")}
+        except Exception as e:
+            self.failures += len(batch)
+            error = e if isinstance(e, ContentGenerationError) else ContentGenerationError(f"{type(e).__name__}: {e}")
+            logger.error(f"Content batch of {len(batch)} failed: {error}")
+            for task in batch:
+                if not task.future.done():
+                    task.future.set_exception(error)
+            return
+        self.items += len(items)
+        for i, task in enumerate(batch):
+            if task.future.done():
+                continue
+            if i in items:
+                task.future.set_result(items[i])
+            else:
+                self.failures += 1
+                task.future.set_exception(ContentGenerationError(f"No content returned for task {i}"))
+
+    async def _complete(self, messages: List[Dict[str, str]], max_tokens: int) -> Dict[str, Any]:
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens,
+                   "response_format": {"type": "json_object"}}
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            self.requests += 1
+            response = await self.client.post("/chat/completions", json=payload)
+            self._latencies.append(time.perf_counter() - started)
+            if response.status_code == 200:
+                body = response.json()
+                usage = body.get("usage", {})
+                self.prompt_tokens += usage.get("prompt_tokens", 0)
+                self.completion_tokens += usage.get("completion_tokens", 0)
+                self.budget.record(usage.get("total_tokens", 0))
+                return body
+            if response.status_code not in (429, 500, 502, 503) or attempt == self.retries:
+                raise ContentGenerationError(f"HTTP {response.status_code}: {response.text[:200]}")
+            retry_after = response.headers.get("retry-after", "")
+            await asyncio.sleep(float(retry_after) if retry_after.isdigit() else 0.5 * 2 ** attempt)
+
+    # --- metrics ---
+    def metrics(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        cost = (self.prompt_tokens / 1000 * self.price_per_1k_input
+                + self.completion_tokens / 1000 * self.price_per_1k_output)
+        return {
+            "requests": self.requests, "items": self.items, "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced, "failures": self.failures,
+            "items_per_request": round(self.items / self.requests, 2) if self.requests else 0.0,
+            "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+            "cost_usd": round(cost, 6), "latency_p50_ms": percentile(0.5), "latency_p95_ms": percentile(0.95),
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+        self.pool.close_all()
+        self._ready = False
+
+
+# מופע משותף למסלולי הסריקה (מודעות ב-ads_manager ובסריקה האוטונומית) - batch, מטמון ותקציב אחד לתהליך
+content_generator = AIContentGenerator(max_total_tokens=config.CONTENT_TOKEN_BUDGET)
@@ -0,0 +1,103 @@
+"""
+Benchmark: import של קטלוג ספק (אלפי URL-ים) דרך BulkImport מול השרת המקומי של bench_scraper.
+מודד URL-ים לשנייה עם scrape + parse + כתיבה ב-batches ל-SQLite, ומדפיס את אירועי ה-NDJSON.
+
+    python -m benchmarks.bench_bulk_import --urls 5000 --latency 0.05
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.db_pool import ConnectionPool
+from modules.scraper import AsyncScraper
+from modules.extractors import extractor
+from modules.bulk_import import BulkImport, parse_url_list
+from benchmarks.bench_scraper import start_server
+
+SCHEMA = '''CREATE TABLE products (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, cost REAL, url TEXT)'''
+
+
+async def run(urls, concurrency, per_host, batch_size, db_path, fail_batches=()):
+    pool = ConnectionPool(db_path)
+    pool.get_connection().execute(SCHEMA)
+    scraper = AsyncScraper(per_host=per_host, backoff=0.01)
+
+    async def analyze(url):
+        res = await scraper.fetch(url)
+        fields = extractor.extract(res.content, res.encoding)
+        return {"title": fields.title, "url": url,
+                "cost": float(fields.price_text.replace('$', '')) if fields.price_text else None}
+
+    batches = []
+
+    async def persist(rows):
+        batches.append(len(rows))
+        if len(batches) in fail_batches:
+            raise RuntimeError("database is locked")
+        await pool.run_transaction(lambda conn: conn.executemany(
+            "INSERT INTO products (title, cost, url) VALUES (?, ?, ?)",
+            [(r["title"], r["cost"], r["url"]) for r in rows]))
+
+    importer = BulkImport(analyze, persist, concurrency=concurrency, batch_size=batch_size)
+    summary = None
+    errors = []
+    async for line in importer.ndjson(urls):
+        event = json.loads(line)
+        if event["event"] == "done":
+            summary = event
+        else:
+            if event["event"] == "error":
+                errors.append(event)
+            print(line.rstrip())
+    stored = await pool.fetch_one("SELECT COUNT(*) AS n FROM products")
+    await scraper.aclose()
+    pool.close_all()
+    return summary, stored["n"], errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--per-host", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    server = start_server(args.latency)
+    port = server.server_address[1]
+    body = ("url\n" + "\n".join(f"http://127.0.0.1:{port}/item/{i}" for i in range(args.urls))).encode()
+    body += f"\nhttp://127.0.0.1:{port}/missing\n".encode()
+    urls = parse_url_list(body, "text/csv")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        summary, stored, _ = asyncio.run(run(urls, args.concurrency, args.per_host, args.batch_size,
+                                             os.path.join(tmp, "bulk.db")))
+        # persist שנכשל (DB נעול) באמצע: הזרם לא נקטע - error + done עם השורות שאבדו ב-failures
+        check_urls = urls[:5 * args.batch_size]
+        locked, locked_stored, errors = asyncio.run(run(check_urls, args.concurrency, args.per_host,
+                                                        args.batch_size, os.path.join(tmp, "locked.db"),
+                                                        fail_batches=(2,)))
+    server.shutdown()
+
+    failures = summary.pop("failures")
+    print(json.dumps(summary))
+    print(f"{len(urls)} urls -> {stored} rows stored, {len(failures)} failed, "
+          f"{summary['rate']} urls/s ({len(urls) / summary['rate'] / 60:.1f} min for the catalogue)")
+    assert stored == summary["saved"] == len(urls) - 1
+    assert failures[0]["url"].endswith("/missing")
+
+    lost = [f for f in locked["failures"] if f["error"].startswith("persist failed")]
+    ok = (len(errors) == 1 and errors[0]["lost"] == args.batch_size == len(lost)
+          and locked["done"] == len(check_urls) and locked_stored == locked["saved"] == len(check_urls) - len(lost))
+    print(f"[{'OK' if ok else 'FAIL'}] persist failure: stream finished with done, {locked['saved']} saved, "
+          f"{len(lost)} lost rows reported in failures")
+    assert ok
+
+
+if __name__ == "__main__":
+    main()
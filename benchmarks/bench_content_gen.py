@@ -0,0 +1,152 @@
+"""
+Benchmark: יצירת תוכן שיווקי דרך AIContentGenerator (ai/content_gen.py) מול endpoint מקומי תואם OpenAI.
+ה-mock עונה ל-/chat/completions עם JSON מובנה ו-usage, עם latency קבוע לבקשה - בלי מפתח ובלי עלות.
+לפני: completion אחד לכל מוצר, אחד אחרי השני. אחרי: batches במקביל, ואז מעבר שני שכולו מהמטמון.
+
+    python -m benchmarks.bench_content_gen --products 200 --latency 0.4
+    OPENAI_BASE_URL=http://127.0.0.1:8080/v1 python -m benchmarks.bench_content_gen --external
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai.content_gen import AIContentGenerator, ContentBudgetExceeded
+
+
+class MockCompletions(BaseHTTPRequestHandler):
+    latency = 0.4
+    lock = threading.Lock()
+    requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.latency)
+        with self.lock:
+            MockCompletions.requests += 1
+        tasks = json.loads(body["messages"][-1]["content"])
+        items = [{"id": t["id"], "content": f"[script] {t['prompt']}"} for t in tasks]
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+        completion_tokens = sum(len(i["content"]) for i in items) // 4
+        payload = json.dumps({
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": json.dumps({"items": items})}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MockServer(ThreadingHTTPServer):
+    request_queue_size = 128  # כל ה-batches נפתחים יחד - backlog ברירת המחדל (5) מוסיף שנייה של SYN retry
+
+
+def start_mock(latency):
+    MockCompletions.latency = latency
+    server = MockServer(("127.0.0.1", 0), MockCompletions)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def catalog(count):
+    return [{"title": f"Stand-in Gadget #{i}", "suggested_price": round(19.9 + i, 2)} for i in range(count)]
+
+
+async def before(generator, products):
+    # כמו הקוד הישן: בקשה לכל מוצר, סדרתית (batch_size=1 ובלי מטמון חם)
+    start = time.perf_counter()
+    for product in products:
+        await generator.generate_assets(product)
+    return time.perf_counter() - start
+
+
+async def after(generator, products):
+    start = time.perf_counter()
+    results = await generator.generate_many(products)
+    elapsed = time.perf_counter() - start
+    assert all(isinstance(r, str) and r.startswith("[script]") for r in results), results[:3]
+    return elapsed
+
+
+async def run(args, base_url, directory):
+    products = catalog(args.products)
+    baseline = AIContentGenerator(api_key="mock", base_url=base_url, batch_size=1, batch_window=0,
+                                  cache_path=os.path.join(directory, "before.db"))
+    sample = products[:args.baseline]
+    t_before = await before(baseline, sample)
+    await baseline.aclose()
+
+    generator = AIContentGenerator(api_key="mock", base_url=base_url, batch_size=args.batch,
+                                   cache_path=os.path.join(directory, "after.db"))
+    t_after = await after(generator, products)
+    cold = generator.metrics()
+    t_cached = await after(generator, products)
+    warm = generator.metrics()
+    await generator.aclose()
+    budget = await budget_check(args, base_url, directory)
+    return t_before, t_after, t_cached, cold, warm, budget
+
+
+async def budget_check(args, base_url, directory):
+    """כל ה-batches יוצאים יחד מול תקרה של ~3 batches: השריון לפני השליחה עוצר את השאר, בלי חריגה"""
+    limit = 3 * (args.batch * (250 + 40) + 200)
+    generator = AIContentGenerator(api_key="mock", base_url=base_url, batch_size=args.batch,
+                                   max_total_tokens=limit, cache_path=os.path.join(directory, "budget.db"))
+    results = await generator.generate_many(catalog(args.products))
+    refused = sum(isinstance(r, ContentBudgetExceeded) for r in results)
+    used, reserved = generator.budget.total_tokens, generator.budget.reserved_tokens
+    await generator.aclose()
+    return limit, used, reserved, refused
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--baseline", type=int, default=20, help="כמה מוצרים למדוד בגרסה הסדרתית")
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.4)
+    parser.add_argument("--external", action="store_true", help="להשתמש ב-OPENAI_BASE_URL במקום mock")
+    args = parser.parse_args()
+
+    server = None
+    if args.external:
+        base_url = os.environ["OPENAI_BASE_URL"]
+    else:
+        server = start_mock(args.latency)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    with tempfile.TemporaryDirectory() as directory:
+        t_before, t_after, t_cached, cold, warm, budget = asyncio.run(run(args, base_url, directory))
+
+    per_before = t_before / args.baseline
+    print(f"before (serial, 1/request): {per_before * 1000:8.1f} ms/product  ({args.baseline} products)")
+    print(f"after  (batched, cold):     {t_after / args.products * 1000:8.1f} ms/product  "
+          f"({cold['requests']} requests, {cold['items_per_request']} items/request)")
+    print(f"after  (cache):             {t_cached / args.products * 1000:8.1f} ms/product  "
+          f"({warm['cache_hits']} hits, {warm['requests'] - cold['requests']} new requests)")
+    print(f"latency p50/p95: {cold['latency_p50_ms']} / {cold['latency_p95_ms']} ms   "
+          f"tokens: {cold['prompt_tokens']} in / {cold['completion_tokens']} out   est. cost ${cold['cost_usd']}")
+    print(f"speedup: {per_before / (t_after / args.products):.1f}x")
+    limit, used, reserved, refused = budget
+    ok = used <= limit and reserved == 0 and 0 < refused < args.products
+    print(f"[{'OK' if ok else 'FAIL'}] token budget: {used}/{limit} used, {refused} products refused, "
+          f"{reserved} still reserved")
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: חיבור חדש לכל בקשה מול ConnectionPool (WAL + pragmas + prepared statements).
+מריץ את תמהיל השאילתות של ה-handlers ב-main_controller ומדפיס requests/sec.
+
+    python -m benchmarks.bench_db_pool --rows 5000 --requests 2000
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.db_pool import ConnectionPool
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, niche TEXT, cost REAL,
+        suggested_price REAL, profit REAL, demand_score INTEGER, competition TEXT, ad_budget REAL,
+        url TEXT, ai_prompt TEXT, ad_copy_he TEXT, image_path TEXT, is_golden INTEGER DEFAULT 0,
+        source_type TEXT, trend_rating TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS system_alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, severity TEXT, message TEXT,
+        is_read INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+NICHES = ["Cyber Security Tools", "Biohacking Gear", "Smart Home AI", "Eco-Transport"]
+INSERT_SQL = '''INSERT INTO products (title, niche, cost, suggested_price, profit, demand_score,
+                competition, ad_budget, ai_prompt, ad_copy_he, is_golden, source_type, trend_rating)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+
+def product_row(i):
+    cost = random.uniform(18.0, 60.0)
+    return (f"Bench Product {i}", random.choice(NICHES), cost, cost * 1.6, cost * 0.6,
+            random.randint(40, 99), "Low", cost * 2, "prompt " * 20, "קופי " * 20,
+            random.randint(0, 1), "BENCH", "STABLE")
+
+
+def seed(path, rows):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany(INSERT_SQL, [product_row(i) for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def handler_mix(get_conn, release, limit):
+    """תמהיל בקשות: stats, alerts, vault, manual_scan, purge"""
+    ops = 0
+    # stats
+    conn = get_conn()
+    conn.execute("SELECT COUNT(*) FROM products").fetchone()
+    conn.execute("SELECT COUNT(*) FROM products WHERE is_golden = 1").fetchone()
+    conn.execute("SELECT SUM(profit) FROM products").fetchone()
+    conn.execute("SELECT niche, COUNT(*) as count FROM products GROUP BY niche").fetchall()
+    release(conn)
+    ops += 1
+    # alerts
+    conn = get_conn()
+    conn.execute("SELECT * FROM system_alerts ORDER BY created_at DESC LIMIT 20").fetchall()
+    release(conn)
+    ops += 1
+    # vault (bounded so the benchmark measures connection overhead, not serialization)
+    conn = get_conn()
+    conn.execute("SELECT * FROM products ORDER BY is_golden DESC, created_at DESC LIMIT ?", (limit,)).fetchall()
+    release(conn)
+    ops += 1
+    # manual scan
+    conn = get_conn()
+    new_id = conn.execute(INSERT_SQL, product_row(0)).lastrowid
+    conn.commit()
+    release(conn)
+    ops += 1
+    # purge
+    conn = get_conn()
+    conn.execute("DELETE FROM products WHERE id = ?", (new_id,))
+    conn.commit()
+    release(conn)
+    ops += 1
+    return ops
+
+
+def run(label, get_conn, release, requests, limit):
+    done = 0
+    start = time.perf_counter()
+    while done < requests:
+        done += handler_mix(get_conn, release, limit)
+    elapsed = time.perf_counter() - start
+    rps = done / elapsed
+    print(f"{label:<28} {done:>7} requests in {elapsed:7.3f}s  ->  {rps:10.1f} req/s")
+    return rps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--vault-limit", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        pooled_db = os.path.join(tmp, "pooled.db")
+        seed(legacy_db, args.rows)
+        seed(pooled_db, args.rows)
+
+        def legacy_conn():
+            conn = sqlite3.connect(legacy_db)
+            conn.row_factory = sqlite3.Row
+            return conn
+
+        before = run("before: connect-per-request", legacy_conn, lambda c: c.close(), args.requests, args.vault_limit)
+
+        pool = ConnectionPool(pooled_db)
+        after = run("after: ConnectionPool", pool.get_connection, lambda c: None, args.requests, args.vault_limit)
+        pool.close_all()
+
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
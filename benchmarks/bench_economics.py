@@ -0,0 +1,130 @@
+"""
+Benchmark: תמחור קטלוג שלם - calculate_economics בלולאה (מוצר אחרי מוצר) מול PricingRules.batch (NumPy),
+ואז תמחור מחדש של כספת SQLite (סכמת VAULT_MIGRATIONS, כולל triggers) אחרי שינוי עלות משלוח:
+לפני - חישוב + UPDATE לכל שורה, אחרי - reprice_all (קריאה אחת, חישוב וקטורי, executemany בטרנזקציה אחת).
+
+    python -m benchmarks.bench_economics --rows 1000000
+    python -m benchmarks.bench_economics --rows 1000000 --db-rows 200000
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import dataclasses
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.db_pool import ConnectionPool
+from modules.migrations import VAULT_MIGRATIONS, apply_migrations
+from modules.economics import PricingRules, reprice_all
+
+# אותם חוקים כמו SystemConfig.PRICING ב-main_controller
+RULES = PricingRules(shipping=6.25, ads=10.0, margin=0.32, golden_profit=28.0, golden_demand=82,
+                     budget_multiplier=3.5)
+NICHES = ["Cyber Security Tools", "Biohacking Gear", "Smart Home AI", "Eco-Transport"]
+
+
+def columns(rows, seed=7):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(10.0, 120.0, rows).round(2), rng.integers(30, 100, rows)
+
+
+def compute(rows):
+    cost, demand = columns(rows)
+    cost_list, demand_list = cost.tolist(), demand.tolist()
+    start = time.perf_counter()
+    scalar = [RULES.quote(c, d) for c, d in zip(cost_list, demand_list)]
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = RULES.batch(cost, demand)
+    t_batch = time.perf_counter() - start
+
+    # נכונות: אותה תוצאה (עד עיגול של חצי סנט בקצוות float)
+    for key in ("suggested_price", "profit", "ad_budget", "is_golden"):
+        expected = np.array([row[key] for row in scalar])
+        assert np.allclose(batch[key], expected, atol=0.011), key
+    return t_loop, t_batch
+
+
+def build_vault(path, rows):
+    conn = sqlite3.connect(path)
+    apply_migrations(conn, VAULT_MIGRATIONS)
+    cost, demand = columns(rows, seed=11)
+    econ = RULES.batch(cost, demand)
+    conn.executemany(
+        "INSERT INTO products (title, niche, cost, suggested_price, profit, demand_score, ad_budget, is_golden, "
+        "source_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'BENCH')",
+        ((f"Bench Product {i}", NICHES[i % len(NICHES)], c, p, pr, d, b, g) for i, (c, p, pr, d, b, g) in enumerate(
+            zip(cost.tolist(), econ["suggested_price"].tolist(), econ["profit"].tolist(), demand.tolist(),
+                econ["ad_budget"].tolist(), econ["is_golden"].tolist()))))
+    conn.commit()
+    conn.close()
+
+
+def reprice_loop(conn, rules):
+    # הדרך הישנה: calculate_economics לכל שורה + UPDATE לכל שורה
+    rows = conn.execute("SELECT id, cost, demand_score FROM products").fetchall()
+    for row in rows:
+        econ = rules.quote(row[1], row[2])
+        conn.execute("UPDATE products SET suggested_price = ?, profit = ?, ad_budget = ?, is_golden = ? WHERE id = ?",
+                     (econ["suggested_price"], econ["profit"], econ["ad_budget"], econ["is_golden"], row[0]))
+    conn.commit()
+    return len(rows)
+
+
+def reprice(directory, rows):
+    path = os.path.join(directory, "vault.db")
+    build_vault(path, rows)
+    pool = ConnectionPool(path)
+    conn = pool.get_connection()
+
+    start = time.perf_counter()
+    reprice_loop(conn, dataclasses.replace(RULES, shipping=7.5))
+    t_loop = time.perf_counter() - start
+
+    changed = dataclasses.replace(RULES, shipping=8.75)
+    start = time.perf_counter()
+    with pool.transaction() as tx:
+        stats = reprice_all(tx, changed)
+    t_bulk = time.perf_counter() - start
+
+    # מעבר שני עם אותם חוקים - אין מה לכתוב
+    start = time.perf_counter()
+    with pool.transaction() as tx:
+        noop = reprice_all(tx, changed)
+    t_noop = time.perf_counter() - start
+    assert noop["updated"] == 0, noop
+
+    # niche_stats (מתוחזקת ב-triggers) עדיין מסכמת נכון אחרי התמחור מחדש
+    drift = conn.execute(
+        "SELECT ABS((SELECT SUM(profit_sum) FROM niche_stats) - (SELECT SUM(profit) FROM products))").fetchone()[0]
+    assert drift < 0.01, drift
+    pool.close_all()
+    return t_loop, t_bulk, t_noop, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db-rows", type=int, default=None, help="גודל הכספת לבדיקת reprice (ברירת מחדל: --rows)")
+    args = parser.parse_args()
+
+    t_loop, t_batch = compute(args.rows)
+    print(f"compute {args.rows:,} rows:  loop {t_loop:7.3f}s   numpy {t_batch:7.3f}s   "
+          f"speedup {t_loop / t_batch:.0f}x")
+
+    db_rows = args.db_rows or args.rows
+    with tempfile.TemporaryDirectory() as directory:
+        t_loop, t_bulk, t_noop, stats = reprice(directory, db_rows)
+    print(f"reprice {db_rows:,} rows:  per-row UPDATE {t_loop:7.2f}s   reprice_all {t_bulk:7.2f}s   "
+          f"speedup {t_loop / t_bulk:.1f}x")
+    print(f"  {stats['updated']:,} updated, {stats['golden']:,} golden "
+          f"(+{stats['golden_gained']:,} / -{stats['golden_lost']:,}); unchanged re-run {t_noop:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
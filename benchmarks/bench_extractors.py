@@ -0,0 +1,148 @@
+"""
+Micro-benchmark: backends של חילוץ כותרת + מחיר (modules/extractors.py) על קורפוס דפי HTML שמורים.
+בודק קודם שכל ה-backends מחזירים בדיוק את מה ש-BeautifulSoup מחזיר, ואז מודד ms לדף.
+
+    python -m benchmarks.bench_extractors --repeat 20
+    python -m benchmarks.bench_extractors --fixtures /path/to/saved/pages
+    python -m benchmarks.bench_extractors --regenerate   # בונה מחדש את benchmarks/fixtures
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.extractors import EXTRACTORS
+from modules.extraction_rules import page_extractor
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+# --- קורפוס: דפי מוצר סינתטיים במבנה של marketplaces (nav ענק, scripts, ביקורות, מוצרים דומים) ---
+def _nav(rng, links):
+    items = "".join(f'<li class="menu-item"><a href="/c/{rng.randint(1, 99999)}">Category {i}</a></li>'
+                    for i in range(links))
+    return f'<header><nav class="mega-menu"><ul>{items}</ul></nav></header>'
+
+
+def _scripts(rng, count):
+    return "".join(f'<script>window.__state_{i} = {{"k": "{"x" * rng.randint(200, 2000)}"}};</script>'
+                   for i in range(count))
+
+
+def _reviews(rng, count):
+    return "".join(f'<div class="review"><span class="stars">{rng.randint(1, 5)}</span>'
+                   f'<p>{"Great product, works as described. " * rng.randint(2, 12)}</p></div>'
+                   for _ in range(count))
+
+
+def _related(count):
+    return "".join(f'<div class="card"><a href="/p/{i}">Related {i}</a><span class="card-price">${i}.99</span></div>'
+                   for i in range(count))
+
+
+def build_corpus():
+    rng = random.Random(42)
+    pages = {
+        "marketplace_large.html": (
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Shop</title>'
+            + _scripts(rng, 40) + '</head><body>' + _nav(rng, 800)
+            + '<main><div class="breadcrumbs">Home / Gadgets</div>'
+            '<h1 class="product-title">Ultra Smart <b>Pet Feeder</b> Pro</h1>'
+            '<div class="price-box"><span class="a-price">$1,249.99</span></div>'
+            + _reviews(rng, 600) + _related(200) + '</main></body></html>'),
+        "shop_small.html": (
+            '<html><head><meta charset="utf-8"></head><body><h1>Minimal LED Desk Lamp</h1>'
+            '<p id="product-price">$39.90</p>' + _reviews(rng, 20) + '</body></html>'),
+        "price_late.html": (
+            '<html><head><meta charset="utf-8"></head><body>' + _nav(rng, 300)
+            + '<h1>Eco Bamboo Toothbrush Set</h1>' + _reviews(rng, 300)
+            + '<footer><div class="final-price">€12,50</div></footer></body></html>'),
+        "no_price.html": (
+            '<html><head><meta charset="utf-8"></head><body>' + _nav(rng, 200)
+            + '<h1>Out Of Stock Item</h1>' + _reviews(rng, 150) + '</body></html>'),
+        "hebrew_windows1255.html": (
+            '<html dir="rtl"><head><meta http-equiv="Content-Type" content="text/html; charset=windows-1255">'
+            '</head><body>' + _nav(rng, 100) + '<h1>מטען אלחוטי מהיר</h1>'
+            '<span class="price">₪ 89.90</span>' + _reviews(rng, 50) + '</body></html>'),
+        "jsonld_marketplace.html": (
+            '<html><head><meta charset="utf-8"><meta property="og:title" content="Noise Cancelling Headphones">'
+            '<script type="application/ld+json">{"@context": "https://schema.org", "@type": "Product", '
+            '"name": "Noise Cancelling Headphones", "offers": {"@type": "Offer", "price": "199.00", '
+            '"priceCurrency": "EUR"}}</script>' + _scripts(rng, 30) + '</head><body>' + _nav(rng, 600)
+            + _related(300) + '<h1>Noise Cancelling Headphones</h1><div class="price">199,00 €</div>'
+            + _reviews(rng, 400) + '</body></html>'),
+    }
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, page in pages.items():
+        encoding = "windows-1255" if "windows1255" in name else "utf-8"
+        with open(os.path.join(FIXTURES_DIR, name), "wb") as f:
+            f.write(page.encode(encoding))
+
+
+def load_corpus(directory):
+    corpus = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(directory, name), "rb") as f:
+                corpus[name] = f.read()
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--regenerate", action="store_true")
+    args = parser.parse_args()
+
+    if args.regenerate or not os.path.isdir(args.fixtures):
+        build_corpus()
+    corpus = load_corpus(args.fixtures)
+    extractors = {name: cls() for name, cls in EXTRACTORS.items()}
+
+    # נכונות: כל backend מול ה-baseline
+    baseline = {name: extractors["soup"].extract(page) for name, page in corpus.items()}
+    for name, page in corpus.items():
+        for backend, ex in extractors.items():
+            got = ex.extract(page)
+            assert got == baseline[name], f"{backend} on {name}: {got} != {baseline[name]}"
+        print(f"{name:<28} {len(page) / 1024:7.1f} KB  ->  {baseline[name]}")
+
+    print(f"\n{'backend':<12}" + "".join(f"{n[:18]:>20}" for n in corpus) + f"{'total':>12}")
+    totals = {}
+    for backend, ex in extractors.items():
+        row, total = [], 0.0
+        for page in corpus.values():
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                ex.extract(page)
+            ms = (time.perf_counter() - start) / args.repeat * 1000
+            row.append(ms)
+            total += ms
+        totals[backend] = total
+        print(f"{backend:<12}" + "".join(f"{ms:17.2f} ms" for ms in row) + f"{total:9.2f} ms")
+
+    # מנוע החוקים: JSON-LD/OpenGraph ב-regex, ורק אחריהם חוק דומיין / היוריסטיקה
+    row, total = [], 0.0
+    for name, page in corpus.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fields = page_extractor.extract(page)
+        ms = (time.perf_counter() - start) / args.repeat * 1000
+        row.append(ms)
+        total += ms
+    totals["rules"] = total
+    print(f"{'rules':<12}" + "".join(f"{ms:17.2f} ms" for ms in row) + f"{total:9.2f} ms")
+    for name, page in corpus.items():
+        fields = page_extractor.extract(page)
+        print(f"  {name:<28} {fields.source or '-':<10} {fields.price} {fields.currency}")
+
+    for backend, total in totals.items():
+        if backend != "soup":
+            print(f"speedup {backend} vs soup: {totals['soup'] / total:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
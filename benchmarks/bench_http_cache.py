@@ -0,0 +1,89 @@
+"""
+Benchmark: סריקה חוזרת של אותם URL-ים דרך HttpCache (modules/http_cache.py) מול השרת המקומי של bench_scraper.
+שלושה מעברים על אותו קטלוג: קר (הורדה + חילוץ), חם בתוך ה-TTL (בלי רשת ובלי parse),
+ואחרי שה-TTL פג (בקשה מותנית -> 304, החילוץ נלקח מהמטמון לפי hash התוכן).
+
+    python -m benchmarks.bench_http_cache --urls 500 --latency 0.05
+"""
+import os
+import sys
+import gzip
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.scraper import AsyncScraper
+from modules.http_cache import HttpCache
+from modules.extraction_rules import RuleEngine, DEFAULT_DOMAIN_RULES
+from modules.extractors import extractor
+from benchmarks.bench_scraper import StandInStore, start_server
+from benchmarks.bench_extractors import FIXTURES_DIR, build_corpus
+
+
+async def scan(scraper, engine, urls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(url):
+        async with semaphore:
+            res = await scraper.fetch(url)
+            return res.cache, await engine.extract_response(res)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(url) for url in urls))
+    return time.perf_counter() - start, results
+
+
+async def run(urls, concurrency, db_path):
+    cache = HttpCache(db_path, ttl=3600)
+    scraper = AsyncScraper(per_host=concurrency, backoff=0.01, cache=cache)
+    engine = RuleEngine(DEFAULT_DOMAIN_RULES, fallback=extractor, cache=cache)
+    passes = {}
+    passes["cold"] = await scan(scraper, engine, urls, concurrency)
+    passes["warm"] = await scan(scraper, engine, urls, concurrency)
+    cache.ttl = 0  # כל הרשומות "פגו" - כל בקשה הופכת ל-If-None-Match
+    passes["revalidate"] = await scan(scraper, engine, urls, concurrency)
+    stats = await cache.stats()
+    await scraper.aclose()
+    cache.close()
+    return passes, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    # דף מוצר בגודל אמיתי (~500KB) כדי שיהיה מה לחסוך ב-parse
+    page_path = os.path.join(FIXTURES_DIR, "marketplace_large.html")
+    if not os.path.exists(page_path):
+        build_corpus()
+    with open(page_path, "rb") as f:
+        StandInStore.page = gzip.compress(f.read())
+
+    server = start_server(args.latency)
+    port = server.server_address[1]
+    urls = [f"http://127.0.0.1:{port}/item/{i}" for i in range(args.urls)]
+    with tempfile.TemporaryDirectory() as tmp:
+        passes, stats = asyncio.run(run(urls, args.concurrency, os.path.join(tmp, "http_cache.db")))
+    server.shutdown()
+
+    baseline = passes["cold"][1][0][1]
+    for name, (elapsed, results) in passes.items():
+        states = {state for state, _ in results}
+        assert all(fields == baseline for _, fields in results), f"{name}: extraction mismatch"
+        print(f"{name:<11} {elapsed:7.2f}s  {len(urls) / elapsed:8.1f} urls/s  cache={','.join(sorted(states))}")
+    print(f"speedup warm vs cold: {passes['cold'][0] / passes['warm'][0]:.1f}x, "
+          f"revalidate vs cold: {passes['cold'][0] / passes['revalidate'][0]:.1f}x")
+    print(f"stats: {stats}")
+    assert {s for s, _ in passes["warm"][1]} == {"hit"}
+    assert {s for s, _ in passes["revalidate"][1]} == {"revalidated"}
+    # כל ה-URL-ים מגישים את אותו גוף - נשמר (ודחוס) פעם אחת
+    assert stats["bodies"] == 1 and stats["bytes"] < stats["raw_bytes"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark + בדיקה לתור ה-jobs (modules.job_queue) על סכמת VAULT_MIGRATIONS.
+פרץ של N סריקות (handler = sleep של latency, חלק נכשלים פעם אחת וחלק תמיד):
+לפני: asyncio.create_task לכל סריקה - מקביליות בלי גבול ואין שום רישום. אחרי: JobQueue עם מגבלת מקביליות,
+retries ו-dead-letter. באמצע הריצה התור נעצר ("ריסטארט") ותור חדש ממשיך - אף job לא הולך לאיבוד.
+
+    python -m benchmarks.bench_job_queue
+    python -m benchmarks.bench_job_queue --jobs 2000 --concurrency 16 --latency 0.01
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.db_pool import ConnectionPool
+from modules.job_queue import JobQueue
+from modules.migrations import VAULT_MIGRATIONS, apply_migrations
+
+
+class Probe:
+    """handler של סריקה מדומה: סופר מקביליות שיא, נכשל פעם אחת בכל job עשירי ותמיד בכל job חמישים"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.failed_once = set()
+
+    async def __call__(self, payload):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            i = payload["i"]
+            if i % 50 == 0:
+                raise RuntimeError("permanent upstream failure")
+            if i % 10 == 0 and i not in self.failed_once:
+                self.failed_once.add(i)
+                raise RuntimeError("transient upstream failure")
+            return {"i": i}
+        finally:
+            self.in_flight -= 1
+
+
+async def before(jobs: int, latency: float):
+    probe = Probe(latency)
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(probe({"i": i})) for i in range(jobs)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    failed = sum(isinstance(r, Exception) for r in results)
+    return time.perf_counter() - start, probe.peak, failed
+
+
+async def after(pool: ConnectionPool, jobs: int, latency: float, concurrency: int):
+    probe = Probe(latency)
+    options = dict(concurrency=concurrency, max_attempts=3, backoff=0.01, timeout=30)
+
+    def make_queue(worker: str) -> JobQueue:
+        queue = JobQueue(pool, worker_id=worker, poll_interval=0.05)
+        queue.register("bench.scan", probe, **options)
+        return queue
+
+    start = time.perf_counter()
+    first = make_queue("worker-1")
+    ids = [await first.enqueue("bench.scan", {"i": i}) for i in range(jobs)]
+    first.start()
+    # "ריסטארט" באמצע: jobs שרצים חוזרים לתור ו-worker חדש ממשיך
+    while first.completed < jobs // 3:
+        await asyncio.sleep(0.01)
+    await first.stop()
+    second = make_queue("worker-2")
+    second.start()
+    outcomes = await asyncio.gather(*(second.wait(job_id) for job_id in ids), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    stats = await second.stats()
+    await second.stop()
+    return elapsed, probe.peak, sum(isinstance(o, Exception) for o in outcomes), stats["totals"], \
+        first.completed + second.completed, first.retried + second.retried
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+    # ה-retries וה-dead-letter כאן מכוונים - בלי שורת לוג לכל אחד
+    logging.getLogger("EmpireOS.JobQueue").setLevel(logging.CRITICAL)
+
+    t_before, peak_before, failed_before = asyncio.run(before(args.jobs, args.latency))
+    with tempfile.TemporaryDirectory() as directory:
+        pool = ConnectionPool(os.path.join(directory, "vault.db"))
+        apply_migrations(pool.get_connection(), VAULT_MIGRATIONS)
+        t_after, peak_after, dead, totals, completed, retried = asyncio.run(
+            after(pool, args.jobs, args.latency, args.concurrency))
+        pool.close_all()
+
+    expected_dead = len(range(0, args.jobs, 50))
+    print(f"before (create_task):  {args.jobs / t_before:8.0f} jobs/s  peak concurrency {peak_before:5d}  "
+          f"{failed_before} failed and gone")
+    print(f"after  (JobQueue):     {args.jobs / t_after:8.0f} jobs/s  peak concurrency {peak_after:5d}  "
+          f"{completed} done, {retried} retried, {dead} dead-lettered (restart midway)")
+    print(f"queue totals: {totals}")
+
+    failures = 0
+    for ok, message in ((peak_after <= args.concurrency, f"peak concurrency {peak_after} <= limit {args.concurrency}"),
+                        (totals["done"] + totals["dead"] == args.jobs, "every job is done or dead-lettered"),
+                        (dead == expected_dead, f"{expected_dead} permanently failing jobs dead-lettered"),
+                        (totals["queued"] == totals["running"] == 0, "nothing left queued or running")):
+        failures += not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {message}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
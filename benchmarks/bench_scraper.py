@@ -0,0 +1,137 @@
+"""
+Benchmark: requests.get חוסם בלי session מול AsyncScraper (httpx keep-alive pool).
+מרים שרת HTTP מקומי שמדמה חנויות (latency, gzip, 503 זמני) - בלי רשת חיצונית.
+בודק גם שה-retries עובדים ושה-per-host limit נאכף.
+
+    python -m benchmarks.bench_scraper --urls 200 --latency 0.05
+"""
+import os
+import sys
+import gzip
+import time
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.scraper import AsyncScraper, ScrapeError
+
+PAGE = gzip.compress(("<html><body><h1>Stand-in Product</h1>"
+                      "<span class='price'>$24.90</span>" + "<p>filler</p>" * 500 + "</body></html>").encode())
+
+
+class StandInStore(BaseHTTPRequestHandler):
+    latency = 0.05
+    page = PAGE
+    etag = '"stand-in-v1"'
+    lock = threading.Lock()
+    active = {}
+    peak = {}
+    flaky_seen = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        host = self.headers.get("Host", "")
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        try:
+            time.sleep(self.latency)
+            # /flaky/N: 503 בניסיון הראשון, 200 בשני
+            if self.path.startswith("/flaky/") and self.path not in self.flaky_seen:
+                self.flaky_seen.add(self.path)
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.path.startswith("/missing"):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            # בקשה מותנית עם ה-ETag הנוכחי: 304 בלי גוף
+            if self.headers.get("If-None-Match") == self.etag:
+                self.send_response(304)
+                self.send_header("ETag", self.etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("ETag", self.etag)
+            self.send_header("Content-Length", str(len(self.page)))
+            self.end_headers()
+            self.wfile.write(self.page)
+        finally:
+            with self.lock:
+                self.active[host] -= 1
+
+
+def start_server(latency):
+    StandInStore.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInStore)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def before(urls):
+    start = time.perf_counter()
+    for url in urls:
+        res = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+        assert b"Stand-in Product" in res.content
+    return time.perf_counter() - start
+
+
+async def after(urls, per_host):
+    scraper = AsyncScraper(per_host=per_host, backoff=0.01)
+    start = time.perf_counter()
+    results = await scraper.fetch_many(urls)
+    elapsed = time.perf_counter() - start
+    assert all(b"Stand-in Product" in r.content for r in results)
+
+    # retries + שגיאה לא זמנית
+    flaky = await scraper.fetch(urls[0].rsplit("/", 2)[0] + "/flaky/1")
+    assert flaky.attempts == 2, flaky.attempts
+    try:
+        await scraper.fetch(urls[0].rsplit("/", 2)[0] + "/missing")
+        raise AssertionError("404 should raise ScrapeError")
+    except ScrapeError as e:
+        assert e.status == 404
+    stats = scraper.stats()
+    await scraper.aclose()
+    return elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=200)
+    parser.add_argument("--hosts", type=int, default=4, help="כמה 'חנויות' שונות (שמות host) לפזר עליהן")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-host", type=int, default=4)
+    args = parser.parse_args()
+
+    server = start_server(args.latency)
+    port = server.server_address[1]
+    # כל ה-hosts מצביעים לאותו שרת - ה-Host header מבדיל ביניהם
+    hosts = ["127.0.0.1", "localhost"][:max(1, min(args.hosts, 2))]
+    urls = [f"http://{hosts[i % len(hosts)]}:{port}/item/{i}" for i in range(args.urls)]
+
+    t_before = before(urls)
+    print(f"{'before: requests.get':<28} {len(urls):>5} urls in {t_before:7.3f}s  ->  {len(urls) / t_before:8.1f} urls/s")
+    t_after, stats = asyncio.run(after(urls, args.per_host))
+    print(f"{'after: AsyncScraper':<28} {len(urls):>5} urls in {t_after:7.3f}s  ->  {len(urls) / t_after:8.1f} urls/s")
+    print(f"speedup: {t_before / t_after:.2f}x   scraper stats: {stats}")
+    print(f"peak concurrent requests per host: {StandInStore.peak} (limit {args.per_host})")
+    assert all(peak <= args.per_host for peak in StandInStore.peak.values())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
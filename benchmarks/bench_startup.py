@@ -0,0 +1,87 @@
+"""
+Benchmark + בדיקת רגרסיה ל-cold start של השרת: `python -X importtime` על import main + create_app()
+בתהליך נקי (כמו כל worker של uvicorn). נכשל (exit 1) אם אחת התלויות הכבדות נטענת כבר ב-startup
+במקום בשימוש הראשון, או אם זמן ה-import עובר את --budget-ms.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 7 --budget-ms 800
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# נטענות רק בשימוש הראשון (modules.lazy / import מקומי) - אסור שיופיעו ב-sys.modules אחרי create_app
+HEAVY_MODULES = ("openai", "aiohttp", "requests", "pytrends", "pandas", "numpy", "bs4", "lxml", "PIL", "httpx")
+
+PROBE = "import sys, json, main; main.create_app(); print(json.dumps(sorted(sys.modules)))"
+
+
+def parse_importtime(stderr: str):
+    """שורות 'import time: self | cumulative | name' -> [(cumulative_us, name, depth)]"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((int(cumulative), name.strip(), depth))
+    return entries
+
+
+def run_once(env):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    modules = set(json.loads(result.stdout.strip().splitlines()[-1]))
+    entries = parse_importtime(result.stderr)
+    # סכום ה-imports ברמה העליונה = כל זמן ה-import של התהליך (כולל site)
+    total_ms = sum(cumulative for cumulative, _, depth in entries if depth == 0) / 1000
+    return total_ms, entries, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="תקרה לחציון זמן ה-import")
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # create_app לא אמור לגעת ב-DB, אבל הלוג נפתח - שניהם לתיקייה זמנית
+        env = {**os.environ, "EMPIRE_DB": os.path.join(directory, "vault.db"),
+               "EMPIRE_LOG_FILE": os.path.join(directory, "empire.log")}
+        runs = [run_once(env) for _ in range(args.runs)]
+        touched_db = os.path.exists(env["EMPIRE_DB"])
+
+    totals = [total for total, _, _ in runs]
+    median = statistics.median(totals)
+    _, entries, modules = runs[totals.index(min(totals, key=lambda t: abs(t - median)))]
+
+    print(f"import main + create_app(): median {median:7.1f} ms  (min {min(totals):.1f}, max {max(totals):.1f}, "
+          f"{args.runs} runs, budget {args.budget_ms:.0f} ms)")
+    print("top-level imports by cumulative time:")
+    for cumulative, name, _ in sorted((e for e in entries if e[2] <= 1), reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = 0
+    loaded = sorted(name for name in HEAVY_MODULES if name in modules)
+    for name in HEAVY_MODULES:
+        ok = name not in loaded
+        failures += not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {name:<10} {'lazy' if ok else 'imported at startup'}")
+    if touched_db:
+        failures += 1
+        print("[FAIL] create_app() opened the database (migrations belong in the lifespan hook)")
+    if median > args.budget_ms:
+        failures += 1
+        print(f"[FAIL] median import time {median:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: כתיבות סריקה מקבילות לכספת (סכמת VAULT_MIGRATIONS, כולל triggers).
+כל "סריקה" = INSERT מוצר (+ התראה אם זהב) ואחריו UPDATE של image_path, כמו autonomous_scout_worker.
+לפני: טרנזקציה + commit לכל כתיבה דרך ConnectionPool. אחרי: WriteBatcher (group commit + executemany).
+
+    python -m benchmarks.bench_write_batcher --scans 5000 --producers 64
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.db_pool import ConnectionPool
+from modules.migrations import VAULT_MIGRATIONS, apply_migrations
+from modules.write_batcher import WriteBatcher
+
+NICHES = ["Cyber Security Tools", "Biohacking Gear", "Smart Home AI", "Eco-Transport"]
+INSERT_SQL = '''INSERT INTO products (title, niche, cost, suggested_price, profit, demand_score,
+                competition, ad_budget, ai_prompt, ad_copy_he, is_golden, source_type, trend_rating)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+ALERT_SQL = "INSERT INTO system_alerts (severity, message) VALUES (?, ?)"
+IMAGE_SQL = "UPDATE products SET image_path = ?, image_thumb = ?, image_webp = ? WHERE id = ?"
+
+
+def scan_row(i):
+    cost = random.uniform(18.0, 60.0)
+    is_golden = int(i % 5 == 0)
+    return (f"Bench Product {i}", NICHES[i % len(NICHES)], cost, cost * 1.6, cost * 0.6, random.randint(40, 99),
+            "Low", cost * 2, "prompt " * 20, "קופי " * 20, is_golden, "BENCH", "STABLE")
+
+
+async def before(pool, scans, producers):
+    queue = iter(range(scans))
+
+    async def producer():
+        for i in queue:
+            row = scan_row(i)
+
+            def _persist(conn, row=row):
+                new_id = conn.execute(INSERT_SQL, row).lastrowid
+                if row[10]:
+                    conn.execute(ALERT_SQL, ("GOLDEN", f"New Golden Opportunity Discovered: {row[0]}"))
+                return new_id
+            new_id = await pool.run_transaction(_persist)
+            await pool.execute(IMAGE_SQL, (f"{new_id}.png", f"{new_id}.thumb.webp", f"{new_id}.webp", new_id))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(producer() for _ in range(producers)))
+    return time.perf_counter() - start
+
+
+async def after(writer, scans, producers):
+    queue = iter(range(scans))
+
+    async def producer():
+        for i in queue:
+            row = scan_row(i)
+            statements = [(INSERT_SQL, row)]
+            if row[10]:
+                statements.append((ALERT_SQL, ("GOLDEN", f"New Golden Opportunity Discovered: {row[0]}")))
+            new_id = (await writer.execute_group(statements))[0]
+            await writer.write(IMAGE_SQL, (f"{new_id}.png", f"{new_id}.thumb.webp", f"{new_id}.webp", new_id))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(producer() for _ in range(producers)))
+    elapsed = time.perf_counter() - start
+    await writer.stop()
+    return elapsed
+
+
+def fresh_db(path):
+    conn = sqlite3.connect(path)
+    apply_migrations(conn, VAULT_MIGRATIONS)
+    conn.close()
+    return ConnectionPool(path)
+
+
+def check(pool, scans):
+    conn = pool.get_connection()
+    products = conn.execute("SELECT COUNT(*) FROM products WHERE image_path IS NOT NULL").fetchone()[0]
+    alerts = conn.execute("SELECT COUNT(*) FROM system_alerts").fetchone()[0]
+    assert products == scans, (products, scans)
+    assert alerts == sum(1 for i in range(scans) if i % 5 == 0), alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scans", type=int, default=5000)
+    parser.add_argument("--producers", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        pool = fresh_db(os.path.join(directory, "before.db"))
+        t_before = asyncio.run(before(pool, args.scans, args.producers))
+        check(pool, args.scans)
+        pool.close_all()
+
+        pool = fresh_db(os.path.join(directory, "after.db"))
+        writer = WriteBatcher(pool)
+        t_after = asyncio.run(after(writer, args.scans, args.producers))
+        check(pool, args.scans)
+        pool.close_all()
+
+    stats = writer.stats()
+    print(f"before (commit per write): {args.scans / t_before:9.0f} scans/s")
+    print(f"after  (group commit):     {args.scans / t_after:9.0f} scans/s   "
+          f"({stats['batches']} commits, avg {stats['avg_batch']} writes/commit, largest {stats['largest_batch']})")
+    print(f"speedup: {t_before / t_after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
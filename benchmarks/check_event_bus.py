@@ -0,0 +1,119 @@
+"""
+בדיקת ערוץ האירועים (modules.event_bus) עם כמה תהליכים על אותה כספת, כמו uvicorn --workers:
+  1. מנוי SSE ב-worker אחד מקבל את כל האירועים שכל ה-workers פרסמו - כל אחד פעם אחת, לפי id עולה
+  2. התחברות מחדש עם Last-Event-ID (ל-bus של worker אחר) משלימה בדיוק את מה שאחרי ה-id הזה
+
+    python -m benchmarks.check_event_bus
+    python -m benchmarks.check_event_bus --workers 8 --events 200
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.db_pool import ConnectionPool
+from modules.event_bus import EventBus
+from modules.write_batcher import WriteBatcher
+from modules.migrations import VAULT_MIGRATIONS, apply_migrations
+
+
+class _Request:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def publisher(db_path: str, index: int, events: int):
+    """תהליך worker: מפרסם events אירועים דרך ה-bus שלו"""
+    async def run():
+        pool = ConnectionPool(db_path)
+        writer = WriteBatcher(pool)
+        bus = EventBus(pool, writer)
+        for n in range(events):
+            await bus.publish("product-inserted", {"worker": index, "n": n})
+        await writer.stop()
+        pool.close_all()
+    asyncio.run(run())
+
+
+def parse(chunk: str):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if ": " in line)
+    return int(fields["id"]), fields["data"]
+
+
+async def collect(bus: EventBus, expected: int, last_event_id=None, timeout: float = 30.0):
+    """קורא מהזרם עד expected אירועים (או timeout). מחזיר [(id, data)]"""
+    received = []
+
+    async def read():
+        async for chunk in bus.stream(_Request(), last_event_id):
+            if chunk.startswith("id: "):
+                received.append(parse(chunk))
+                if len(received) >= expected:
+                    return
+    try:
+        await asyncio.wait_for(read(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    return received
+
+
+async def check(db_path: str, workers: int, events: int) -> bool:
+    total = workers * events
+    pool = ConnectionPool(db_path)
+    bus = EventBus(pool, WriteBatcher(pool), poll_interval=0.05)
+    bus.start()
+    await asyncio.sleep(0.2)
+
+    reader = asyncio.create_task(collect(bus, total))
+    await asyncio.sleep(0.2)
+    started = time.perf_counter()
+    procs = [mp.Process(target=publisher, args=(db_path, i, events)) for i in range(workers)]
+    for p in procs:
+        p.start()
+    live = await reader
+    elapsed = time.perf_counter() - started
+    for p in procs:
+        p.join()
+
+    ids = [i for i, _ in live]
+    ok_live = len(live) == total and len(set(data for _, data in live)) == total and ids == sorted(set(ids))
+    print(f"[{'OK' if ok_live else 'FAIL'}] live fan-in    {len(live)}/{total} events from {workers} workers "
+          f"in {elapsed:.2f}s, ids strictly increasing: {ids == sorted(set(ids))}")
+
+    # worker אחר (bus ו-pool משלו), Last-Event-ID באמצע
+    other_pool = ConnectionPool(db_path)
+    other = EventBus(other_pool, WriteBatcher(other_pool))
+    other.start()
+    middle = ids[len(ids) // 2] if ids else 0
+    expected = [item for item in live if item[0] > middle]
+    replayed = await collect(other, len(expected), last_event_id=str(middle), timeout=5.0)
+    ok_replay = replayed == expected
+    print(f"[{'OK' if ok_replay else 'FAIL'}] replay         Last-Event-ID {middle} on another worker -> "
+          f"{len(replayed)}/{len(expected)} events")
+
+    await bus.stop()
+    await other.stop()
+    pool.close_all()
+    other_pool.close_all()
+    return ok_live and ok_replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--events", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "vault.db")
+        apply_migrations(ConnectionPool(db_path).get_connection(), VAULT_MIGRATIONS)
+        ok = asyncio.run(check(db_path, args.workers, args.events))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+בדיקת בחירת המנהיג (modules.leader) עם כמה תהליכים אמיתיים על אותה כספת, כמו uvicorn --workers:
+  1. בדיוק מנהיג אחד בכל רגע (אף פעם לא שניים)
+  2. SIGKILL למנהיג -> worker אחר לוקח אחרי לכל היותר ttl + renew_interval
+  3. כיבוי מסודר (SIGTERM) של המנהיג -> ה-lease משוחרר וה-failover בתוך renew_interval
+
+    python -m benchmarks.check_leader_election
+    python -m benchmarks.check_leader_election --workers 8 --ttl 1.5
+"""
+import os
+import sys
+import time
+import signal
+import asyncio
+import argparse
+import tempfile
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.db_pool import ConnectionPool
+from modules.leader import LeaderLease
+from modules.migrations import VAULT_MIGRATIONS, apply_migrations
+
+
+def worker(db_path: str, index: int, flags, ttl: float):
+    """תהליך worker: מתמודד על ה-lease ומסמן ב-flags[index] האם הוא מריץ את 'שירותי הרקע'"""
+    async def run():
+        pool = ConnectionPool(db_path)
+        lease = LeaderLease(pool, ttl=ttl, on_elected=lambda: flags.__setitem__(index, 1),
+                            on_demoted=lambda: flags.__setitem__(index, 0))
+        stopping = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+        lease.start()
+        await stopping.wait()
+        await lease.stop()
+        pool.close_all()
+    asyncio.run(run())
+
+
+def leaders(flags, alive):
+    return [i for i in alive if flags[i]]
+
+
+def watch(flags, alive, seconds: float, until_leader: bool = False):
+    """דוגם את ה-flags כל 10ms. מחזיר (מקסימום מנהיגים בו-זמנית, זמן עד שיש מנהיג)"""
+    started = time.monotonic()
+    most, elected_after = 0, None
+    while time.monotonic() - started < seconds:
+        current = leaders(flags, alive)
+        most = max(most, len(current))
+        if current and elected_after is None:
+            elected_after = time.monotonic() - started
+            if until_leader:
+                break
+        time.sleep(0.01)
+    return most, elected_after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ttl", type=float, default=1.5)
+    args = parser.parse_args()
+    renew = args.ttl / 3
+    failures = 0
+
+    def check(ok: bool, message: str):
+        nonlocal failures
+        failures += not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {message}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "vault.db")
+        setup = ConnectionPool(db_path)
+        apply_migrations(setup.get_connection(), VAULT_MIGRATIONS)
+        setup.close_all()
+
+        flags = mp.Array("b", args.workers, lock=False)
+        processes = {i: mp.Process(target=worker, args=(db_path, i, flags, args.ttl), daemon=True)
+                     for i in range(args.workers)}
+        for process in processes.values():
+            process.start()
+        try:
+            _, elected_after = watch(flags, processes, args.ttl * 4, until_leader=True)
+            check(elected_after is not None, f"{args.workers} workers elected a leader "
+                                             f"after {elected_after or 0:.2f}s")
+            most, _ = watch(flags, processes, args.ttl * 3)
+            check(most == 1, f"steady state: at most {most} leader(s) at once over {args.ttl * 3:.1f}s")
+
+            for how, sig, limit in (("SIGKILL (crash)", signal.SIGKILL, args.ttl + renew),
+                                    ("SIGTERM (graceful)", signal.SIGTERM, renew)):
+                if len(processes) < 2:
+                    break
+                leader = leaders(flags, processes)[0]
+                os.kill(processes[leader].pid, sig)
+                processes.pop(leader).join(timeout=args.ttl * 2)
+                # תהליך שנהרג לא מספיק לנקות את הדגל שלו
+                flags[leader] = 0
+                most, failover = watch(flags, processes, limit * 3, until_leader=True)
+                check(failover is not None and failover <= limit + renew,
+                      f"{how}: worker {leader} replaced after "
+                      f"{'never' if failover is None else f'{failover:.2f}s'} (limit {limit:.2f}s)")
+                most, _ = watch(flags, processes, args.ttl * 2)
+                check(most == 1, f"{how}: at most {most} leader(s) at once after failover")
+        finally:
+            for process in processes.values():
+                process.kill()
+                process.join()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
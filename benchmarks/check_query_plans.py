@@ -0,0 +1,87 @@
+"""
+בדיקת EXPLAIN QUERY PLAN לשאילתות החמות של הכספת: מוודא שאף אחת מהן לא סורקת
+את טבלת products בסריקה מלאה, ושמיגרציה משדרגת DB ישן (user_version=0) במקום.
+
+    python -m benchmarks.check_query_plans
+"""
+import os
+import sys
+import sqlite3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.migrations import VAULT_MIGRATIONS, apply_migrations, current_version, explain, uses_full_scan
+from modules.pagination import KeysetPage
+
+VAULT_PAGE = KeysetPage(
+    table="products",
+    columns=("id", "title", "niche", "profit", "is_golden", "source_type", "created_at"),
+    sort_keys=("is_golden", "created_at", "id"),
+)
+CURSOR = KeysetPage.encode_cursor([1, "2025-01-01 00:00:00", 100])
+
+HOT_QUERIES = {
+    "vault first page": VAULT_PAGE.build()[:2],
+    "vault next page": VAULT_PAGE.build(cursor=CURSOR)[:2],
+    "vault by niche": VAULT_PAGE.build(filters=[("niche", "=", "Smart Home AI")])[:2],
+    "vault by source": VAULT_PAGE.build(filters=[("source_type", "=", "MANUAL")])[:2],
+    "vault golden only": VAULT_PAGE.build(filters=[("is_golden", "=", 1)])[:2],
+    # /api/stats/global קורא רק את niche_stats - O(niches), בלי לגעת ב-products
+    "stats (niche_stats)": ("SELECT NULLIF(niche, '') AS niche, product_count FROM niche_stats ORDER BY niche_stats.niche", []),
+    "alerts": ("SELECT * FROM system_alerts ORDER BY created_at DESC LIMIT 20", []),
+}
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, niche TEXT, cost REAL,
+        suggested_price REAL, profit REAL, demand_score INTEGER, competition TEXT, ad_budget REAL,
+        url TEXT, ai_prompt TEXT, ad_copy_he TEXT, image_path TEXT, is_golden INTEGER DEFAULT 0,
+        source_type TEXT, trend_rating TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE system_alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, severity TEXT, message TEXT,
+        is_read INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    INSERT INTO products (title, niche, profit, is_golden) VALUES ('legacy row', 'Eco-Transport', 31.5, 1);
+    INSERT INTO products (title, niche, profit, is_golden) VALUES ('legacy row', 'Eco-Transport', 12.0, 0);
+'''
+
+
+def check_plans(conn):
+    failures = 0
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = explain(conn, sql, params)
+        ok = not uses_full_scan(plan, "products") and not uses_full_scan(plan, "system_alerts") \
+            and not any("TEMP B-TREE" in step for step in plan) \
+            and ("niche_stats" not in sql or not any("products" in step for step in plan))
+        failures += not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {name:<20} {' | '.join(plan)}")
+    return failures
+
+
+def check_upgrade():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(LEGACY_SCHEMA)
+    version = apply_migrations(conn, VAULT_MIGRATIONS)
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    rows = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    backfilled = tuple(conn.execute("SELECT product_count, golden_count, profit_sum FROM niche_stats").fetchone())
+    ok = version == current_version(conn) == VAULT_MIGRATIONS[-1][0] and rows == 2 \
+        and "idx_products_golden_created" in indexes and backfilled == (2, 1, 43.5)
+    print(f"[{'OK' if ok else 'FAIL'}] in-place upgrade      v0 -> v{version}, {len(indexes)} indexes, "
+          f"{rows} rows kept, niche_stats backfilled {backfilled}")
+    # הרצה חוזרת לא עושה כלום
+    ok = ok and apply_migrations(conn, VAULT_MIGRATIONS) == version
+    return not ok
+
+
+def main():
+    conn = sqlite3.connect(":memory:")
+    apply_migrations(conn, VAULT_MIGRATIONS)
+    failures = check_plans(conn) + check_upgrade()
+    if failures:
+        print(f"{failures} check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
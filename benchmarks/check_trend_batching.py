@@ -0,0 +1,78 @@
+"""
+בדיקת הנרמול של Google Trends ב-payloads משותפים (modules.trend_cache.fetch_interest) מול גוגל מדומה:
+גוגל מנרמל כל payload למילה החזקה בו (0-100, מספרים שלמים), אז מילה חלשה ליד מילה חזקה מקבלת 0-3.
+  1. הציון (ממוצע הסדרה, כמו ב-get_google_trends) של כל מילה ב-batch זהה, עד כדי עיגול, לשליפה בודדת
+  2. כמה payloads נוספים עלו השליפות החוזרות של המילים החלשות
+
+    python -m benchmarks.check_trend_batching
+    python -m benchmarks.check_trend_batching --keywords 500 --tolerance 2
+"""
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.trend_cache import MAX_KEYWORDS_PER_PAYLOAD, fetch_interest
+
+
+class FakeGoogle:
+    """עניין אמיתי לכל מילה (סדרי גודל שונים מאוד), מוחזר כמו interest_over_time של payload"""
+
+    def __init__(self, keywords, points: int = 168, seed: int = 7):
+        rng = random.Random(seed)
+        self.truth = {}
+        for keyword in keywords:
+            scale = 10 ** rng.uniform(0, 3)
+            self.truth[keyword] = [scale * rng.uniform(0.2, 1.0) for _ in range(points)]
+        self.payloads = 0
+
+    def query(self, keywords, timeframe):
+        self.payloads += 1
+        top = max(max(self.truth[k]) for k in keywords)
+        return {k: [float(round(v * 100 / top)) for v in self.truth[k]] for k in keywords}
+
+
+def score(series):
+    return sum(series) / len(series) if series else 0.0
+
+
+def naive(raw):
+    """הנרמול הקודם: מתיחה של כל סדרה לשיא שלה בתוך ה-payload המשותף, בלי שליפה חוזרת"""
+    results = {}
+    for keyword, column in raw.items():
+        peak = max(column, default=0)
+        results[keyword] = [int(round(v * 100 / peak)) for v in column] if peak > 0 else [0] * len(column)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keywords", type=int, default=200)
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    args = parser.parse_args()
+
+    keywords = [f"keyword {i}" for i in range(args.keywords)]
+    google = FakeGoogle(keywords)
+    single = {k: score(fetch_interest([k], "now 7-d", query=google.query)[k]) for k in keywords}
+
+    google.payloads = 0
+    batched, before = {}, {}
+    for i in range(0, len(keywords), MAX_KEYWORDS_PER_PAYLOAD):
+        chunk = keywords[i:i + MAX_KEYWORDS_PER_PAYLOAD]
+        batched.update({k: score(v) for k, v in fetch_interest(chunk, "now 7-d", query=google.query).items()})
+        before.update({k: score(v) for k, v in naive(google.query(chunk, "now 7-d")).items()})
+    payloads = google.payloads - len(range(0, len(keywords), MAX_KEYWORDS_PER_PAYLOAD))
+
+    worst_before = max(abs(before[k] - single[k]) for k in keywords)
+    worst = max(abs(batched[k] - single[k]) for k in keywords)
+    ok = worst <= args.tolerance
+    print(f"shared-peak rescaling only: worst |batched - single| score = {worst_before:.1f}")
+    print(f"[{'OK' if ok else 'FAIL'}] batched vs single: worst |diff| = {worst:.2f} (tolerance {args.tolerance}), "
+          f"{len(keywords)} keywords in {payloads} payloads "
+          f"(vs {len(keywords)} single lookups)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,12 @@ from dotenv import load_dotenv
 load_dotenv("env.txt")
 
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
+# כל endpoint תואם OpenAI - למשל mock מקומי לבדיקות
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+CONTENT_CACHE_PATH = os.getenv("EMPIRE_CONTENT_CACHE", "content_cache.db")
+# תקרת טוקנים כוללת לתוכן השיווקי של הסריקות (0 = בלי תקרה)
+CONTENT_TOKEN_BUDGET = int(os.getenv("EMPIRE_CONTENT_TOKEN_BUDGET", 0)) or None
 SHOPIFY_TOKEN = os.getenv("SHOPIFY_ACCESS_TOKEN")
 SHOPIFY_URL = os.getenv("SHOPIFY_STORE_URL")
 
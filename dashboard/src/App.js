@@ -20,29 +20,71 @@ const App = () => {
   const [niche, setNiche] = useState("");
 
   // --- פונקציות תקשורת עם ה-Backend ---
+  // המלאי נשלף בעמודים (keyset cursor) ורק עם השדות שהכרטיסים מציגים
+  const fetchInventory = async () => {
+    const base = 'http://localhost:8000/api/inventory?limit=200&fields=id,title,profit,is_golden,image_path,image_thumb';
+    const items = [];
+    let url = base;
+    while (url) {
+      const res = await fetch(url);
+      items.push(...await res.json());
+      const cursor = res.headers.get('X-Next-Cursor');
+      url = cursor ? `${base}&cursor=${encodeURIComponent(cursor)}` : null;
+    }
+    return items;
+  };
+
   const fetchData = async () => {
-    const [invRes, actRes] = await Promise.all([
-      fetch('http://localhost:8000/api/inventory'),
+    const [items, actRes] = await Promise.all([
+      fetchInventory(),
       fetch('http://localhost:8000/api/actions')
     ]);
-    setInventory(await invRes.json());
+    setInventory(items);
     setActions(await actRes.json());
   };
 
-  useEffect(() => { fetchData(); }, []);
+  useEffect(() => {
+    fetchData();
+
+    // עדכונים בזמן אמת (SSE) - דלתות ברמת שורה במקום שליפה מחדש של כל הטבלה
+    const events = new EventSource('http://localhost:8000/api/events/stream');
+    let connectedOnce = false;
+    events.onopen = () => {
+      // אחרי ניתוק ארוך ייתכן שפספסנו יותר ממה שהשרת שומר - סנכרון מלא אחד
+      if (connectedOnce) fetchData();
+      connectedOnce = true;
+    };
+    events.addEventListener('product-inserted', (e) => {
+      const item = JSON.parse(e.data);
+      setInventory(prev => [item, ...prev.filter(p => p.id !== item.id)]);
+    });
+    events.addEventListener('product-purged', (e) => {
+      const { id } = JSON.parse(e.data);
+      setInventory(prev => prev.filter(p => p.id !== id));
+    });
+    events.addEventListener('image-ready', (e) => {
+      const { id, image_path, image_thumb } = JSON.parse(e.data);
+      setInventory(prev => prev.map(p => (p.id === id ? { ...p, image_path, image_thumb } : p)));
+    });
+    events.addEventListener('golden-alert', async () => {
+      const res = await fetch('http://localhost:8000/api/actions');
+      setActions(await res.json());
+    });
+    return () => events.close();
+  }, []);
 
   const startScan = async () => {
     if (!niche) return;
     setLoading(true);
+    // המוצר החדש יגיע דרך product-inserted
     await fetch(`http://localhost:8000/api/run?niche=${niche}`, { method: 'POST' });
     setNiche("");
-    await fetchData();
     setLoading(false);
   };
 
   const deleteProduct = async (id) => {
     await fetch(`http://localhost:8000/api/delete/${id}`, { method: 'DELETE' });
-    fetchData();
+    setInventory(prev => prev.filter(p => p.id !== id));
   };
 
   return (
@@ -87,7 +129,7 @@ const App = () => {
                 {inventory.map(item => (
                   <div key={item.id} className="bg-black/20 p-4 rounded-2xl border border-white/5 flex gap-4 relative group">
                     <div className="w-20 h-20 bg-white/5 rounded-xl overflow-hidden">
-                      {item.image_path ? <img src={`http://localhost:8000${item.image_path}`} alt="AI" className="w-full h-full object-cover" /> : <div className="p-6 text-white/20"><Camera /></div>}
+                      {item.image_path ? <img src={`http://localhost:8000${item.image_thumb || item.image_path}`} alt="AI" loading="lazy" width="80" height="80" className="w-full h-full object-cover" /> : <div className="p-6 text-white/20"><Camera /></div>}
                     </div>
                     <div className="flex-1">
                       <p className="font-bold text-indigo-100">{item.title}</p>
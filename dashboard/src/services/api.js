@@ -17,6 +17,20 @@ export const EmpireAPI = {
   runScan: async (niche) => {
     const response = await fetch(`${API_BASE_URL}/run?niche=${niche}`, { method: 'POST' });
     return await response.json();
+  },
+
+  // מנוי לאירועי SSE: { 'product-inserted': fn, 'product-purged': fn, ... } - מחזיר פונקציית ביטול
+  subscribe: (handlers, onReconnect) => {
+    const events = new EventSource('http://localhost:8000/api/events/stream');
+    let connectedOnce = false;
+    events.onopen = () => {
+      if (connectedOnce && onReconnect) onReconnect();
+      connectedOnce = true;
+    };
+    Object.entries(handlers).forEach(([type, handler]) =>
+      events.addEventListener(type, (e) => handler(JSON.parse(e.data)))
+    );
+    return () => events.close();
   }
 };
 import { EmpireAPI } from './services/api';
@@ -43,9 +57,14 @@ const App = () => {
 
   useEffect(() => {
     refreshData();
-    // שדרוג 1: רענון אוטומטי כל 30 שניות
-    const interval = setInterval(refreshData, 30000);
-    return () => clearInterval(interval);
+    // push בזמן אמת במקום רענון כל 30 שניות
+    return EmpireAPI.subscribe({
+      'product-inserted': (item) => setInventory(prev => [item, ...prev.filter(p => p.id !== item.id)]),
+      'product-purged': ({ id }) => setInventory(prev => prev.filter(p => p.id !== id)),
+      'image-ready': ({ id, image_path, image_thumb }) =>
+        setInventory(prev => prev.map(p => (p.id === id ? { ...p, image_path, image_thumb } : p))),
+      'golden-alert': () => EmpireAPI.getPendingActions().then(setPendingActions),
+    }, refreshData);
   }, []);
 
   // ... כאן מגיע ה-return עם ה-HTML/Tailwind שלך ...
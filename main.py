@@ -0,0 +1,128 @@
+import sys
+import logging
+import argparse
+import dataclasses
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.middleware.cors import CORSMiddleware
+
+# =================================================================
+# EMPIRE OS - אפליקציה אחת לכל המנועים
+# =================================================================
+# ליבה (כספת, התראות, SSE) בשורש, React ב-/api ו-/api/v1, ו-scout/ads/product/dashboard תחת prefix משלהם.
+# כולם על אותו engine: pool אחד, כותב אחד, EventBus אחד ותור תמונות אחד מול empire_vault_v10.db
+# ה-import זול: openai/pytrends/pandas/numpy/bs4/httpx נטענים בשימוש הראשון (modules.lazy),
+# ו-DB/תיקיות/שירותי רקע עולים ב-lifespan. בדיקת רגרסיה: python -m benchmarks.bench_startup
+# עם --workers N כל ה-workers מגישים API, אבל רק מחזיק ה-lease (modules.leader) מריץ schedulers ותמונות.
+# סריקות (ידניות ואוטונומיות) הן jobs מתמידים בטבלת jobs (modules.job_queue) שכל worker צורך - סטטוס ב-/api/jobs
+load_dotenv()
+
+from modules.engine import engine, Settings
+from modules.response_cache import ResponseCacheMiddleware
+from modules.image_derivatives import ImmutableStaticFiles
+from modules.job_queue import JobFailed, JobPending
+
+logger = logging.getLogger("EmpireOS")
+
+API_PREFIXES = ("/api", "/api/v1")
+
+
+def configure_logging(settings: Settings):
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s | %(levelname)s | [%(name)s] | %(message)s',
+        handlers=[logging.FileHandler(settings.log_file), logging.StreamHandler(sys.stdout)]
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """מיגרציות, תיקיות ושירותי רקע - כשהשרת עולה, לא כשהמודול מיובא"""
+    engine.initialize()
+    logger.info("EmpireOS starting up shared engine and background services...")
+    await engine.start()
+    try:
+        yield
+    finally:
+        await engine.stop()
+
+
+async def job_pending_handler(request: Request, exc: JobPending):
+    """סריקה שעוד בתור (wait=false / עבר JOB_WAIT) - 202 עם כתובת הסטטוס שלה"""
+    location = f"{API_PREFIXES[0]}/jobs/{exc.job_id}"
+    return JSONResponse(status_code=202, content={"status": "queued", "job_id": exc.job_id, "href": location},
+                        headers={"Location": location})
+
+
+async def job_failed_handler(request: Request, exc: JobFailed):
+    """job שנדחה (קלט לא תקין) -> 400; נגמרו הניסיונות -> 500. בשניהם הוא ב-dead-letter"""
+    return JSONResponse(status_code=400 if exc.rejected else 500,
+                        content={"status": "failed", "detail": str(exc), "job_id": exc.job_id})
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """application factory - גם עבור uvicorn --factory (כל worker בונה את האפליקציה שלו)"""
+    if settings is not None:
+        engine.configure(settings)
+    configure_logging(engine.settings)
+
+    # ה-routers רושמים את שירותי הרקע שלהם ב-engine בזמן ה-import
+    import main_controller
+    from modules import market_scout, ads_manager, product_engine
+    from dashboard import app as dashboard
+
+    app = FastAPI(title="EmpireOS Grand Master", version=main_controller.SystemConfig.VERSION, lifespan=lifespan)
+    app.add_exception_handler(JobPending, job_pending_handler)
+    app.add_exception_handler(JobFailed, job_failed_handler)
+    app.add_middleware(CORSMiddleware, allow_origins=engine.settings.cors_origins, allow_methods=["*"],
+                       allow_headers=["*"], expose_headers=["X-Next-Cursor", "Link"])
+    app.add_middleware(ResponseCacheMiddleware, cache=engine.response_cache,
+                       paths=main_controller.CACHED_PATHS + tuple(
+                           prefix + path for prefix in API_PREFIXES for path in main_controller.FRONTEND_CACHED_PATHS))
+    # קבצים עם hash תוכן בשם (תמונות ונגזרות) מוגשים עם Cache-Control ארוך + immutable
+    app.mount("/static", ImmutableStaticFiles(directory=engine.settings.static_dir), name="static")
+
+    app.include_router(main_controller.router)
+    for prefix in API_PREFIXES:
+        app.include_router(main_controller.frontend_router, prefix=prefix)
+    for module in (market_scout, ads_manager, product_engine, dashboard):
+        app.include_router(module.router)
+    return app
+
+
+def main():
+    import uvicorn
+
+    defaults = Settings()
+    parser = argparse.ArgumentParser(description="EmpireOS - all engines behind one server")
+    parser.add_argument("--host", default=defaults.host)
+    parser.add_argument("--port", type=int, default=defaults.port)
+    parser.add_argument("--workers", type=int, default=defaults.workers,
+                        help="uvicorn worker processes (EMPIRE_WORKERS); כולם חולקים את אותה כספת (WAL), "
+                             "ושירותי הרקע רצים רק ב-worker שנבחר כמנהיג")
+    args = parser.parse_args()
+    settings = dataclasses.replace(defaults, host=args.host, port=args.port, workers=args.workers)
+
+    print(f"""
+    #######################################################
+    #          EMPIRE OS - UNIFIED COMMAND CENTER         #
+    #    -----------------------------------------------  #
+    #    [*] ASSETS: http://localhost:{settings.port}/inventory
+    #    [*] VAULT: {settings.db_path}
+    #    [*] WORKERS: {settings.workers}
+    #######################################################
+    """)
+    if settings.workers > 1:
+        # כל worker מייבא את המודול ובונה אפליקציה משלו - ההגדרות עוברות דרך משתני הסביבה
+        uvicorn.run("main:create_app", factory=True, host=settings.host, port=settings.port,
+                    workers=settings.workers, log_level="info")
+    else:
+        uvicorn.run(create_app(settings), host=settings.host, port=settings.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,138 +1,66 @@
 import os
-import sqlite3
 import random
-import uvicorn
-import openai
-import requests
 import logging
 import asyncio
-import json
-import sys
-import shutil
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Union
-from bs4 import BeautifulSoup
-from fastapi import FastAPI, Request, Query, HTTPException, BackgroundTasks, status
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from typing import Optional, Dict, Any
+from fastapi import APIRouter, Request, Response, Query, Header, HTTPException
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel, Field, validator
-from pytrends.request import TrendReq
-from dotenv import load_dotenv
+from modules.engine import engine
+from modules.job_queue import JobQueue
+from modules.pagination import KeysetPage
+from modules.scheduler import NicheScheduler, load_niche_catalog
+from modules.trend_cache import trend_cache, TrendLookupError
+from modules.economics import PricingRules, load_pricing, reprice_all, save_pricing
+from ai.content_gen import content_generator
 
 # =================================================================
-# 1. CORE SYSTEM CONFIGURATION & ENVIRONMENT
+# 1. CORE SYSTEM CONFIGURATION
 # =================================================================
-load_dotenv()
-
 class SystemConfig:
-    """הגדרות ליבה של האימפריה - ריכוז כל הפרמטרים במקום אחד"""
+    """הגדרות ליבה של האימפריה - ריכוז כל הפרמטרים במקום אחד (תהליך/DB - Settings ב-modules.engine)"""
     VERSION = "10.0.0-GRANDMASTER"
-    DB_PATH = 'empire_vault_v10.db'
-    LOG_FILE = "empire_master.log"
-    
-    # Paths
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    DASHBOARD_DIR = os.path.join(BASE_DIR, "dashboard")
-    IMAGES_DIR = os.path.join(DASHBOARD_DIR, "assets", "generated")
     
     # Business Logic Constants
     SHIPPING_COST = 6.25
+    ADS_COST_ESTIMATE = 10.0
     AD_TEST_MULTIPLIER = 3.5
     MIN_PROFIT_MARGIN = 0.32
     GOLDEN_PROFIT_LIMIT = 28.0
     GOLDEN_DEMAND_LIMIT = 82
+    PRICING = PricingRules(shipping=SHIPPING_COST, ads=ADS_COST_ESTIMATE, margin=MIN_PROFIT_MARGIN,
+                           golden_profit=GOLDEN_PROFIT_LIMIT, golden_demand=GOLDEN_DEMAND_LIMIT,
+                           budget_multiplier=AD_TEST_MULTIPLIER)
+    # ברירות המחדל בלבד - עדכונים מ-/api/economics/reprice נשמרים ב-pricing_overrides תחת PRICING_NAME
+    PRICING_NAME = "vault"
+    # המוצרים שהחוקים האלה מתמחרים (ליבה + dashboard); ADS / SCOUT / product_engine - חוקים משלהם
+    PRICED_SOURCES = ("MANUAL", "AUTONOMOUS")
     
     # Automation
-    AUTO_SCAN_INTERVAL = 3600 * 4 # 4 Hours
-    DEFAULT_NICHES = ["Cyber Security Tools", "Biohacking Gear", "Smart Home AI", "Eco-Transport"]
-
-# אתחול לוגים ברמה גבוהה
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)s | [%(name)s] | %(message)s',
-    handlers=[logging.FileHandler(SystemConfig.LOG_FILE), logging.StreamHandler(sys.stdout)]
-)
-logger = logging.getLogger("EmpireOS_GrandMaster")
-
-# יצירת מבנה תיקיות פיזי
-for path in [SystemConfig.DASHBOARD_DIR, SystemConfig.IMAGES_DIR]:
-    if not os.path.exists(path):
-        os.makedirs(path, exist_ok=True)
-
-app = FastAPI(title="EmpireOS Grand Master", version=SystemConfig.VERSION)
-app.mount("/static", StaticFiles(directory=SystemConfig.DASHBOARD_DIR), name="static")
-templates = Jinja2Templates(directory=SystemConfig.DASHBOARD_DIR)
+    AUTO_SCAN_INTERVAL = int(os.getenv("EMPIRE_SCAN_INTERVAL", 60 * 15)) # ברירת מחדל לכל נישה
+    NICHE_SCAN_INTERVALS: Dict[str, int] = {} # אינטרוול ייעודי לנישה מסוימת
+    SCAN_WORKERS = int(os.getenv("EMPIRE_SCAN_WORKERS", 4))
+    SCAN_QUEUE_SIZE = 16
+    SCAN_JITTER = 0.1
+    MANUAL_SCAN_WORKERS = 4 # סריקות מהממשק שרצות יחד (כל ה-workers) - השאר מחכות בתור
+    JOB_WAIT = 30.0 # כמה זמן בקשה מחכה לתוצאת הסריקה לפני 202 + job_id
+    NICHE_CATALOG = os.getenv("EMPIRE_NICHE_CATALOG") # קובץ נישות (שורה לכל נישה) במקום DEFAULT_NICHES
+    # scheduler יחיד לכל האפליקציה - כולל הנישות של ה-dashboard (Biohacking / Smart Home כבר מכוסות כאן)
+    DEFAULT_NICHES = ["Cyber Security Tools", "Biohacking Gear", "Smart Home AI", "Eco-Transport",
+                      "Pet Tech", "Eco Gadgets", "AI Tools"]
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+logger = logging.getLogger("EmpireOS_GrandMaster")
 
-# =================================================================
-# 2. DATABASE ARCHITECTURE & ORM LIGHT
-# =================================================================
-class DatabaseManager:
-    """ניהול כל האינטראקציה עם מסד הנתונים"""
-    @staticmethod
-    def get_connection():
-        return sqlite3.connect(SystemConfig.DB_PATH)
+# routes הליבה (כספת, התראות, SSE) - מורכבים יחד עם שאר המנועים ב-main.create_app
+router = APIRouter()
+templates = Jinja2Templates(directory=engine.settings.static_dir)
 
-    @classmethod
-    def initialize(cls):
-        conn = cls.get_connection()
-        cursor = conn.cursor()
-        
-        # טבלת מוצרים - המחסן המרכזי
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                niche TEXT,
-                cost REAL,
-                suggested_price REAL,
-                profit REAL,
-                demand_score INTEGER,
-                competition TEXT,
-                ad_budget REAL,
-                url TEXT,
-                ai_prompt TEXT,
-                ad_copy_he TEXT,
-                image_path TEXT,
-                is_golden INTEGER DEFAULT 0,
-                source_type TEXT,
-                trend_rating TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # טבלת התראות (שדרוג 3)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS system_alerts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                severity TEXT,
-                message TEXT,
-                is_read INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # טבלת היסטוריית סריקות
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scan_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                niche TEXT,
-                results_found INTEGER,
-                status TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        logger.info("Database Schema deployed successfully.")
-
-DatabaseManager.initialize()
+# endpoints שה-dashboard סוקר כל הזמן - מוגשים דרך ResponseCacheMiddleware
+CACHED_PATHS = ("/api/vault", "/api/alerts", "/api/stats/global")
 
 # =================================================================
-# 3. ADVANCED BUSINESS INTELLIGENCE ENGINE
+# 2. ADVANCED BUSINESS INTELLIGENCE ENGINE
 # =================================================================
 class EmpireIntelligence:
     """המנוע שמקבל החלטות, מנתח טרנדים ומפעיל AI"""
@@ -141,354 +69,370 @@ class EmpireIntelligence:
     def get_google_trends(keyword: str) -> Dict[str, Any]:
         """ניתוח טרנדים אמיתי (שדרוג)"""
         try:
-            pytrends = TrendReq(hl='en-US', tz=360)
-            pytrends.build_payload([keyword], timeframe='now 7-d')
-            interest = pytrends.interest_over_time()
-            if not interest.empty:
-                score = int(interest[keyword].mean())
+            interest = trend_cache.get_interest(keyword, timeframe='now 7-d')
+            if interest:
+                score = int(sum(interest) / len(interest))
                 status = "EXPLOSIVE" if score > 80 else "GROWING" if score > 50 else "STABLE"
                 return {"score": score, "status": status}
             return {"score": 50, "status": "STABLE"}
-        except Exception as e:
+        except TrendLookupError as e:
             logger.warning(f"Trends API failure: {e}")
             return {"score": random.randint(45, 65), "status": "UNCERTAIN"}
 
     @classmethod
     async def generate_dalle_asset(cls, product_id: int, prompt: str):
-        """שדרוג 2: יצירת תמונה מבוססת בינה מלאכותית"""
-        if not openai.api_key:
+        """שדרוג 2: יצירת תמונה מבוססת בינה מלאכותית - job בתור ה-ImagePipeline"""
+        if not engine.settings.openai_api_key:
             return None
-        
-        try:
-            logger.info(f"Requesting DALL-E asset for Product ID: {product_id}")
-            response = await asyncio.to_thread(
-                openai.Image.create,
-                prompt=prompt,
-                n=1,
-                size="512x512"
-            )
-            image_url = response['data'][0]['url']
-            
-            # הורדת התמונה ושמירתה
-            img_res = requests.get(image_url, stream=True)
-            if img_res.status_code == 200:
-                file_name = f"empire_prod_{product_id}.png"
-                local_path = os.path.join(SystemConfig.IMAGES_DIR, file_name)
-                with open(local_path, 'wb') as f:
-                    shutil.copyfileobj(img_res.raw, f)
-                
-                # עדכון DB
-                conn = DatabaseManager.get_connection()
-                conn.execute("UPDATE products SET image_path = ? WHERE id = ?", 
-                             (f"/static/assets/generated/{file_name}", product_id))
-                conn.commit()
-                conn.close()
-                logger.info(f"Asset for #{product_id} saved to {local_path}")
-        except Exception as e:
-            logger.error(f"DALL-E Asset Error: {e}")
+        logger.info(f"Queueing DALL-E asset for Product ID: {product_id}")
+        return await engine.images.submit(product_id, prompt)
 
     @staticmethod
-    def calculate_economics(cost: float, demand: int) -> Dict[str, Any]:
-        """חישובים פיננסיים מתקדמים"""
-        price = (cost + SystemConfig.SHIPPING_COST + 10) / (1 - SystemConfig.MIN_PROFIT_MARGIN)
-        profit = price - cost - SystemConfig.SHIPPING_COST - 10
-        is_golden = 1 if profit >= SystemConfig.GOLDEN_PROFIT_LIMIT and demand >= SystemConfig.GOLDEN_DEMAND_LIMIT else 0
-        
-        return {
-            "suggested_price": round(price, 2),
-            "profit": round(profit, 2),
-            "ad_budget": round(profit * SystemConfig.AD_TEST_MULTIPLIER, 2),
-            "is_golden": is_golden
-        }
+    async def pricing() -> PricingRules:
+        """חוקי התמחור הנוכחיים - ברירות המחדל + העדכונים בכספת (זהים בכל ה-workers)"""
+        return await engine.pool.run(load_pricing, SystemConfig.PRICING_NAME, SystemConfig.PRICING)
+
+    @classmethod
+    async def calculate_economics(cls, cost: float, demand: int) -> Dict[str, Any]:
+        """חישובים פיננסיים מתקדמים (לקטלוג שלם - reprice_all, וקטורי)"""
+        return (await cls.pricing()).quote(cost, demand)
 
 # =================================================================
-# 4. BACKGROUND WORKERS (שדרוג 1: אוטונומיה מלאה)
+# 3. BACKGROUND WORKERS (שדרוג 1: אוטונומיה מלאה)
 # =================================================================
-async def autonomous_scout_worker():
-    """לופ סריקה אוטונומי - הלב הפועם של המערכת"""
-    while True:
-        try:
-            niche = random.choice(SystemConfig.DEFAULT_NICHES)
-            logger.info(f"AUTONOMOUS SCAN STARTING: Target Niche -> {niche}")
-            
-            # סימולציית סריקת שוק
-            trends = EmpireIntelligence.get_google_trends(niche)
-            cost = random.uniform(18.0, 60.0)
-            econ = EmpireIntelligence.calculate_economics(cost, trends['score'])
-            
-            title = f"Industrial {niche} Solution v{random.randint(1,9)}"
-            ad_copy = f"🚀 בלעדי: {title}! רווח נקי של ${econ['profit']}. המלאי אוזל!"
-            prompt = f"Futuristic {niche} product, high-tech aesthetic, cinematic lighting, 8k"
-            
-            conn = DatabaseManager.get_connection()
-            c = conn.cursor()
-            c.execute('''
-                INSERT INTO products (title, niche, cost, suggested_price, profit, demand_score, 
-                                    competition, ad_budget, ai_prompt, ad_copy_he, is_golden, 
-                                    source_type, trend_rating)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (title, niche, cost, econ['suggested_price'], econ['profit'], trends['score'],
-                  "Low", econ['ad_budget'], prompt, ad_copy, econ['is_golden'], "AUTONOMOUS", trends['status']))
-            
-            new_id = c.lastrowid
-            conn.commit()
-            
-            # יצירת התראה אם זה מוצר זהב (שדרוג 3)
-            if econ['is_golden']:
-                c.execute("INSERT INTO system_alerts (severity, message) VALUES (?, ?)",
-                         ("GOLDEN", f"New Golden Opportunity Discovered: {title}"))
-                conn.commit()
-            
-            conn.close()
-            
-            # הפעלת DALL-E (שדרוג 2)
-            asyncio.create_task(EmpireIntelligence.generate_dalle_asset(new_id, prompt))
-            
-            logger.info(f"AUTONOMOUS SCAN COMPLETED: Product #{new_id} Secured.")
-            
-        except Exception as e:
-            logger.error(f"Worker Error: {e}")
-            
-        await asyncio.sleep(SystemConfig.AUTO_SCAN_INTERVAL)
+PRODUCT_INSERT_SQL = '''
+    INSERT INTO products (title, niche, cost, suggested_price, profit, demand_score, 
+                        competition, ad_budget, ai_prompt, ad_copy_he, is_golden, 
+                        source_type, trend_rating)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+async def publish_product_inserted(product_id: int):
+    """דחיפת השורה החדשה (בלי העמודות הכבדות) + התראת זהב למנויי ה-SSE"""
+    await engine.publish_product(product_id, VAULT_PAGE.light_columns)
+
+async def autonomous_scout_worker(niche: str):
+    """סריקה אוטונומית של נישה אחת - מופעלת במקביל לכל הנישות ע"י ה-NicheScheduler"""
+    logger.info(f"AUTONOMOUS SCAN STARTING: Target Niche -> {niche}")
+    
+    # pytrends חוסם - רץ ב-thread כדי לא לעצור את שאר ה-workers
+    trends = await asyncio.to_thread(EmpireIntelligence.get_google_trends, niche)
+    cost = random.uniform(18.0, 60.0)
+    econ = await EmpireIntelligence.calculate_economics(cost, trends['score'])
+    
+    title = f"Industrial {niche} Solution v{random.randint(1,9)}"
+    ad_copy = await content_generator.ad_copy(
+        title, econ['suggested_price'], fallback=f"🚀 בלעדי: {title}! רווח נקי של ${econ['profit']}. המלאי אוזל!")
+    prompt = f"Futuristic {niche} product, high-tech aesthetic, cinematic lighting, 8k"
+    
+    statements = [(PRODUCT_INSERT_SQL,
+                   (title, niche, cost, econ['suggested_price'], econ['profit'], trends['score'],
+                    "Low", econ['ad_budget'], prompt, ad_copy, econ['is_golden'], "AUTONOMOUS", trends['status']))]
+    
+    # יצירת התראה אם זה מוצר זהב (שדרוג 3) - באותה טרנזקציה כמו המוצר
+    if econ['is_golden']:
+        statements.append(("INSERT INTO system_alerts (severity, message) VALUES (?, ?)",
+                           ("GOLDEN", f"New Golden Opportunity Discovered: {title}")))
+    
+    new_id = (await engine.writer.execute_group(statements))[0]
+    
+    await publish_product_inserted(new_id)
+    
+    # הפעלת DALL-E (שדרוג 2)
+    await EmpireIntelligence.generate_dalle_asset(new_id, prompt)
+    
+    logger.info(f"AUTONOMOUS SCAN COMPLETED: Product #{new_id} Secured.")
+    return new_id
+
+async def autonomous_scan_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": await autonomous_scout_worker(payload["niche"])}
+
+engine.jobs.register("scan.autonomous", autonomous_scan_job, concurrency=SystemConfig.SCAN_WORKERS)
+
+async def schedule_autonomous_scan(niche: str):
+    """ה-scheduler מחליט מתי; הסריקה עצמה היא job מתמיד (נישה שכבר בתור לא נכנסת פעמיים)"""
+    await engine.jobs.run("scan.autonomous", {"niche": niche}, priority=JobQueue.BACKGROUND,
+                          dedupe_key=niche, wait=None)
+
+# כל הנישות נסרקות במקביל, כל אחת באינטרוול שלה (+jitter), דרך מאגר workers חסום
+scout_scheduler = NicheScheduler(
+    schedule_autonomous_scan,
+    niches=load_niche_catalog(SystemConfig.NICHE_CATALOG) if SystemConfig.NICHE_CATALOG else SystemConfig.DEFAULT_NICHES,
+    interval=SystemConfig.AUTO_SCAN_INTERVAL,
+    intervals=SystemConfig.NICHE_SCAN_INTERVALS,
+    workers=SystemConfig.SCAN_WORKERS,
+    queue_size=SystemConfig.SCAN_QUEUE_SIZE,
+    jitter=SystemConfig.SCAN_JITTER,
+    # הנישות שהגיע זמנן נשלפות מגוגל טרנדס יחד, 5 מילים ב-payload, לפני שה-workers מתחילים
+    prefetch=lambda niches: asyncio.to_thread(trend_cache.get_interest_many, niches, 'now 7-d'),
+)
+engine.add_service("scout_scheduler", scout_scheduler.start, scout_scheduler.stop)
 
 # =================================================================
-# 5. API ROUTES & CONTROLLERS
+# 4. API ROUTES & CONTROLLERS
 # =================================================================
 
-@app.on_event("startup")
-async def on_startup():
-    logger.info("EmpireOS starting up background services...")
-    asyncio.create_task(autonomous_scout_worker())
-
-@app.get("/", response_class=HTMLResponse)
+@router.get("/", response_class=HTMLResponse)
 async def serve_dashboard(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
-@app.get("/inventory", response_class=HTMLResponse)
+@router.get("/inventory", response_class=HTMLResponse)
 async def serve_inventory(request: Request):
     return templates.TemplateResponse("inventory.html", {"request": request})
 
-@app.post("/api/scan/manual")
-async def manual_scan(niche: str = Query(...)):
-    """סריקה ידנית יזומה מהממשק"""
-    logger.info(f"Manual scan triggered for niche: {niche}")
-    trends = EmpireIntelligence.get_google_trends(niche)
+async def manual_scan_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    niche = payload["niche"]
+    trends = await asyncio.to_thread(EmpireIntelligence.get_google_trends, niche)
     cost = random.uniform(20, 50)
-    econ = EmpireIntelligence.calculate_economics(cost, trends['score'])
+    econ = await EmpireIntelligence.calculate_economics(cost, trends['score'])
     
-    conn = DatabaseManager.get_connection()
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO products (title, niche, cost, suggested_price, profit, demand_score, 
-                            competition, ad_budget, ai_prompt, ad_copy_he, is_golden, 
-                            source_type, trend_rating)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (f"Manual Discovery: {niche}", niche, cost, econ['suggested_price'], econ['profit'], 
-          trends['score'], "Medium", econ['ad_budget'], "Product shot", "Ready to launch", 
-          econ['is_golden'], "MANUAL", trends['status']))
+    new_id = await engine.writer.execute(PRODUCT_INSERT_SQL,
+        (f"Manual Discovery: {niche}", niche, cost, econ['suggested_price'], econ['profit'], 
+         trends['score'], "Medium", econ['ad_budget'], "Product shot", "Ready to launch", 
+         econ['is_golden'], "MANUAL", trends['status']))
     
-    new_id = c.lastrowid
-    conn.commit()
-    conn.close()
+    await publish_product_inserted(new_id)
+    return {"id": new_id, "is_golden": bool(econ['is_golden'])}
+
+engine.jobs.register("scan.manual", manual_scan_job, concurrency=SystemConfig.MANUAL_SCAN_WORKERS)
+
+@router.post("/api/scan/manual")
+async def manual_scan(niche: str = Query(...), wait: bool = True):
+    """סריקה ידנית יזומה מהממשק - job בתור (202 + job_id אם wait=false או שלא הסתיימה בזמן)"""
+    logger.info(f"Manual scan triggered for niche: {niche}")
+    result = await engine.jobs.run("scan.manual", {"niche": niche}, wait=SystemConfig.JOB_WAIT if wait else 0)
+    return {"status": "Success", **result}
+
+# עמודות הטקסט הכבדות נשלחות רק כשמבקשים אותן ב-fields=
+VAULT_PAGE = KeysetPage(
+    table="products",
+    columns=("id", "title", "niche", "cost", "suggested_price", "profit", "demand_score",
+             "competition", "ad_budget", "url", "ai_prompt", "ad_copy_he", "image_path",
+             "image_thumb", "image_webp", "is_golden", "source_type", "trend_rating", "created_at"),
+    sort_keys=("is_golden", "created_at", "id"),
+    heavy_columns=("ai_prompt", "ad_copy_he"),
+)
+
+@router.get("/api/vault")
+async def get_vault_data(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(VAULT_PAGE.default_limit, ge=1, le=VAULT_PAGE.max_limit),
+    niche: Optional[str] = None,
+    is_golden: Optional[bool] = None,
+    source_type: Optional[str] = None,
+    min_profit: Optional[float] = None,
+    max_profit: Optional[float] = None,
+    fields: Optional[str] = None,
+):
+    """שליפת נכסים מהכספת - עמוד אחד בכל פעם (keyset), עם פילטרים ו-projection"""
+    try:
+        sql, params, limit = VAULT_PAGE.build(fields=fields, cursor=cursor, limit=limit, filters=[
+            ("niche", "=", niche),
+            ("is_golden", "=", None if is_golden is None else int(is_golden)),
+            ("source_type", "=", source_type),
+            ("profit", ">=", min_profit),
+            ("profit", "<=", max_profit),
+        ])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {"status": "Success", "id": new_id, "is_golden": bool(econ['is_golden'])}
-
-@app.get("/api/vault")
-async def get_vault_data():
-    """שליפת כל הנכסים מהכספת"""
-    conn = DatabaseManager.get_connection()
-    conn.row_factory = sqlite3.Row
-    data = conn.execute("SELECT * FROM products ORDER BY is_golden DESC, created_at DESC").fetchall()
-    conn.close()
-    return [dict(row) for row in data]
-
-@app.get("/api/alerts")
+    rows, next_cursor = VAULT_PAGE.paginate(await engine.pool.fetch_all(sql, params), limit)
+    response.headers.update(VAULT_PAGE.link_headers(next_cursor, request.url))
+    return rows
+
+@router.get("/api/alerts")
 async def get_system_alerts():
     """שליפת התראות (שדרוג 3)"""
-    conn = DatabaseManager.get_connection()
-    conn.row_factory = sqlite3.Row
-    data = conn.execute("SELECT * FROM system_alerts ORDER BY created_at DESC LIMIT 20").fetchall()
-    conn.close()
-    return [dict(row) for row in data]
+    return await engine.pool.fetch_all("SELECT * FROM system_alerts ORDER BY created_at DESC LIMIT 20")
 
-@app.get("/api/stats/global")
+@router.get("/api/stats/global")
 async def get_global_stats():
-    """חישוב נתונים מסכמים לאימפריה"""
-    conn = DatabaseManager.get_connection()
+    """נתונים מסכמים לאימפריה - קריאה מ-niche_stats (מתוחזקת ע"י triggers) במקום סריקות מלאות"""
+    niches = await engine.pool.fetch_all('''
+        SELECT NULLIF(niche, '') AS niche, product_count AS count, golden_count,
+               profit_sum, demand_sum
+        FROM niche_stats ORDER BY niche_stats.niche
+    ''')
     stats = {}
-    stats['total_assets'] = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
-    stats['golden_wins'] = conn.execute("SELECT COUNT(*) FROM products WHERE is_golden = 1").fetchone()[0]
-    stats['total_profit_potential'] = round(conn.execute("SELECT SUM(profit) FROM products").fetchone()[0] or 0, 2)
+    stats['total_assets'] = sum(n['count'] for n in niches)
+    stats['golden_wins'] = sum(n['golden_count'] for n in niches)
+    stats['total_profit_potential'] = round(sum(n['profit_sum'] for n in niches), 2)
     
     # חלוקה לפי נישות
-    conn.row_factory = sqlite3.Row
-    stats['niche_analysis'] = [dict(r) for r in conn.execute("SELECT niche, COUNT(*) as count FROM products GROUP BY niche")]
-    
-    conn.close()
+    stats['niche_analysis'] = [
+        {"niche": n['niche'], "count": n['count'], "golden_count": n['golden_count'],
+         "avg_demand": round(n['demand_sum'] / n['count'], 1)}
+        for n in niches
+    ]
     return stats
 
-@app.delete("/api/purge/{item_id}")
+@router.post("/api/stats/rebuild")
+async def rebuild_global_stats():
+    """repair: בניה מחדש של טבלת הסיכומים במקרה של סטייה"""
+    niches = await engine.rebuild_niche_stats()
+    logger.info(f"niche_stats rebuilt: {niches} niches")
+    return {"status": "Rebuilt", "niches": niches}
+
+@router.post("/api/economics/reprice")
+async def reprice_catalogue(shipping: Optional[float] = Query(None, ge=0), ads: Optional[float] = Query(None, ge=0),
+                            margin: Optional[float] = Query(None, ge=0, lt=1)):
+    """תמחור מחדש של מוצרי הכספת (MANUAL / AUTONOMOUS) - עם חוקי התמחור הנוכחיים, או אחרי עדכון
+    משלוח/פרסום/מרווח. העדכון נשמר בכספת, כך שכל ה-workers מתמחרים סריקות חדשות לפי אותם חוקים"""
+    changes = {k: v for k, v in {"shipping": shipping, "ads": ads, "margin": margin}.items() if v is not None}
+
+    def _reprice(conn):
+        if changes:
+            save_pricing(conn, SystemConfig.PRICING_NAME, changes)
+        rules = load_pricing(conn, SystemConfig.PRICING_NAME, SystemConfig.PRICING)
+        sources = SystemConfig.PRICED_SOURCES
+        return reprice_all(conn, rules, where=f"source_type IN ({', '.join('?' * len(sources))})", params=sources)
+
+    stats = await engine.pool.run_transaction(_reprice)
+    if stats["updated"]:
+        await engine.events.publish("catalogue-repriced", stats)
+    return {"status": "Repriced", **stats}
+
+@router.delete("/api/purge/{item_id}")
 async def purge_item(item_id: int):
-    conn = DatabaseManager.get_connection()
-    conn.execute("DELETE FROM products WHERE id = ?", (item_id,))
-    conn.commit()
-    conn.close()
+    await engine.purge(item_id)
     return {"status": "Purged"}
 
-@app.get("/system/health")
+@router.get("/api/events/stream")
+async def stream_events(request: Request, last_event_id: Optional[str] = Header(None)):
+    """SSE: product-inserted / product-purged / golden-alert / image-ready"""
+    return StreamingResponse(engine.events.stream(request, last_event_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/api/scheduler/metrics")
+async def get_scheduler_metrics():
+    """תפוקת הסורק: scans/minute, עומק תור, workers פעילים ומצב כל נישה"""
+    return scout_scheduler.metrics()
+
+@router.get("/system/health")
 async def health():
     return {
         "status": "OPERATIONAL",
         "version": SystemConfig.VERSION,
-        "database": os.path.exists(SystemConfig.DB_PATH),
+        **await engine.health(),
+        "scheduler": {k: v for k, v in scout_scheduler.metrics().items() if k != "per_niche"},
         "server_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
 
+@router.get("/system/leader")
+async def leader():
+    """איזה worker מריץ את שירותי הרקע (כל worker עונה - מתוך טבלת leases)"""
+    lease = await engine.pool.fetch_one("SELECT holder, term, expires_at, acquired_at, renewed_at FROM leases "
+                                        "WHERE name = ?", (engine.lease.name,))
+    return {"this_worker": engine.lease.stats(), "lease": lease}
+
 # =================================================================
-# 6. ENGINE STARTUP
+# 5. COMMAND CENTER API (React - /api ו-/api/v1)
 # =================================================================
-if __name__ == "__main__":
-    banner = f"""
-    #######################################################
-    #          EMPIRE OS - GRAND MASTER v{SystemConfig.VERSION}        #
-    #    -----------------------------------------------  #
-    #    [*] ASSETS: http://localhost:8000/inventory      #
-    #    [*] MONITORING: ACTIVE                           #
-    #    [*] AI WORKERS: DEPLOYED                         #
-    #######################################################
-    """
-    print(banner)
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
-from fastapi.middleware.cors import CORSMiddleware
-
-# אפשור לריאקט "לדבר" עם פייתון (CORS)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], # בפיתוח מאפשרים הכל
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# הגשת התמונות שה-AI מייצר בתיקייה static
-app.mount("/images", StaticFiles(directory="backend/static"), name="images")
-from fastapi.middleware.cors import CORSMiddleware
-
-# הגדרת CORS - קריטי כדי שהדפדפן לא יחסום את החיבור
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], # בייצור נגביל את זה לכתובת של ה-Frontend
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# אותה כספת, בלי prefix משלו: main.create_app מרכיב אותו פעמיים
+frontend_router = APIRouter()
+
+FRONTEND_CACHED_PATHS = ("/inventory", "/actions")
+
+@frontend_router.get("/inventory")
+async def get_inventory(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(VAULT_PAGE.default_limit, ge=1, le=VAULT_PAGE.max_limit),
+    niche: Optional[str] = None,
+    is_golden: Optional[bool] = None,
+    source_type: Optional[str] = None,
+    min_profit: Optional[float] = None,
+    max_profit: Optional[float] = None,
+    fields: Optional[str] = None,
+):
+    return await get_vault_data(request, response, cursor, limit, niche, is_golden, source_type,
+                                min_profit, max_profit, fields)
+
+@frontend_router.get("/actions")
+async def get_actions():
+    return await engine.pool.fetch_all("SELECT * FROM pending_actions WHERE status = 'pending'")
+
+# --- תור ה-jobs (סריקות) + תור התמונות: עומק, dead-letter ותפוקה ---
+JOBS_PAGE = KeysetPage(
+    table="jobs",
+    columns=("id", "type", "payload", "priority", "status", "attempts", "max_attempts", "run_at",
+             "visible_until", "worker", "dedupe_key", "result", "last_error", "rejected",
+             "created_at", "started_at", "finished_at"),
+    sort_keys=("id",),
+    heavy_columns=("payload", "result"),
 )
 
-@app.get("/api/v1/inventory")
-async def get_inventory():
-    # כאן הקוד ששולף מה- empire_unified.db
-    return inventory_items
-import os
-import sqlite3
-import random
-import uvicorn
-import openai
-import requests
-import asyncio
-from fastapi import FastAPI, Request, Query, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse, HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.middleware.cors import CORSMiddleware
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
-app = FastAPI()
-
-# פותר בעיות תקשורת בין הדפדפן לשרת
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
-
-# חיבור לתיקיות
-os.makedirs("static/images", exist_ok=True)
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-DB_PATH = 'empire_master.db'
-
-# --- 1. אתחול מסד נתונים (כל הטבלאות מכל הקודים) ---
-def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        # טבלת מוצרים
-        c.execute('''CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT, niche TEXT, cost REAL, price REAL, profit REAL,
-            demand INTEGER, image_path TEXT, ad_copy TEXT, is_golden INTEGER,
-            scan_type TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-        # טבלת פעולות (מהדגם השני)
-        c.execute('''CREATE TABLE IF NOT EXISTS pending_actions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            type TEXT, title TEXT, desc TEXT, status TEXT DEFAULT 'pending')''')
-        conn.commit()
-
-init_db()
-
-# --- 2. לוגיקת AI וניתוח (מכל השיחה) ---
-async def generate_ai_assets(p_id, title, profit):
+@frontend_router.get("/jobs")
+async def get_jobs_status():
+    """ספירה לפי סוג/סטטוס, גיל ה-job הוותיק בתור, תפוקה וזמני המתנה/ריצה ב-5 הדקות האחרונות"""
+    return {**await engine.jobs.stats(), "images": (await engine.images.stats())["jobs"]}
+
+@frontend_router.get("/jobs/list")
+async def list_jobs(
+    request: Request,
+    response: Response,
+    status: Optional[str] = Query(None, pattern="^(queued|running|done|dead)$"),
+    type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(JOBS_PAGE.default_limit, ge=1, le=JOBS_PAGE.max_limit),
+    fields: Optional[str] = None,
+):
+    """ה-jobs האחרונים (status=dead - ה-dead-letter), עמוד אחד בכל פעם"""
     try:
-        # DALL-E (שדרוג התמונות)
-        response = openai.Image.create(prompt=f"Luxury product photo of {title}", n=1, size="512x512")
-        img_url = response['data'][0]['url']
-        img_data = requests.get(img_url).content
-        img_path = f"static/images/p_{p_id}.png"
-        with open(img_path, 'wb') as f: f.write(img_data)
-        
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.execute("UPDATE products SET image_path = ? WHERE id = ?", (f"/{img_path}", p_id))
-    except Exception as e: print(f"AI Error: {e}")
-
-# --- 3. נתיבי API (החיבור ל-React) ---
-
-@app.get("/api/inventory")
-async def get_inventory():
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT * FROM products ORDER BY id DESC").fetchall()
-        return [dict(r) for r in rows]
-
-@app.get("/api/actions")
-async def get_actions():
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        rows = conn.execute("SELECT * FROM pending_actions WHERE status='pending'").fetchall()
-        return [dict(r) for r in rows]
-
-@app.post("/api/run")
-async def run_scan(niche: str):
-    # לוגיקת ה-Scraping והחיבור
+        sql, params, limit = JOBS_PAGE.build(fields=fields, cursor=cursor, limit=limit,
+                                             filters=[("status", "=", status), ("type", "=", type)])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows, next_cursor = JOBS_PAGE.paginate(await engine.pool.fetch_all(sql, params), limit)
+    response.headers.update(JOBS_PAGE.link_headers(next_cursor, request.url))
+    return rows
+
+@frontend_router.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    job = await engine.pool.fetch_one(f"SELECT {', '.join(JOBS_PAGE.columns)} FROM jobs WHERE id = ?", (job_id,))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@frontend_router.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: int):
+    """החזרת job מה-dead-letter לתור"""
+    if not await engine.jobs.retry(job_id):
+        raise HTTPException(status_code=409, detail="Only dead jobs can be retried")
+    return {"status": "queued", "id": job_id}
+
+async def command_scan_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """סריקה מהממשק + פעולה ממתינה (הגדלת תקציב) אם יצא מוצר זהב"""
+    niche = payload["niche"]
+    trends = await asyncio.to_thread(EmpireIntelligence.get_google_trends, niche)
     cost = random.uniform(10, 50)
-    profit = cost * 1.5
-    demand = random.randint(60, 95)
-    is_gold = 1 if profit > 25 and demand > 80 else 0
+    econ = await EmpireIntelligence.calculate_economics(cost, trends['score'])
+    prompt = f"Luxury product photo of {niche} Pro"
     
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO products (title, niche, cost, profit, demand, is_golden, scan_type) VALUES (?,?,?,?,?,?,?)",
-                       (f"{niche} Pro", niche, cost, profit, demand, is_gold, "Manual"))
-        p_id = cursor.lastrowid
-        if is_gold:
-            cursor.execute("INSERT INTO pending_actions (type, title, desc) VALUES (?,?,?)",
-                           ("GOLD", f"Scale {niche}", "High demand detected! Increase budget?"))
-        conn.commit()
+    statements = [(PRODUCT_INSERT_SQL,
+                   (f"{niche} Pro", niche, cost, econ['suggested_price'], econ['profit'], trends['score'],
+                    "Medium", econ['ad_budget'], prompt, "Ready to launch", econ['is_golden'], "MANUAL",
+                    trends['status']))]
+    if econ['is_golden']:
+        statements.append(("INSERT INTO pending_actions (type, title, desc) VALUES (?, ?, ?)",
+                           ("GOLD", f"Scale {niche}", "High demand detected! Increase budget?")))
     
-    asyncio.create_task(generate_ai_assets(p_id, niche, profit))
-    return {"status": "success", "id": p_id}
+    p_id = (await engine.writer.execute_group(statements))[0]
+    await publish_product_inserted(p_id)
+    await EmpireIntelligence.generate_dalle_asset(p_id, prompt)
+    return {"id": p_id}
+
+engine.jobs.register("scan.command", command_scan_job, concurrency=SystemConfig.MANUAL_SCAN_WORKERS)
 
-@app.delete("/api/delete/{p_id}")
+@frontend_router.post("/run")
+async def run_scan(niche: str = Query(...), wait: bool = True):
+    result = await engine.jobs.run("scan.command", {"niche": niche}, wait=SystemConfig.JOB_WAIT if wait else 0)
+    return {"status": "success", **result}
+
+@frontend_router.delete("/delete/{p_id}")
 async def delete_product(p_id: int):
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("DELETE FROM products WHERE id = ?", (p_id,))
-        conn.commit()
+    await engine.purge(p_id)
     return {"status": "deleted"}
-
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,107 +1,52 @@
-import os
-import sqlite3
 import random
-import uvicorn
-import openai
-import requests
 import logging
 import asyncio
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from bs4 import BeautifulSoup
-from fastapi import FastAPI, Request, Query, HTTPException, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel, Field
-from pytrends.request import TrendReq
-from dotenv import load_dotenv
+from fastapi import APIRouter, Request, Response, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from modules.engine import engine
+from modules.job_queue import PermanentJobError
+from modules.trend_cache import trend_cache
+from modules.scraper import scraper
+from modules.extraction_rules import page_extractor
+from modules.pagination import KeysetPage
+from modules.bulk_import import BulkImport, parse_url_list
+from modules.economics import PricingRules
+from ai.content_gen import content_generator
 
 # =================================================================
 # 1. INITIALIZATION & CORE SETTINGS
 # =================================================================
-load_dotenv()
+logger = logging.getLogger("EmpireOS.Ads")
 
-# הגדרת לוגים מקצועית למעקב אחרי סריקות
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)s | %(name)s | %(message)s',
-    handlers=[logging.FileHandler("empire_system.log"), logging.StreamHandler()]
-)
-logger = logging.getLogger("EmpireOS")
-
-app = FastAPI(title="EmpireOS - Global Command Center v8.0")
-
-# הגדרות נתיבים
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DASHBOARD_DIR = os.path.join(BASE_DIR, "dashboard")
-
-if not os.path.exists(DASHBOARD_DIR):
-    os.makedirs(DASHBOARD_DIR)
-
-app.mount("/static", StaticFiles(directory=DASHBOARD_DIR), name="static")
-templates = Jinja2Templates(directory=DASHBOARD_DIR)
+# נתיבי מנהל הפרסום תחת /ads, על הכספת המשותפת של modules.engine
+router = APIRouter(prefix="/ads", tags=["ads"])
 
 # קבועים עסקיים
-DB_PATH = 'empire_data.db'
 SHIPPING_COST = 5.50
 ADS_COST_ESTIMATE = 10.0
 TARGET_MARGIN = 0.30 
 GOLDEN_THRESHOLD_PROFIT = 25.0
 GOLDEN_THRESHOLD_DEMAND = 85
-
-# הגדרת API Keys
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
-# =================================================================
-# 2. DATABASE ARCHITECTURE
-# =================================================================
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    # טבלת מוצרים מורחבת
-    c.execute('''CREATE TABLE IF NOT EXISTS products
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                  title TEXT, 
-                  niche TEXT,
-                  cost REAL, 
-                  suggested_price REAL, 
-                  profit REAL, 
-                  demand_score INTEGER, 
-                  competition TEXT, 
-                  ad_budget REAL, 
-                  url TEXT, 
-                  ai_prompt TEXT, 
-                  ad_copy_he TEXT,
-                  is_golden INTEGER DEFAULT 0,
-                  trend_status TEXT,
-                  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # טבלת לוגים של המערכת
-    c.execute('''CREATE TABLE IF NOT EXISTS system_logs
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  event TEXT,
-                  level TEXT,
-                  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-    conn.commit()
-    conn.close()
-    logger.info("Database Engines Synchronized.")
-
-init_db()
+# תקציב בדיקה = רווח x2.5, ו-x1.5 נוסף למוצרים ויראליים (demand מעל 90)
+PRICING = PricingRules(shipping=SHIPPING_COST, ads=ADS_COST_ESTIMATE, margin=TARGET_MARGIN,
+                       golden_profit=GOLDEN_THRESHOLD_PROFIT, golden_demand=GOLDEN_THRESHOLD_DEMAND,
+                       budget_multiplier=2.5, viral_demand=90, viral_boost=1.5)
+ANALYSIS_WORKERS = 4 # ניתוחים (scrape + trends) שרצים יחד על כל ה-workers
+JOB_WAIT = 30.0
 
 # =================================================================
-# 3. ADVANCED INTELLIGENCE ENGINES
+# 2. ADVANCED INTELLIGENCE ENGINES
 # =================================================================
 class EmpireEngine:
     @staticmethod
     def get_market_trends(keyword: str):
         """שימוש ב-pytrends לניתוח מגבשות אמיתי"""
         try:
-            pytrends = TrendReq(hl='en-US', tz=360)
-            pytrends.build_payload([keyword], cat=0, timeframe='now 7-d')
-            data = pytrends.interest_over_time()
-            if not data.empty:
-                trend_score = int(data[keyword].mean())
+            data = trend_cache.get_interest(keyword, timeframe='now 7-d')
+            if data:
+                trend_score = int(sum(data) / len(data))
                 return "Rising" if trend_score > 50 else "Stable"
             return "Unknown"
         except Exception as e:
@@ -109,43 +54,31 @@ class EmpireEngine:
             return "Stable"
 
     @staticmethod
-    def generate_ai_assets(title: str, profit: float):
-        """יצירת תוכן שיווקי באמצעות OpenAI"""
-        if not openai.api_key:
+    async def generate_ai_assets(title: str, price: float, profit: float):
+        """יצירת תוכן שיווקי באמצעות OpenAI (שירות התוכן המשותף: batch, מטמון ותקציב טוקנים)"""
+        if not content_generator.enabled:
             return f"מבצע מטורף על {title}! רווח ליחידה: ${profit}", "Realistic product photo"
         
-        try:
-            # כאן ניתן להפעיל קריאת API אמיתית. כרגע כשלד כדי לא לבזבז טוקנים בטעות.
-            ad_copy = f"🚀 בלעדי ב-EmpireOS: {title}! פוטנציאל רווח של ${profit}. מלאי מוגבל."
-            image_prompt = f"Professional studio lighting for {title}, 8k resolution, minimalist background."
-            return ad_copy, image_prompt
-        except Exception as e:
-            return f"Error generating AI content: {e}", "Default Prompt"
+        ad_copy = await content_generator.ad_copy(
+            title, price, fallback=f"🚀 בלעדי ב-EmpireOS: {title}! פוטנציאל רווח של ${profit}. מלאי מוגבל.")
+        image_prompt = f"Professional studio lighting for {title}, 8k resolution, minimalist background."
+        return ad_copy, image_prompt
 
     @staticmethod
-    def ads_manager_launch(title, profit, demand):
-        """אופטימיזציה של תקציב פרסום"""
-        base_budget = profit * 2.5
-        if demand > 90:
-            base_budget *= 1.5 # הגדלת תקציב למוצרים ויראליים
-        return round(base_budget, 2)
-
-    @staticmethod
-    def scrape_and_analyze(niche_or_url):
-        """מנוע סריקה משולב עם BeautifulSoup"""
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        
+    async def scrape_and_analyze(niche_or_url, with_trends: bool = True):
+        """מנוע סריקה משולב (הורדה אסינכרונית דרך ה-scraper המשותף, חילוץ דרך ה-extractor)"""
         if niche_or_url.startswith('http'):
             try:
                 logger.info(f"Scraping URL: {niche_or_url}")
-                res = requests.get(niche_or_url, headers=headers, timeout=15)
-                res.raise_for_status()
-                soup = BeautifulSoup(res.content, 'html.parser')
+                res = await scraper.fetch(niche_or_url)
+                fields = await page_extractor.extract_response(res)
                 
-                title = soup.find('h1').text.strip() if soup.find('h1') else "Scraped Product"
-                # ניסיון חילוץ מחיר פרימיטיבי
-                price_text = soup.select_one('[class*="price"], [id*="price"]')
-                cost = float(''.join(filter(str.isdigit, price_text.text))) / 100 if price_text else random.uniform(20, 50)
+                title = fields.title or "Scraped Product"
+                # בלי מחיר אמיתי אין ניתוח - לא ממציאים עלות אקראית לטבלת המוצרים
+                if fields.price is None:
+                    logger.warning(f"No price found on {niche_or_url}")
+                    return None
+                cost = fields.price
             except Exception as e:
                 logger.error(f"Scrape Failed: {e}")
                 return None
@@ -156,111 +89,126 @@ class EmpireEngine:
         # חישובים פיננסיים
         demand_score = random.randint(60, 99)
         competition = random.choice(["Low", "Medium", "High"])
-        trend = EmpireEngine.get_market_trends(niche_or_url if not niche_or_url.startswith('http') else title)
+        # ב-import מרוכז מדלגים על טרנדס: אלפי כותרות שונות היו נחסמות ע"י גוגל
+        trend = await asyncio.to_thread(EmpireEngine.get_market_trends,
+                                        niche_or_url if not niche_or_url.startswith('http') else title) \
+            if with_trends else "Unknown"
         
-        suggested = (cost + SHIPPING_COST + ADS_COST_ESTIMATE) / (1 - TARGET_MARGIN)
-        profit = suggested - cost - SHIPPING_COST - ADS_COST_ESTIMATE
-        
-        is_golden = 1 if profit >= GOLDEN_THRESHOLD_PROFIT and demand_score >= GOLDEN_THRESHOLD_DEMAND else 0
-        budget = EmpireEngine.ads_manager_launch(title, profit, demand_score)
-        ad_copy, ai_prompt = EmpireEngine.generate_ai_assets(title, round(profit, 2))
+        econ = PRICING.quote(cost, demand_score)
+        ad_copy, ai_prompt = await EmpireEngine.generate_ai_assets(title, econ['suggested_price'], econ['profit'])
 
         return {
             "title": title, "niche": niche_or_url[:20], "cost": round(cost, 2), 
-            "suggested_price": round(suggested, 2), "profit": round(profit, 2), 
-            "demand": demand_score, "competition": competition, "budget": budget, 
-            "url": niche_or_url, "is_golden": is_golden, "trend": trend,
+            "suggested_price": econ['suggested_price'], "profit": econ['profit'], 
+            "demand": demand_score, "competition": competition, "budget": econ['ad_budget'], 
+            "url": niche_or_url, "is_golden": econ['is_golden'], "trend": trend,
             "ad_copy": ad_copy, "ai_prompt": ai_prompt
         }
 
 # =================================================================
-# 4. API CONTROLLERS
+# 3. API CONTROLLERS
 # =================================================================
 
-@app.get("/", response_class=HTMLResponse)
-async def dashboard_main(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
-
-@app.get("/inventory", response_class=HTMLResponse)
-async def inventory_view(request: Request):
-    return templates.TemplateResponse("inventory.html", {"request": request})
-
-@app.post("/run")
-async def process_market_request(background_tasks: BackgroundTasks, niche: str = Query(...)):
-    """ביצוע ניתוח שוק ושמירה לכספת"""
+async def analysis_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """ביצוע ניתוח שוק ושמירה לכספת (שגיאת DB -> ניסיון חוזר של ה-job)"""
+    niche = payload["niche"]
     logger.info(f"Analysis started for: {niche}")
     
-    data = EmpireEngine.scrape_and_analyze(niche)
+    data = await EmpireEngine.scrape_and_analyze(niche)
     if not data:
-        raise HTTPException(status_code=400, detail="Failed to analyze niche/URL")
+        raise PermanentJobError("Failed to analyze niche/URL")
 
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("""INSERT INTO products 
+    await engine.writer.execute(PRODUCT_INSERT_SQL, product_params(data))
+    return data
+
+engine.jobs.register("ads.analysis", analysis_job, concurrency=ANALYSIS_WORKERS)
+
+@router.post("/run")
+async def process_market_request(niche: str = Query(...), wait: bool = True):
+    data = await engine.jobs.run("ads.analysis", {"niche": niche}, wait=JOB_WAIT if wait else 0)
+    return {"status": "Asset Secured", "data": data}
+
+PRODUCT_INSERT_SQL = """INSERT INTO products 
                      (title, niche, cost, suggested_price, profit, demand_score, 
-                      competition, ad_budget, url, ai_prompt, ad_copy_he, is_golden, trend_status) 
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                  (data['title'], data['niche'], data['cost'], data['suggested_price'], 
-                   data['profit'], data['demand'], data['competition'], data['budget'], 
-                   data['url'], data['ai_prompt'], data['ad_copy'], data['is_golden'], data['trend']))
-        conn.commit()
-        conn.close()
-        
-        return {"status": "Asset Secured", "data": data}
-    except Exception as e:
-        logger.error(f"DB Error: {e}")
-        return JSONResponse(status_code=500, content={"status": "Database Error"})
+                      competition, ad_budget, url, ai_prompt, ad_copy_he, is_golden, trend_rating, source_type) 
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'ADS')"""
+
+def product_params(data: Dict[str, Any]) -> tuple:
+    return (data['title'], data['niche'], data['cost'], data['suggested_price'], 
+            data['profit'], data['demand'], data['competition'], data['budget'], 
+            data['url'], data['ai_prompt'], data['ad_copy'], data['is_golden'], data['trend'])
 
-@app.get("/api/inventory")
-async def fetch_vault_data():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM products ORDER BY is_golden DESC, id DESC")
-    rows = [dict(row) for row in c.fetchall()]
-    conn.close()
+async def persist_products(rows: List[Dict[str, Any]]):
+    """batch אחד = קבוצה אחת בכותב המשותף (נכתבת יחד, בלי להתחרות על נעילת הכתיבה)"""
+    await engine.writer.execute_group([(PRODUCT_INSERT_SQL, product_params(r)) for r in rows])
+
+@router.post("/run/bulk")
+async def process_bulk_import(request: Request, concurrency: int = Query(32, ge=1, le=128)):
+    """Import מרוכז של קטלוג ספק: גוף JSON או CSV של URL-ים. מחזיר התקדמות כ-NDJSON בזמן אמת"""
+    try:
+        urls = parse_url_list(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"Bulk import started: {len(urls)} URLs")
+    importer = BulkImport(lambda url: EmpireEngine.scrape_and_analyze(url, with_trends=False),
+                          persist_products, concurrency=concurrency)
+    return StreamingResponse(importer.ndjson(urls), media_type="application/x-ndjson")
+
+VAULT_PAGE = KeysetPage(
+    table="products",
+    columns=("id", "title", "niche", "cost", "suggested_price", "profit", "demand_score",
+             "competition", "ad_budget", "url", "ai_prompt", "ad_copy_he", "is_golden",
+             "trend_rating", "created_at"),
+    # אותו סדר כמו הכספת של הליבה - נשען על idx_products_golden_created בלי TEMP B-TREE
+    sort_keys=("is_golden", "created_at", "id"),
+    heavy_columns=("ai_prompt", "ad_copy_he"),
+)
+
+@router.get("/api/inventory")
+async def fetch_vault_data(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(VAULT_PAGE.default_limit, ge=1, le=VAULT_PAGE.max_limit),
+    niche: Optional[str] = None,
+    is_golden: Optional[bool] = None,
+    min_profit: Optional[float] = None,
+    max_profit: Optional[float] = None,
+    fields: Optional[str] = None,
+):
+    try:
+        sql, params, limit = VAULT_PAGE.build(fields=fields, cursor=cursor, limit=limit, filters=[
+            ("niche", "=", niche),
+            ("is_golden", "=", None if is_golden is None else int(is_golden)),
+            ("profit", ">=", min_profit),
+            ("profit", "<=", max_profit),
+        ])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rows, next_cursor = VAULT_PAGE.paginate(await engine.pool.fetch_all(sql, params), limit)
+    response.headers.update(VAULT_PAGE.link_headers(next_cursor, request.url))
     return rows
 
-@app.get("/api/stats")
+@router.get("/api/stats")
 async def get_empire_stats():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*), SUM(profit), AVG(demand_score) FROM products")
-    count, total_profit, avg_demand = c.fetchone()
-    c.execute("SELECT COUNT(*) FROM products WHERE is_golden = 1")
-    gold_count = c.fetchone()[0]
-    conn.close()
+    # מהכספת המשותפת: niche_stats (triggers) במקום סריקה מלאה של products
+    count, total_profit, demand_sum, gold_count = tuple(await engine.pool.run(lambda conn: conn.execute(
+        "SELECT SUM(product_count), SUM(profit_sum), SUM(demand_sum), SUM(golden_count) FROM niche_stats"
+    ).fetchone()))
     return {
         "total_items": count or 0,
         "total_profit": round(total_profit or 0, 2),
-        "avg_demand": round(avg_demand or 0, 1),
-        "gold_count": gold_count
+        "avg_demand": round(demand_sum / count, 1) if count else 0,
+        "gold_count": gold_count or 0
     }
 
-@app.delete("/api/delete/{p_id}")
+@router.delete("/api/delete/{p_id}")
 async def delete_asset(p_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("DELETE FROM products WHERE id = ?", (p_id,))
-    conn.commit()
-    conn.close()
+    await engine.purge(p_id)
     return {"status": "Success", "message": f"Asset {p_id} removed."}
 
-@app.get("/health")
+@router.get("/health")
 async def health_check():
     return {"status": "Operational", "timestamp": datetime.now().isoformat()}
-
-# =================================================================
-# 5. EXECUTION
-# =================================================================
-if __name__ == "__main__":
-    print("""
-    ==================================================
-    EMPIRE OS v8.0 - CENTRAL COMMAND INITIALIZED
-    --------------------------------------------------
-    [*] SERVER: http://localhost:8000
-    [*] VAULT: http://localhost:8000/inventory
-    [*] STATUS: MONITORING MARKET TRENDS
-    ==================================================
-    """)
-    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("EmpireOS.BulkImport")
+
+# url -> שורת מוצר מנותחת, או None כשהניתוח נכשל
+AnalyzeFn = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+# שמירת batch של שורות בטרנזקציה אחת
+PersistFn = Callable[[List[Dict[str, Any]]], Awaitable[Any]]
+
+MAX_URLS = 10000
+
+
+# =================================================================
+# URL LIST PARSING (JSON / CSV)
+# =================================================================
+def parse_url_list(body: bytes, content_type: str = "", max_urls: int = MAX_URLS) -> List[str]:
+    """רשימת URL-ים מגוף הבקשה: JSON (מערך / {"urls": [...]} / [{"url": ...}]) או CSV (עמודת url או הראשונה)"""
+    text = body.decode("utf-8-sig", errors="replace").strip()
+    if not text:
+        raise ValueError("Empty URL list")
+
+    if "json" in content_type or text[0] in "[{":
+        try:
+            payload = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if isinstance(payload, dict):
+            payload = payload.get("urls", [])
+        if not isinstance(payload, list):
+            raise ValueError("Expected a JSON array of URLs")
+        candidates = [item.get("url", "") if isinstance(item, dict) else str(item) for item in payload]
+    else:
+        rows = list(csv.reader(io.StringIO(text)))
+        header = [cell.strip().lower() for cell in rows[0]]
+        if "url" in header:
+            column = header.index("url")
+            rows = rows[1:]
+        else:
+            column = 0
+        candidates = [row[column] for row in rows if len(row) > column]
+
+    urls = list(dict.fromkeys(u.strip() for u in candidates if u and u.strip().startswith(("http://", "https://"))))
+    if not urls:
+        raise ValueError("No http(s) URLs found")
+    if len(urls) > max_urls:
+        raise ValueError(f"Too many URLs ({len(urls)} > {max_urls})")
+    return urls
+
+
+# =================================================================
+# CONCURRENT SCRAPE -> ANALYZE -> BATCHED WRITE PIPELINE
+# =================================================================
+class BulkImport:
+    """מפזר רשימת URL-ים על workers מקביליים וכותב את התוצאות ב-batches. מחזיר התקדמות כ-NDJSON"""
+
+    def __init__(self, analyze: AnalyzeFn, persist: PersistFn, concurrency: int = 32,
+                 batch_size: int = 100, progress_interval: float = 1.0):
+        self.analyze = analyze
+        self.persist = persist
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.progress_interval = progress_interval
+
+    async def _worker(self, urls: "asyncio.Queue[str]", results: asyncio.Queue):
+        while True:
+            try:
+                url = urls.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                row = await self.analyze(url)
+                await results.put((url, row, None if row else "analysis failed"))
+            except Exception as e:
+                await results.put((url, None, str(e) or type(e).__name__))
+
+    async def run(self, urls: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """גנרטור אירועים: started -> progress (כל batch / progress_interval) / error (batch שלא נשמר) -> done"""
+        started = time.monotonic()
+        pending: "asyncio.Queue[str]" = asyncio.Queue()
+        for url in urls:
+            pending.put_nowait(url)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * 2)
+        workers = [asyncio.create_task(self._worker(pending, results))
+                   for _ in range(min(self.concurrency, len(urls)))]
+
+        done = saved = 0
+        failures: List[Dict[str, str]] = []
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        last_report = started
+
+        def progress(event: str) -> Dict[str, Any]:
+            elapsed = time.monotonic() - started
+            return {"event": event, "total": len(urls), "done": done, "saved": saved,
+                    "failed": len(failures), "elapsed": round(elapsed, 2),
+                    "rate": round(done / elapsed, 1) if elapsed else 0.0}
+
+        yield {"event": "started", "total": len(urls)}
+        try:
+            while done < len(urls):
+                url, row, error = await results.get()
+                done += 1
+                if row is None:
+                    failures.append({"url": url, "error": error})
+                else:
+                    batch.append((url, row))
+                if len(batch) >= self.batch_size or (done == len(urls) and batch):
+                    # כתיבה מרוכזת: טרנזקציה אחת לכל batch במקום commit לכל URL
+                    try:
+                        await self.persist([r for _, r in batch])
+                        saved += len(batch)
+                    except Exception as e:
+                        # DB נעול / IntegrityError: ה-batch אבד, אבל הזרם ממשיך ומסתיים ב-done עם הספירה
+                        error = f"persist failed: {str(e) or type(e).__name__}"
+                        logger.error(f"Bulk import batch of {len(batch)} not saved: {error}")
+                        failures.extend({"url": u, "error": error} for u, _ in batch)
+                        yield {**progress("error"), "error": error, "lost": len(batch)}
+                    batch = []
+                now = time.monotonic()
+                if now - last_report >= self.progress_interval and done < len(urls):
+                    last_report = now
+                    yield progress("progress")
+        finally:
+            # לקוח שהתנתק באמצע: עוצרים את ה-workers (מה שנכתב - נשאר)
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        summary = progress("done")
+        summary["failures"] = failures
+        logger.info(f"Bulk import: {saved}/{len(urls)} saved, {len(failures)} failed in {summary['elapsed']}s")
+        yield summary
+
+    async def ndjson(self, urls: List[str]) -> AsyncIterator[str]:
+        """אותם אירועים כשורות NDJSON ל-StreamingResponse"""
+        async for event in self.run(urls):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
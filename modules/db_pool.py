@@ -0,0 +1,126 @@
+import sqlite3
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger("EmpireOS.DBPool")
+
+# =================================================================
+# SQLITE CONNECTION POOL (WAL + TUNED PRAGMAS)
+# =================================================================
+class ConnectionPool:
+    """מאגר חיבורים ל-SQLite - חיבור קבוע אחד לכל thread במקום פתיחה וסגירה בכל בקשה"""
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",       # קוראים לא חוסמים כותבים
+        "PRAGMA synchronous=NORMAL",     # fsync רק ב-checkpoint, בטוח תחת WAL
+        "PRAGMA cache_size=-16000",      # ~16MB page cache לכל חיבור
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=134217728",    # 128MB memory-mapped I/O
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, db_path: str, statement_cache_size: int = 256, max_workers: int = 4):
+        self.db_path = db_path
+        self.statement_cache_size = statement_cache_size
+        self.max_workers = max_workers
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _open(self) -> sqlite3.Connection:
+        # cached_statements = מטמון prepared statements לפי טקסט ה-SQL
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self._connections.append(conn)
+        logger.debug(f"Opened pooled connection #{len(self._connections)} to {self.db_path}")
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        """מחזיר את החיבור של ה-thread הנוכחי (נפתח בפעם הראשונה בלבד)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """טרנזקציה על החיבור הממוחזר - commit בהצלחה, rollback בשגיאה"""
+        conn = self.get_connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    # -----------------------------------------------------------------
+    # Async API - שאילתות רצות על executor ייעודי ולא על ה-event loop
+    # -----------------------------------------------------------------
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="empire-db"
+                    )
+        return self._executor
+
+    def _call(self, fn: Callable[..., Any], args: Sequence[Any]) -> Any:
+        return fn(self.get_connection(), *args)
+
+    def _call_in_transaction(self, fn: Callable[..., Any], args: Sequence[Any]) -> Any:
+        with self.transaction() as conn:
+            return fn(conn, *args)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """מריץ fn(conn, *args) על thread של ה-DB ומחזיר את התוצאה"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._call, fn, args)
+
+    async def run_transaction(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """כמו run, אבל עוטף את fn בטרנזקציה אחת (commit/rollback)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._call_in_transaction, fn, args)
+
+    async def fetch_all(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        # ההמרה ל-dict נעשית כבר ב-thread של ה-DB
+        return await self.run(lambda conn: [dict(row) for row in conn.execute(sql, params)])
+
+    async def fetch_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        def _fetch(conn):
+            row = conn.execute(sql, params).fetchone()
+            return dict(row) if row is not None else None
+        return await self.run(_fetch)
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """פקודת כתיבה בודדת - מחזיר lastrowid"""
+        return await self.run_transaction(lambda conn: conn.execute(sql, params).lastrowid)
+
+    def close_all(self):
+        """סגירת כל החיבורים וה-executor (בכיבוי השרת)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Pool close failed: {e}")
+        self._local = threading.local()
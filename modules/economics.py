@@ -0,0 +1,158 @@
+import math
+import time
+import logging
+import dataclasses
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence
+
+from modules.lazy import lazy_import
+
+logger = logging.getLogger("EmpireOS.Economics")
+
+# NumPy נדרש רק לתמחור קטלוג שלם (batch / reprice_all) - quote למוצר בודד בלעדיו
+np = lazy_import("numpy")
+
+
+# =================================================================
+# PRICING RULES (סקלרי למוצר בודד, NUMPY לקטלוג שלם)
+# =================================================================
+@dataclass(frozen=True)
+class PricingRules:
+    """מחיר = (עלות + משלוח + פרסום) / (1 - מרווח). זהב = רווח ו-demand מעל הסף"""
+    shipping: float
+    ads: float
+    margin: float
+    golden_profit: float = math.inf
+    golden_demand: float = math.inf
+    budget_multiplier: float = 3.5
+    viral_demand: Optional[float] = None  # demand מעל הסף -> התקציב מוכפל ב-viral_boost
+    viral_boost: float = 1.0
+
+    def quote(self, cost: float, demand: float = 0) -> Dict[str, Any]:
+        """מוצר בודד (סריקה/הוספה) - אותה נוסחה כמו batch, בלי overhead של מערכים"""
+        price = (cost + self.shipping + self.ads) / (1 - self.margin)
+        profit = price - cost - self.shipping - self.ads
+        budget = profit * self.budget_multiplier
+        if self.viral_demand is not None and demand > self.viral_demand:
+            budget *= self.viral_boost
+        return {
+            "suggested_price": round(price, 2),
+            "profit": round(profit, 2),
+            "ad_budget": round(budget, 2),
+            "is_golden": 1 if profit >= self.golden_profit and demand >= self.golden_demand else 0,
+        }
+
+    def batch(self, cost, demand) -> Dict[str, "np.ndarray"]:
+        """עמודות cost/demand -> עמודות price/profit/budget/is_golden (מעוגלות לסנט)"""
+        cost = np.asarray(cost, dtype=np.float64)
+        demand = np.asarray(demand, dtype=np.float64)
+        price = (cost + (self.shipping + self.ads)) / (1 - self.margin)
+        profit = price - cost - self.shipping - self.ads
+        budget = profit * self.budget_multiplier
+        if self.viral_demand is not None:
+            budget = np.where(demand > self.viral_demand, budget * self.viral_boost, budget)
+        return {
+            "suggested_price": np.round(price, 2),
+            "profit": np.round(profit, 2),
+            "ad_budget": np.round(budget, 2),
+            "is_golden": ((profit >= self.golden_profit) & (demand >= self.golden_demand)).astype(np.int64),
+        }
+
+
+@dataclass(frozen=True)
+class EconomicsColumns:
+    """מיפוי שמות העמודות - לכל אפליקציה סכמת products קצת אחרת"""
+    table: str = "products"
+    cost: str = "cost"
+    demand: str = "demand_score"
+    price: str = "suggested_price"
+    profit: str = "profit"
+    budget: Optional[str] = "ad_budget"
+    golden: str = "is_golden"
+
+
+VAULT_ECONOMICS = EconomicsColumns()
+
+# שדות שאפשר לעדכן בזמן ריצה (POST /api/economics/reprice) - נשמרים בטבלת pricing_overrides
+PRICING_OVERRIDES = ("shipping", "ads", "margin")
+
+
+# =================================================================
+# PRICING OVERRIDES (בכספת - כל ה-workers מתמחרים לפי אותם חוקים)
+# =================================================================
+def load_pricing(conn, name: str, defaults: PricingRules) -> PricingRules:
+    """חוקי ברירת המחדל מהקוד + העדכונים השמורים ב-DB (שדה NULL = ברירת המחדל)"""
+    row = conn.execute(f"SELECT {', '.join(PRICING_OVERRIDES)} FROM pricing_overrides WHERE name = ?",
+                       (name,)).fetchone()
+    if row is None:
+        return defaults
+    return dataclasses.replace(defaults, **{field: row[i] for i, field in enumerate(PRICING_OVERRIDES)
+                                            if row[i] is not None})
+
+
+def save_pricing(conn, name: str, changes: Dict[str, float]):
+    """עדכון חלקי: שדות שלא נשלחו שומרים את הערך השמור הקודם"""
+    unknown = set(changes) - set(PRICING_OVERRIDES)
+    if unknown:
+        raise ValueError(f"Unknown pricing fields: {', '.join(sorted(unknown))}")
+    values = {field: changes.get(field) for field in PRICING_OVERRIDES}
+    conn.execute(
+        f"INSERT INTO pricing_overrides (name, {', '.join(PRICING_OVERRIDES)}, updated_at) "
+        f"VALUES (:name, {', '.join(':' + f for f in PRICING_OVERRIDES)}, :now) "
+        f"ON CONFLICT (name) DO UPDATE SET "
+        f"{', '.join(f'{f} = COALESCE(excluded.{f}, pricing_overrides.{f})' for f in PRICING_OVERRIDES)}, "
+        f"updated_at = excluded.updated_at",
+        {"name": name, "now": time.time(), **values})
+
+
+# =================================================================
+# BULK REPRICE (טרנזקציה אחת, רק שורות שהשתנו)
+# =================================================================
+def reprice_all(conn, rules: PricingRules, columns: EconomicsColumns = VAULT_ECONOMICS,
+                where: Optional[str] = None, params: Sequence[Any] = ()) -> Dict[str, int]:
+    """תמחור מחדש של כל הקטלוג אחרי שינוי משלוח/מרווח. רץ בתוך run_transaction - commit אחד.
+    שורות שהתוצאה שלהן לא השתנתה לא נכתבות (וה-triggers של niche_stats לא רצים עליהן).
+    where: רק השורות שהחוקים האלה תמחרו (למשל לפי source_type) - לא דורסים מוצרים של מנועים אחרים"""
+    c = columns
+    budget = c.budget or "0"
+    cursor = conn.cursor()
+    cursor.row_factory = None  # tuples גולמיים - 1M אובייקטי Row הם רוב זמן הקריאה
+    rows = cursor.execute(
+        f"SELECT id, {c.cost}, IFNULL({c.demand}, 0), IFNULL({c.price}, -1), IFNULL({c.profit}, -1), "
+        f"IFNULL({budget}, -1), IFNULL({c.golden}, 0) FROM {c.table} WHERE {c.cost} IS NOT NULL"
+        + (f" AND ({where})" if where else ""), params).fetchall()
+    if not rows:
+        return {"rows": 0, "updated": 0, "golden": 0, "golden_gained": 0, "golden_lost": 0}
+
+    data = np.array(rows, dtype=np.float64)
+    ids = data[:, 0].astype(np.int64)
+    result = rules.batch(data[:, 1], data[:, 2])
+    old_golden = data[:, 6].astype(np.int64)
+    changed = ((result["suggested_price"] != np.round(data[:, 3], 2))
+               | (result["profit"] != np.round(data[:, 4], 2))
+               | (result["is_golden"] != old_golden))
+    if c.budget:
+        changed |= result["ad_budget"] != np.round(data[:, 5], 2)
+
+    # התוצאות נכתבות לטבלה זמנית ומשם UPDATE ... FROM אחד - בלי bind לכל שורה מול products
+    fields = ["price", "profit", "golden"] + (["budget"] if c.budget else [])
+    values = [result["suggested_price"], result["profit"], result["is_golden"]] + \
+        ([result["ad_budget"]] if c.budget else [])
+    conn.execute("DROP TABLE IF EXISTS temp.reprice_batch")
+    conn.execute(f"CREATE TEMP TABLE reprice_batch (id INTEGER PRIMARY KEY, {', '.join(fields)})")
+    conn.executemany(f"INSERT INTO temp.reprice_batch VALUES (?{', ?' * len(fields)})",
+                     zip(ids[changed].tolist(), *(column[changed].tolist() for column in values)))
+    assignments = ", ".join(f"{getattr(c, field)} = b.{field}" for field in fields)
+    conn.execute(f"UPDATE {c.table} SET {assignments} FROM temp.reprice_batch AS b WHERE {c.table}.id = b.id")
+    conn.execute("DROP TABLE temp.reprice_batch")
+
+    stats = {
+        "rows": len(ids),
+        "updated": int(changed.sum()),
+        "golden": int(result["is_golden"].sum()),
+        "golden_gained": int(((result["is_golden"] == 1) & (old_golden == 0)).sum()),
+        "golden_lost": int(((result["is_golden"] == 0) & (old_golden == 1)).sum()),
+    }
+    logger.info(f"Repriced {stats['rows']} products in {c.table}: {stats['updated']} updated, "
+                f"{stats['golden_gained']} new golden, {stats['golden_lost']} lost golden")
+    return stats
@@ -0,0 +1,193 @@
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from modules.db_pool import ConnectionPool
+from modules.migrations import apply_migrations, VAULT_MIGRATIONS, NICHE_STATS_REBUILD
+from modules.response_cache import ResponseCache
+from modules.event_bus import EventBus
+from modules.trend_cache import trend_cache
+from modules.http_cache import http_cache
+from modules.scraper import scraper
+from modules.image_pipeline import ImagePipeline
+from modules.image_derivatives import derivative_builder
+from modules.write_batcher import WriteBatcher
+from modules.leader import LeaderLease
+from modules.job_queue import JobQueue, JobType
+from ai.content_gen import content_generator
+
+logger = logging.getLogger("EmpireOS.Engine")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+
+# =================================================================
+# SETTINGS (משתני סביבה, ברירות מחדל של מכונת פיתוח)
+# =================================================================
+@dataclass
+class Settings:
+    """הגדרות התהליך: כספת אחת, שרת אחד, כמה workers של uvicorn"""
+    db_path: str = field(default_factory=lambda: os.getenv("EMPIRE_DB", "empire_vault_v10.db"))
+    host: str = field(default_factory=lambda: os.getenv("EMPIRE_HOST", "0.0.0.0"))
+    port: int = field(default_factory=lambda: int(os.getenv("PORT", 8000)))
+    workers: int = field(default_factory=lambda: int(os.getenv("EMPIRE_WORKERS", 1)))
+    # סורקים אוטונומיים + תור התמונות. רצים רק ב-worker שמחזיק ב-lease (אחד מכל ה-workers של הכספת);
+    # EMPIRE_BACKGROUND=0 - התהליך לא מתמודד בכלל ורק מגיש API
+    background: bool = field(default_factory=lambda: os.getenv("EMPIRE_BACKGROUND", "1") != "0")
+    # מנהיג שמת מוחלף אחרי עד lease_ttl שניות (כיבוי מסודר משחרר את ה-lease מיד)
+    lease_ttl: float = field(default_factory=lambda: float(os.getenv("EMPIRE_LEASE_TTL", 15)))
+    log_file: str = field(default_factory=lambda: os.getenv("EMPIRE_LOG_FILE", "empire_master.log"))
+    static_dir: str = os.path.join(BASE_DIR, "dashboard")
+    images_dir: str = os.path.join(BASE_DIR, "dashboard", "assets", "generated")
+    images_url: str = "/static/assets/generated"
+    image_workers: int = field(default_factory=lambda: int(os.getenv("EMPIRE_IMAGE_WORKERS", 2)))
+    cors_origins: List[str] = field(default_factory=lambda: _env_list("EMPIRE_CORS_ORIGINS", "*"))
+    # בלי מפתח לא נוצרות תמונות DALL-E (וה-SDK של OpenAI לא נטען בכלל)
+    openai_api_key: Optional[str] = field(default_factory=lambda: os.getenv("OPENAI_API_KEY"))
+
+
+Service = Tuple[str, Callable[[], Any], Callable[[], Awaitable[Any]]]
+
+
+# =================================================================
+# SHARED ENGINE (pool, כותב, אירועים ותמונות - מופע אחד לתהליך)
+# =================================================================
+class Engine:
+    """כל ה-routers (ליבה, scout, ads, product, dashboard) עובדים מול אותה כספת ואותם שירותים"""
+
+    def __init__(self, settings: Optional[Settings] = None):
+        self.services: List[Service] = []
+        # סוגי ה-jobs שה-routers רושמים - נשמרים גם כש-configure בונה תור חדש
+        self.job_types: Dict[str, JobType] = {}
+        self.configure(settings or Settings())
+
+    def configure(self, settings: Settings):
+        """בונה את השירותים המשותפים מחדש - לפני start (למשל מתוך create_app עם הגדרות אחרות)"""
+        self.settings = settings
+        self.pool = ConnectionPool(settings.db_path)
+        # כל הכתיבות של הסריקות (מוצר, התראה, נתיב תמונה) בכותב אחד עם group commit
+        self.writer = WriteBatcher(self.pool)
+        # ערוץ push (SSE) לכל ה-routers - דרך טבלת events, כך שמנוי בכל worker רואה את אירועי כולם
+        self.events = EventBus(self.pool, self.writer)
+        # נפסל בכל כתיבה ל-products/system_alerts/pending_actions (triggers על cache_generation)
+        self.response_cache = ResponseCache(generation_source=self.cache_generation)
+        # prompt זהה = קריאת DALL-E וקובץ אחד; jobs נשמרים ב-image_jobs וממשיכים אחרי ריסטארט
+        # רץ רק אצל המנהיג - ב-workers האחרים submit רק שומר את ה-job
+        self.images = ImagePipeline(self.pool, settings.images_dir, settings.images_url,
+                                    on_ready=self.on_image_ready, derivatives=derivative_builder,
+                                    workers=settings.image_workers, autostart=False)
+        # עם uvicorn --workers N: בדיוק worker אחד מריץ את ה-schedulers ואת תור התמונות
+        self.lease = LeaderLease(self.pool, ttl=settings.lease_ttl,
+                                 on_elected=self._start_services, on_demoted=self._stop_services)
+        # סריקות ידניות ואוטונומיות - jobs מתמידים בטבלת jobs; כל worker צורך (מקביליות גלובלית לכל סוג)
+        self.jobs = JobQueue(self.pool, worker_id=self.lease.holder_id, types=self.job_types)
+        self.started = False
+
+    def initialize(self) -> int:
+        """פריסת הסכמה ושדרוג DB קיים במקום לפי VAULT_MIGRATIONS - מתוך ה-lifespan, לא ב-import"""
+        os.makedirs(self.settings.images_dir, exist_ok=True)
+        version = apply_migrations(self.pool.get_connection(), VAULT_MIGRATIONS)
+        self.images.initialize()
+        logger.info(f"Vault {self.settings.db_path} ready (schema v{version}).")
+        return version
+
+    def add_service(self, name: str, start: Callable[[], Any], stop: Callable[[], Awaitable[Any]]):
+        """שירות רקע (scheduler, לופ סריקה) - רץ רק ב-worker המנהיג"""
+        if name not in {existing[0] for existing in self.services}:
+            self.services.append((name, start, stop))
+
+    # --- lifecycle ---
+    async def start(self):
+        self.writer.start()
+        self.jobs.start()
+        self.events.start()
+        if self.settings.background:
+            self.lease.start()
+        self.started = True
+
+    async def stop(self):
+        # משחרר את ה-lease (ועוצר את השירותים אם היינו המנהיג) - worker אחר לוקח מיד
+        await self.lease.stop()
+        # jobs שנקטעו חוזרים לתור (worker אחר או הריסטארט הבא ממשיך אותם)
+        await self.jobs.stop()
+        # הכותב אחרון: מנקז את מה שה-services וה-pipeline השאירו בתור
+        await self.writer.stop()
+        await self.events.stop()
+        await scraper.aclose()
+        await content_generator.aclose()
+        derivative_builder.shutdown()
+        self.pool.close_all()
+        trend_cache.close()
+        http_cache.close()
+        self.started = False
+
+    def _start_services(self):
+        self.images.start()
+        for name, start, _ in self.services:
+            logger.info(f"Starting background service: {name}")
+            start()
+
+    async def _stop_services(self):
+        for name, _, stop in reversed(self.services):
+            logger.info(f"Stopping background service: {name}")
+            await stop()
+        await self.images.stop()
+
+    # --- shared operations ---
+    async def cache_generation(self) -> int:
+        """מונה הכתיבות (מתעדכן ב-triggers)"""
+        row = await self.pool.fetch_one("SELECT value FROM cache_generation WHERE id = 1")
+        return row['value'] if row else 0
+
+    async def rebuild_niche_stats(self) -> int:
+        """repair: חישוב מחדש של niche_stats מתוך products (למקרה של drift)"""
+        def _rebuild(conn):
+            for statement in NICHE_STATS_REBUILD:
+                conn.execute(statement)
+            return conn.execute("SELECT COUNT(*) FROM niche_stats").fetchone()[0]
+        return await self.pool.run_transaction(_rebuild)
+
+    async def on_image_ready(self, product_id: int, image_path: str, variants: Dict[str, str]):
+        image = {"image_path": image_path, "image_thumb": variants.get("thumb"), "image_webp": variants.get("webp")}
+        await self.writer.write("UPDATE products SET image_path = ?, image_thumb = ?, image_webp = ? WHERE id = ?",
+                                (image["image_path"], image["image_thumb"], image["image_webp"], product_id))
+        await self.events.publish("image-ready", {"id": product_id, **image})
+
+    async def publish_product(self, product_id: int, columns: Tuple[str, ...]):
+        """דחיפת השורה החדשה (בלי העמודות הכבדות) + התראת זהב למנויי ה-SSE"""
+        row = await self.pool.fetch_one(f"SELECT {', '.join(columns)} FROM products WHERE id = ?", (product_id,))
+        if row is None:
+            return
+        await self.events.publish("product-inserted", row)
+        if row.get('is_golden'):
+            await self.events.publish("golden-alert", {"id": row['id'], "title": row['title'], "profit": row['profit']})
+
+    async def purge(self, product_id: int):
+        await self.pool.execute("DELETE FROM products WHERE id = ?", (product_id,))
+        # הקובץ נמחק רק אם אף מוצר אחר לא משתמש באותה תמונה
+        await self.images.release(product_id)
+        await self.events.publish("product-purged", {"id": product_id})
+
+    async def health(self) -> Dict[str, Any]:
+        return {
+            "database": os.path.exists(self.settings.db_path),
+            "background": self.settings.background,
+            "services": [name for name, _, _ in self.services],
+            "leader": self.lease.stats(),
+            "jobs": self.jobs.metrics(),
+            "response_cache": self.response_cache.stats(),
+            "trend_cache": await trend_cache.stats(),
+            "http_cache": await http_cache.stats(),
+            "images": {**await self.images.stats(), "derivatives": derivative_builder.stats()},
+            "writer": self.writer.stats(),
+            "content": content_generator.metrics(),
+            "events": self.events.stats(),
+        }
+
+
+engine = Engine()
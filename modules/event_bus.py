@@ -0,0 +1,209 @@
+import json
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from modules.db_pool import ConnectionPool
+from modules.write_batcher import WriteBatcher
+
+logger = logging.getLogger("EmpireOS.EventBus")
+
+# (id גלובלי מטבלת events, event type, payload כ-JSON)
+Event = Tuple[int, str, str]
+
+# =================================================================
+# EVENT LOG (טבלת events בכספת) + SERVER-SENT EVENTS
+# =================================================================
+class _Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class EventBus:
+    """ערוץ push לדלתות ברמת שורה (product-inserted / product-purged / golden-alert / image-ready).
+
+    עם uvicorn --workers N כל worker מחזיק מנויי SSE משלו, אז אירועים לא עוברים בזיכרון:
+    publish מוסיף שורה לטבלת events (append-only, id גלובלי AUTOINCREMENT), וכל worker
+    עוקב אחרי הטבלה ומפיץ את השורות החדשות למנויים שלו. ה-id הוא ה-id של SSE, כך ש-Last-Event-ID
+    ממשיך מאותה נקודה גם כשהחיבור מחדש נוחת על worker אחר"""
+
+    INSERT_SQL = "INSERT INTO events (event, data, created_at) VALUES (?, ?, ?)"
+
+    def __init__(self, pool: ConnectionPool, writer: WriteBatcher, poll_interval: float = 0.5,
+                 retention: float = 3600.0, page_size: int = 500, queue_size: int = 1000,
+                 keepalive: float = 15.0):
+        # poll_interval: השהיית אירוע שנכתב ב-worker אחר (אירוע מקומי מעיר את ה-tail מיד)
+        # retention: כמה זמן אירוע נשמר ל-replay (Last-Event-ID ישן יותר מקבל רק את מה שנשאר)
+        self.pool = pool
+        self.writer = writer
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.page_size = page_size
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self.published = 0
+        self.delivered = 0
+        self.pruned = 0
+        self.failures = 0
+        self._cursor: Optional[int] = None
+        self._subscribers: Set[_Subscriber] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._last_prune = 0.0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # --- SQL (על thread של ה-DB) ---
+    @staticmethod
+    def _head(conn) -> int:
+        return conn.execute("SELECT IFNULL(MAX(id), 0) FROM events").fetchone()[0]
+
+    @staticmethod
+    def _read(conn, after: int, limit: int) -> List[Event]:
+        return [tuple(row) for row in conn.execute(
+            "SELECT id, event, data FROM events WHERE id > ? ORDER BY id LIMIT ?", (after, limit))]
+
+    @staticmethod
+    def _prune(conn, before: float) -> int:
+        return conn.execute("DELETE FROM events WHERE created_at < ?", (before,)).rowcount
+
+    # --- lifecycle ---
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._closing = False
+        self._cursor = None
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="event-tail")
+
+    async def stop(self):
+        """עוצר את ה-tail וסוגר את כל הזרמים הפתוחים (בכיבוי השרת)"""
+        task, self._task = self._task, None
+        if task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await asyncio.gather(task, return_exceptions=True)
+        for sub in list(self._subscribers):
+            try:
+                sub.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                sub.overflowed = True
+        self._subscribers.clear()
+
+    # --- publish / tail ---
+    async def publish(self, event: str, data: Dict[str, Any]):
+        """הוספת האירוע ל-events דרך הכותב המשותף. המנויים (בכל ה-workers) מקבלים אותו מה-tail"""
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        try:
+            await self.writer.write(self.INSERT_SQL, (event, payload, time.time()))
+        except Exception as e:
+            # הכתיבה שעליה מדווחים כבר נשמרה - לא מכשילים בגלל האירוע
+            self.failures += 1
+            logger.warning(f"Could not publish {event}: {e}")
+            return
+        self.published += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def poll(self) -> int:
+        """סבב tail אחד: שורות חדשות מאז הסבב הקודם -> תורי המנויים. מחזיר כמה נקראו"""
+        if self._cursor is None or not self._subscribers:
+            # בלי מנויים אין למי להפיץ - רק מקדמים את הסמן (חיבור חדש בלי Last-Event-ID מתחיל מכאן)
+            self._cursor = await self.pool.run(self._head)
+            return 0
+        read = 0
+        while True:
+            rows = await self.pool.run(self._read, self._cursor, self.page_size)
+            for item in rows:
+                self._cursor = item[0]
+                self._fanout(item)
+            read += len(rows)
+            if len(rows) < self.page_size:
+                return read
+
+    def _fanout(self, item: Event):
+        for sub in list(self._subscribers):
+            try:
+                sub.queue.put_nowait(item)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                # לקוח איטי: מנתקים אותו, והוא ישלים את הפער עם Last-Event-ID בהתחברות מחדש
+                sub.overflowed = True
+                self._subscribers.discard(sub)
+
+    async def _run(self):
+        while not self._closing:
+            self._wakeup.clear()
+            try:
+                await self.poll()
+                if time.monotonic() - self._last_prune > 60:
+                    self._last_prune = time.monotonic()
+                    self.pruned += await self.pool.run_transaction(self._prune, time.time() - self.retention)
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Event tail failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _replay(self, last_event_id: Optional[str]) -> AsyncIterator[Event]:
+        try:
+            last_seen = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_seen = None
+        if last_seen is None:
+            return
+        while True:
+            rows = await self.pool.run(self._read, last_seen, self.page_size)
+            for item in rows:
+                yield item
+            if len(rows) < self.page_size:
+                return
+            last_seen = rows[-1][0]
+
+    @staticmethod
+    def format(item: Event) -> str:
+        seq, event, data = item
+        return f"id: {seq}\nevent: {event}\ndata: {data}\n\n"
+
+    async def stream(self, request: Any, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """גנרטור SSE ל-StreamingResponse: replay מהטבלה של מה שפוספס ואז אירועים חיים + keepalive"""
+        # נרשמים לפני ה-replay: מה שנכתב בינתיים מגיע גם בתור וגם ב-replay, ו-last_sent מסנן כפילויות
+        sub = _Subscriber(self.queue_size)
+        self._subscribers.add(sub)
+        last_sent = 0
+        try:
+            yield "retry: 3000\n\n"
+            async for item in self._replay(last_event_id):
+                last_sent = item[0]
+                yield self.format(item)
+            while not sub.overflowed:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    break
+                if item[0] <= last_sent:
+                    continue
+                last_sent = item[0]
+                yield self.format(item)
+        finally:
+            self._subscribers.discard(sub)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"subscribers": len(self._subscribers), "cursor": self._cursor, "published": self.published,
+                "delivered": self.delivered, "pruned": self.pruned, "failures": self.failures}
@@ -0,0 +1,292 @@
+import os
+import re
+import json
+import html
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, field
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from modules.extractors import Extractor, LxmlExtractor, ProductFields, extractor as heuristic_extractor, lxml_html, etree
+from modules.http_cache import HttpCache, http_cache
+
+logger = logging.getLogger("EmpireOS.ExtractionRules")
+
+# =================================================================
+# LOCALE-AWARE PRICE PARSING
+# =================================================================
+CURRENCY_SYMBOLS = {
+    "US$": "USD", "C$": "CAD", "A$": "AUD", "NZ$": "NZD", "HK$": "HKD", "R$": "BRL",
+    "$": "USD", "€": "EUR", "£": "GBP", "₪": "ILS", "¥": "JPY", "₹": "INR", "₩": "KRW",
+    "₽": "RUB", "₺": "TRY", "zł": "PLN", "kr": "SEK", "CHF": "CHF", "NIS": "ILS", "ש\"ח": "ILS",
+}
+# לוקאלים שבהם הפסיק הוא המפריד העשרוני (1.234,56)
+DECIMAL_COMMA_LOCALES = frozenset({
+    "de", "fr", "es", "it", "nl", "pt", "ru", "pl", "tr", "sv", "da", "fi", "nb", "no", "cs", "el", "id", "vi",
+})
+
+_NUMBER = re.compile(r"\d(?:[\d.,'\u00a0\u202f ]*\d)?")
+_ISO_CODE = re.compile(r"\b([A-Z]{3})\b")
+
+
+def detect_currency(text: str) -> Optional[str]:
+    for symbol, code in CURRENCY_SYMBOLS.items():
+        if symbol in text:
+            return code
+    match = _ISO_CODE.search(text)
+    return match.group(1) if match else None
+
+
+def parse_price(text: Any, locale: Optional[str] = None,
+                currency: Optional[str] = None) -> Optional[Tuple[float, Optional[str]]]:
+    """'$1,249.99' / '1.249,99 €' / '₪ 89.90' / 'EUR 12,50' -> (amount, currency). None אם אין מספר"""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text), currency
+    text = html.unescape(str(text)).strip()
+    currency = currency or detect_currency(text)
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    number = re.sub(r"['\u00a0\u202f ]", "", match.group(0))
+
+    sep = "," if "," in number else "." if "." in number else None
+    if "." in number and "," in number:
+        # שני המפרידים מופיעים - האחרון הוא העשרוני
+        decimal = "." if number.rfind(".") > number.rfind(",") else ","
+    elif sep is None:
+        decimal = "."
+    elif number.count(sep) > 1:
+        decimal = "," if sep == "." else "."
+    elif len(number) - number.rfind(sep) - 1 != 3:
+        decimal = sep
+    elif locale:
+        # '1.249' / '1,249' דו-משמעי - הלוקאל של הדומיין מכריע
+        decimal = "," if locale.split("-")[0].split("_")[0].lower() in DECIMAL_COMMA_LOCALES else "."
+    else:
+        # בלי לוקאל: שלוש ספרות אחרי מפריד יחיד הן אלפים
+        decimal = "," if sep == "." else "."
+
+    thousands = "," if decimal == "." else "."
+    number = number.replace(thousands, "").replace(decimal, ".")
+    try:
+        return float(number), currency
+    except ValueError:
+        return None
+
+
+# =================================================================
+# STRUCTURED METADATA (JSON-LD / OPENGRAPH) - REGEX, בלי DOM
+# =================================================================
+_LD_JSON = re.compile(rb'<script[^>]+type=["\']?application/ld\+json["\']?[^>]*>(.*?)</script>', re.I | re.S)
+_META = re.compile(rb'<meta\s[^>]*>', re.I)
+_ATTR = re.compile(rb'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+
+META_TITLE = ("og:title", "twitter:title")
+META_PRICE = ("product:price:amount", "og:price:amount", "product:sale_price:amount")
+META_CURRENCY = ("product:price:currency", "og:price:currency", "product:sale_price:currency")
+
+
+def _walk_products(node: Any) -> Iterator[Dict[str, Any]]:
+    """כל האובייקטים מסוג Product בתוך JSON-LD (כולל @graph ורשימות)"""
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk_products(item)
+    elif isinstance(node, dict):
+        types = node.get("@type")
+        types = types if isinstance(types, list) else [types]
+        if any(t in ("Product", "ProductGroup", "IndividualProduct") for t in types):
+            yield node
+        for key in ("@graph", "mainEntity", "itemListElement"):
+            if key in node:
+                yield from _walk_products(node[key])
+
+
+def _offer_price(offers: Any) -> Optional[Tuple[Any, Optional[str]]]:
+    for offer in offers if isinstance(offers, list) else [offers]:
+        if not isinstance(offer, dict):
+            continue
+        spec = offer.get("priceSpecification")
+        spec = spec[0] if isinstance(spec, list) and spec else spec
+        for source in (offer, spec if isinstance(spec, dict) else {}):
+            for key in ("price", "lowPrice", "highPrice"):
+                if source.get(key) not in (None, ""):
+                    return source[key], source.get("priceCurrency") or offer.get("priceCurrency")
+    return None
+
+
+def structured_fields(content: bytes, encoding: str) -> ProductFields:
+    """schema.org Product מ-JSON-LD, ואז OpenGraph/product meta"""
+    fields = ProductFields()
+    for raw in _LD_JSON.findall(content):
+        try:
+            data = json.loads(raw.decode(encoding, errors="replace").strip().rstrip(";"))
+        except ValueError:
+            continue
+        for product in _walk_products(data):
+            if fields.title is None and isinstance(product.get("name"), str):
+                fields.title = html.unescape(product["name"]).strip() or None
+            offer = _offer_price(product.get("offers"))
+            if fields.price is None and offer is not None:
+                # ב-JSON-LD המחיר לפי התקן הוא תמיד עם נקודה עשרונית
+                parsed = parse_price(offer[0], locale="en", currency=offer[1])
+                if parsed:
+                    fields.price, fields.currency = parsed
+                    fields.price_text = str(offer[0])
+            if fields.title and fields.price is not None:
+                fields.source = "json-ld"
+                return fields
+
+    meta: Dict[str, str] = {}
+    for tag in _META.findall(content):
+        attrs = {m.group(1).lower(): (m.group(2) or m.group(3) or m.group(4) or b"") for m in _ATTR.finditer(tag)}
+        key = (attrs.get(b"property") or attrs.get(b"name") or b"").decode("ascii", errors="ignore").lower()
+        if key and key not in meta and b"content" in attrs:
+            meta[key] = html.unescape(attrs[b"content"].decode(encoding, errors="replace")).strip()
+    if fields.title is None:
+        fields.title = next((meta[k] for k in META_TITLE if meta.get(k)), None)
+    if fields.price is None:
+        amount = next((meta[k] for k in META_PRICE if meta.get(k)), None)
+        currency = next((meta[k] for k in META_CURRENCY if meta.get(k)), None)
+        parsed = parse_price(amount, locale="en", currency=currency) if amount else None
+        if parsed:
+            fields.price, fields.currency = parsed
+            fields.price_text = amount
+            fields.source = "metadata"
+    return fields
+
+
+# =================================================================
+# PER-DOMAIN COMPILED RULES
+# =================================================================
+@dataclass
+class DomainRule:
+    domain: str
+    title: List[str] = field(default_factory=list)   # XPath, לפי סדר עדיפות
+    price: List[str] = field(default_factory=list)
+    locale: Optional[str] = None
+
+    @cached_property
+    def _compiled(self) -> Tuple[list, list]:
+        # קומפילציה חד-פעמית של ה-XPath (בדף הראשון של הדומיין, לא לכל דף ולא ב-import)
+        return [etree.XPath(x) for x in self.title], [etree.XPath(x) for x in self.price]
+
+    @staticmethod
+    def _first_text(compiled, root) -> Optional[str]:
+        for xpath in compiled:
+            for node in xpath(root):
+                text = node if isinstance(node, str) else node.text_content()
+                if text and text.strip():
+                    return " ".join(text.split())
+        return None
+
+    def apply(self, root) -> Tuple[Optional[str], Optional[str]]:
+        title, price = self._compiled
+        return self._first_text(title, root), self._first_text(price, root)
+
+
+DEFAULT_DOMAIN_RULES = [
+    DomainRule("amazon.com", title=["//*[@id='productTitle']"],
+               price=["//*[@id='corePrice_feature_div']//*[contains(@class,'a-offscreen')]",
+                      "//*[@id='priceblock_ourprice']", "//*[@id='priceblock_dealprice']"], locale="en"),
+    DomainRule("amazon.de", title=["//*[@id='productTitle']"],
+               price=["//*[@id='corePrice_feature_div']//*[contains(@class,'a-offscreen')]"], locale="de"),
+    DomainRule("ebay.com", title=["//h1[contains(@class,'x-item-title')]"],
+               price=["//*[contains(@class,'x-price-primary')]", "//*[@itemprop='price']/@content"], locale="en"),
+    DomainRule("aliexpress.com", title=["//h1[@data-pl='product-title']", "//h1"],
+               price=["//*[contains(@class,'product-price-current')]"], locale="en"),
+    DomainRule("etsy.com", title=["//h1[@data-buy-box-listing-title]", "//h1"],
+               price=["//*[@data-buy-box-region='price']//p[contains(@class,'wt-text-title')]"], locale="en"),
+] if etree is not None else []
+
+
+def load_domain_rules(path: str) -> List[DomainRule]:
+    """חוקים נוספים מקובץ JSON: [{"domain": ..., "title": [...], "price": [...], "locale": ...}]"""
+    with open(path, encoding="utf-8") as f:
+        return [DomainRule(**rule) for rule in json.load(f)]
+
+
+class RuleEngine:
+    """JSON-LD/OpenGraph קודם, ואז חוק לדומיין, ואז ה-extractor ההיוריסטי (h1 + class*=price)"""
+
+    # להעלות כשהלוגיקה או החוקים המובנים משתנים - מבטל תוצאות חילוץ שמורות ב-HttpCache
+    VERSION = 1
+
+    def __init__(self, rules: List[DomainRule], fallback: Extractor, cache: Optional[HttpCache] = None):
+        self.rules = {rule.domain.lower(): rule for rule in rules}
+        self.fallback = fallback
+        self.cache = cache
+        self.sources: Dict[str, int] = {}
+
+    def rule_for(self, url: Optional[str]) -> Optional[DomainRule]:
+        host = urlsplit(url or "").hostname or ""
+        parts = host.lower().split(".")
+        # www.shop.amazon.com -> shop.amazon.com -> amazon.com
+        for i in range(len(parts) - 1):
+            rule = self.rules.get(".".join(parts[i:]))
+            if rule is not None:
+                return rule
+        return None
+
+    def extract(self, content: bytes, url: Optional[str] = None,
+                encoding: Optional[str] = None) -> ProductFields:
+        if not content or not content.strip():
+            return ProductFields()
+        encoding = encoding or Extractor.sniff_encoding(content)
+        fields = structured_fields(content, encoding)
+
+        rule = self.rule_for(url)
+        root = None
+        if (fields.title is None or fields.price is None) and rule is not None:
+            # עץ מלא רק לדומיין עם חוק - ה-XPath-ים מקומפלים מראש
+            root = lxml_html.fromstring(content, parser=lxml_html.HTMLParser(encoding=encoding))
+            title, price_text = rule.apply(root)
+            fields.title = fields.title or title
+            if fields.price is None and price_text:
+                parsed = parse_price(price_text, locale=rule.locale)
+                if parsed:
+                    fields.price, fields.currency = parsed
+                    fields.price_text = price_text
+                    fields.source = f"rule:{rule.domain}"
+
+        if fields.title is None or fields.price is None:
+            # אם כבר נבנה עץ - ההיוריסטיקה רצה עליו, אחרת ה-extractor הזורם (early exit)
+            guess = LxmlExtractor.from_tree(root) if root is not None else self.fallback.extract(content, encoding)
+            fields.title = fields.title or guess.title
+            if fields.price is None and guess.price_text:
+                parsed = parse_price(guess.price_text, locale=rule.locale if rule else None)
+                if parsed:
+                    fields.price, fields.currency = parsed
+                    fields.price_text = guess.price_text
+                    fields.source = "heuristic"
+
+        key = fields.source or "none"
+        self.sources[key] = self.sources.get(key, 0) + 1
+        return fields
+
+    async def extract_response(self, res) -> ProductFields:
+        """כמו extract על ScrapeResult, עם מטמון לפי hash התוכן - דף שלא השתנה לא מפורסר שוב"""
+        # הפרסור (lxml/BeautifulSoup + regex) הוא עבודת CPU - ב-thread, כדי שה-event loop
+        # ימשיך להוריד דפים, להגיש SSE/health ולחדש את ה-lease בזמן import גדול
+        if self.cache is None or res.content_hash is None:
+            return await asyncio.to_thread(self.extract, res.content, res.final_url, res.encoding)
+        # התוצאה תלויה בגוף, בחוק הדומיין ובקידוד - כולם חלק מהמפתח
+        rule = self.rule_for(res.final_url)
+        key = f"v{self.VERSION}:{rule.domain if rule else '*'}:{res.encoding or ''}"
+        payload = await self.cache.get_extraction(res.content_hash, key)
+        if payload is not None:
+            return ProductFields(**payload)
+        fields = await asyncio.to_thread(self.extract, res.content, res.final_url, res.encoding)
+        await self.cache.put_extraction(res.content_hash, key, asdict(fields))
+        return fields
+
+
+_rules = list(DEFAULT_DOMAIN_RULES)
+if os.getenv("EMPIRE_EXTRACTION_RULES"):
+    _rules += load_domain_rules(os.environ["EMPIRE_EXTRACTION_RULES"])
+
+# מופע משותף לכל מסלולי הסריקה
+page_extractor = RuleEngine(_rules, fallback=heuristic_extractor, cache=http_cache)
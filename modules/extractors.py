@@ -0,0 +1,178 @@
+import os
+import re
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Type
+
+from modules.lazy import lazy_import
+
+# הפרסרים נטענים בחילוץ הראשון, לא ב-import של השרת
+bs4 = lazy_import("bs4")
+# lxml אופציונלי - נופלים ל-BeautifulSoup
+etree = lazy_import("lxml.etree", optional=True)
+lxml_html = lazy_import("lxml.html", optional=True)
+selectolax_parser = lazy_import("selectolax.parser", optional=True)
+
+logger = logging.getLogger("EmpireOS.Extractors")
+
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+@dataclass
+class ProductFields:
+    title: Optional[str] = None
+    price_text: Optional[str] = None
+    price: Optional[float] = None       # מחיר מפורסר (modules/extraction_rules.py)
+    currency: Optional[str] = None
+    source: Optional[str] = None        # json-ld / metadata / rule:<domain> / heuristic
+
+
+# =================================================================
+# PLUGGABLE PRODUCT PAGE EXTRACTORS
+# =================================================================
+# כל ה-backends מחזירים את אותה תוצאה: ה-<h1> הראשון, והאלמנט הראשון
+# (לפי סדר המסמך) שה-class או ה-id שלו מכילים "price"
+class Extractor:
+    """ממשק בסיס - extract(content, encoding) -> ProductFields"""
+
+    name = "base"
+
+    def extract(self, content: bytes, encoding: Optional[str] = None) -> ProductFields:
+        if not content or not content.strip():
+            return ProductFields()
+        return self._extract(content, encoding or self.sniff_encoding(content))
+
+    @staticmethod
+    def sniff_encoding(content: bytes) -> str:
+        """charset מה-<meta> בתחילת הדף, אחרת UTF-8 (libxml2 מניח latin-1 בלי רמז)"""
+        match = META_CHARSET.search(content[:4096])
+        return match.group(1).decode("ascii") if match else "utf-8"
+
+    def _extract(self, content: bytes, encoding: Optional[str]) -> ProductFields:
+        raise NotImplementedError
+
+    @staticmethod
+    def _clean(text: Optional[str]) -> Optional[str]:
+        if text is None:
+            return None
+        return text.strip()
+
+
+class SoupExtractor(Extractor):
+    """BeautifulSoup + html.parser - ההתנהגות המקורית, הכי איטי"""
+
+    name = "soup"
+
+    def _extract(self, content, encoding):
+        soup = bs4.BeautifulSoup(content, 'html.parser', from_encoding=encoding)
+        h1 = soup.find('h1')
+        price = soup.select_one('[class*="price"], [id*="price"]')
+        return ProductFields(self._clean(h1.text) if h1 else None, self._clean(price.text) if price else None)
+
+
+class LxmlExtractor(Extractor):
+    """עץ lxml מלא + XPath (libxml2 ב-C)"""
+
+    name = "lxml"
+    PRICE_XPATH = "(//*[contains(@class, 'price') or contains(@id, 'price')])[1]"
+
+    def _extract(self, content, encoding):
+        parser = lxml_html.HTMLParser(encoding=encoding)
+        return self.from_tree(lxml_html.fromstring(content, parser=parser))
+
+    @classmethod
+    def from_tree(cls, root) -> ProductFields:
+        h1 = root.xpath("(//h1)[1]")
+        price = root.xpath(cls.PRICE_XPATH)
+        return ProductFields(cls._clean(h1[0].text_content()) if h1 else None,
+                             cls._clean(price[0].text_content()) if price else None)
+
+
+class SelectolaxExtractor(Extractor):
+    """selectolax (Modest/Lexbor) - CSS selectors על parser מהיר במיוחד"""
+
+    name = "selectolax"
+
+    def _extract(self, content, encoding):
+        tree = selectolax_parser.HTMLParser(content.decode(encoding or "utf-8", errors="replace"))
+        h1 = tree.css_first('h1')
+        price = tree.css_first('[class*="price"], [id*="price"]')
+        return ProductFields(self._clean(h1.text()) if h1 else None, self._clean(price.text()) if price else None)
+
+
+class _StreamState:
+    def __init__(self):
+        self.fields = ProductFields()
+        self.h1 = None
+        self.price = None
+
+
+class StreamingExtractor(Extractor):
+    """lxml HTMLPullParser בחלקים - עוצר ברגע שנמצאו גם הכותרת וגם המחיר, בלי לפרסר את שאר הדף"""
+
+    name = "stream"
+
+    def __init__(self, chunk_size: int = 16 * 1024):
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def _is_price(element) -> bool:
+        return "price" in (element.get("class") or "") or "price" in (element.get("id") or "")
+
+    def _extract(self, content, encoding):
+        parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+        state = _StreamState()
+        for offset in range(0, len(content), self.chunk_size):
+            parser.feed(content[offset:offset + self.chunk_size])
+            if self._consume(parser, state):
+                return state.fields
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            return state.fields
+        self._consume(parser, state)
+        return state.fields
+
+    def _consume(self, parser, state: _StreamState) -> bool:
+        # המועמדים נקבעים ב-start (סדר המסמך) והטקסט נלקח ב-end (כשתת-העץ שלם)
+        fields = state.fields
+        for event, element in parser.read_events():
+            if not isinstance(element.tag, str):
+                continue
+            if event == "start":
+                if state.h1 is None and fields.title is None and element.tag == "h1":
+                    state.h1 = element
+                if state.price is None and fields.price_text is None and self._is_price(element):
+                    state.price = element
+                continue
+            if element is state.h1:
+                fields.title, state.h1 = self._clean("".join(element.itertext())), None
+            if element is state.price:
+                fields.price_text, state.price = self._clean("".join(element.itertext())), None
+            if fields.title is not None and fields.price_text is not None:
+                return True
+        return False
+
+
+EXTRACTORS: Dict[str, Type[Extractor]] = {"soup": SoupExtractor}
+if etree is not None:
+    EXTRACTORS["lxml"] = LxmlExtractor
+    EXTRACTORS["stream"] = StreamingExtractor
+if selectolax_parser is not None:
+    EXTRACTORS["selectolax"] = SelectolaxExtractor
+
+
+def get_extractor(name: Optional[str] = None) -> Extractor:
+    """backend לפי שם (או EMPIRE_EXTRACTOR), אחרת הכי מהיר שמותקן: stream > selectolax > soup"""
+    name = name or os.getenv("EMPIRE_EXTRACTOR")
+    if name:
+        if name not in EXTRACTORS:
+            raise ValueError(f"Unknown or unavailable extractor '{name}' (available: {', '.join(EXTRACTORS)})")
+        return EXTRACTORS[name]()
+    for preferred in ("stream", "selectolax", "soup"):
+        if preferred in EXTRACTORS:
+            return EXTRACTORS[preferred]()
+
+
+# מופע משותף לכל מסלולי הסריקה
+extractor = get_extractor()
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from modules.db_pool import ConnectionPool
+
+logger = logging.getLogger("EmpireOS.HttpCache")
+
+# headers שנשמרים עם התגובה (כל השאר לא משפיעים על הניתוח)
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control")
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    final_url: str
+    status: int
+    content: bytes
+    content_hash: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    fetched_at: float = 0.0
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+    def validators(self) -> Dict[str, str]:
+        """headers לבקשה מותנית - השרת עונה 304 בלי גוף אם הדף לא השתנה"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+# =================================================================
+# CONTENT-ADDRESSED HTTP RESPONSE CACHE (SQLITE, ZLIB, LRU BY SIZE)
+# =================================================================
+class HttpCache:
+    """מטמון דפים שנסרקו: URL -> validators + hash של הגוף, הגוף דחוס פעם אחת לכל hash,
+    ותוצאת החילוץ נשמרת לפי hash התוכן (דף זהה לא מפורסר פעמיים)"""
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS http_responses (
+            url TEXT PRIMARY KEY,
+            final_url TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            headers TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_http_responses_accessed ON http_responses (accessed_at)",
+        "CREATE INDEX IF NOT EXISTS idx_http_responses_hash ON http_responses (content_hash)",
+        # size לפני ה-BLOB: קריאת הגדלים לא עוברת על דפי ה-overflow של הגוף
+        """CREATE TABLE IF NOT EXISTS http_bodies (
+            content_hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            raw_size INTEGER NOT NULL,
+            body BLOB NOT NULL
+        )""",
+        # קבצי מטמון מהסכמה הקודמת (size אחרי body): ה-LRU סורק את הגדלים מהאינדקס ולא מהטבלה
+        "CREATE INDEX IF NOT EXISTS idx_http_bodies_size ON http_bodies (content_hash, size)",
+        # סך הגופים מתוחזק ב-triggers - _store לא מריץ SUM על כל המטמון
+        """CREATE TABLE IF NOT EXISTS http_cache_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            bodies INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            raw_size INTEGER NOT NULL
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS trg_http_bodies_insert AFTER INSERT ON http_bodies
+        BEGIN
+            UPDATE http_cache_totals SET bodies = bodies + 1, size = size + NEW.size,
+                raw_size = raw_size + NEW.raw_size WHERE id = 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_http_bodies_delete AFTER DELETE ON http_bodies
+        BEGIN
+            UPDATE http_cache_totals SET bodies = bodies - 1, size = size - OLD.size,
+                raw_size = raw_size - OLD.raw_size WHERE id = 1;
+        END""",
+        # פעם אחת לכל קובץ (אחרי ה-triggers, כך שגוף שנכתב בינתיים נספר בדיוק פעם אחת)
+        """INSERT OR IGNORE INTO http_cache_totals (id, bodies, size, raw_size)
+        SELECT 1, COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM http_bodies""",
+        """CREATE TABLE IF NOT EXISTS http_extractions (
+            content_hash TEXT NOT NULL,
+            key TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            PRIMARY KEY (content_hash, key)
+        )""",
+    )
+
+    def __init__(self, db_path: str, ttl: float = 15 * 60, max_bytes: int = 256 * 1024 * 1024,
+                 compress_level: int = 6):
+        # ttl: בתוך החלון הדף מוגש מהדיסק בלי רשת. אחריו - בקשה מותנית (304 = עיגול אחד בלי גוף)
+        # max_bytes: תקרה לגופים הדחוסים, מעבר לה נמחקים ה-URL-ים שלא נקראו הכי הרבה זמן
+        self.pool = ConnectionPool(db_path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+        self.evictions = 0
+        self.extraction_hits = 0
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def _ensure_schema(self, conn):
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    for statement in self.SCHEMA:
+                        conn.execute(statement)
+                    conn.commit()
+                    self._ready = True
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        if "no-cache" in entry.headers.get("cache-control", ""):
+            return False
+        return time.time() - entry.fetched_at < self.ttl
+
+    # --- sync (רצים על thread של ה-DB) ---
+    def _lookup(self, conn, url: str) -> Optional[CachedResponse]:
+        self._ensure_schema(conn)
+        row = conn.execute(
+            "SELECT r.final_url, r.status, r.headers, r.content_hash, r.fetched_at, b.body "
+            "FROM http_responses r JOIN http_bodies b ON b.content_hash = r.content_hash WHERE r.url = ?",
+            (url,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE http_responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return CachedResponse(url=url, final_url=row["final_url"], status=row["status"],
+                              content=zlib.decompress(row["body"]), content_hash=row["content_hash"],
+                              headers=json.loads(row["headers"]), fetched_at=row["fetched_at"])
+
+    def _store(self, conn, url: str, final_url: str, status: int, headers: Dict[str, str],
+               content: bytes) -> str:
+        self._ensure_schema(conn)
+        digest = self.content_hash(content)
+        now = time.time()
+        kept = {k: v for k, v in headers.items() if k.lower() in STORED_HEADERS}
+        # אותו גוף תחת כמה URL-ים (או אחרי 200 שלא השתנה) - נדחס ונשמר פעם אחת
+        if conn.execute("SELECT 1 FROM http_bodies WHERE content_hash = ?", (digest,)).fetchone() is None:
+            body = zlib.compress(content, self.compress_level)
+            # OR IGNORE: store מקביל של אותו גוף (thread אחר / worker אחר) כבר הכניס אותו
+            conn.execute("INSERT OR IGNORE INTO http_bodies (content_hash, size, raw_size, body) VALUES (?, ?, ?, ?)",
+                         (digest, len(body), len(content), body))
+        conn.execute(
+            "INSERT OR REPLACE INTO http_responses "
+            "(url, final_url, status, headers, content_hash, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, final_url, status, json.dumps(kept), digest, now, now))
+        self._evict(conn, keep=url)
+        self.stored += 1
+        return digest
+
+    def _refresh(self, conn, url: str, headers: Dict[str, str]):
+        """304: הגוף השמור עדיין תקף - מחדשים את חלון ה-TTL ומעדכנים validators שהשתנו"""
+        self._ensure_schema(conn)
+        row = conn.execute("SELECT headers FROM http_responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return
+        kept = json.loads(row["headers"])
+        kept.update({k.lower(): v for k, v in headers.items() if k.lower() in STORED_HEADERS})
+        now = time.time()
+        conn.execute("UPDATE http_responses SET headers = ?, fetched_at = ?, accessed_at = ? WHERE url = ?",
+                     (json.dumps(kept), now, now, url))
+
+    def _evict(self, conn, keep: str):
+        overflow = conn.execute("SELECT size FROM http_cache_totals WHERE id = 1").fetchone()[0] - self.max_bytes
+        if overflow <= 0:
+            return
+        # LRU: URL-ים שלא נקראו הכי הרבה זמן. גוף משוחרר רק כשאף URL כבר לא מצביע עליו
+        refs = dict(conn.execute("SELECT content_hash, COUNT(*) FROM http_responses GROUP BY content_hash").fetchall())
+        sizes = dict(conn.execute("SELECT content_hash, size FROM http_bodies").fetchall())
+        # גופים ישנים של URL-ים שהתוכן שלהם התחלף - משוחררים קודם
+        orphans = [(digest,) for digest in sizes if digest not in refs]
+        overflow -= sum(sizes[digest] for digest, in orphans)
+        urls = []
+        rows = conn.execute("SELECT url, content_hash FROM http_responses WHERE url != ? ORDER BY accessed_at",
+                            (keep,)) if overflow > 0 else ()
+        for row in rows:
+            urls.append((row["url"],))
+            refs[row["content_hash"]] -= 1
+            if refs[row["content_hash"]] == 0:
+                orphans.append((row["content_hash"],))
+                overflow -= sizes[row["content_hash"]]
+                if overflow <= 0:
+                    break
+        conn.executemany("DELETE FROM http_responses WHERE url = ?", urls)
+        conn.executemany("DELETE FROM http_bodies WHERE content_hash = ?", orphans)
+        conn.executemany("DELETE FROM http_extractions WHERE content_hash = ?", orphans)
+        self.evictions += len(urls)
+
+    def _get_extraction(self, conn, content_hash: str, key: str) -> Optional[Dict[str, Any]]:
+        self._ensure_schema(conn)
+        row = conn.execute("SELECT payload FROM http_extractions WHERE content_hash = ? AND key = ?",
+                           (content_hash, key)).fetchone()
+        return json.loads(row["payload"]) if row is not None else None
+
+    def _put_extraction(self, conn, content_hash: str, key: str, payload: Dict[str, Any]):
+        self._ensure_schema(conn)
+        conn.execute("INSERT OR REPLACE INTO http_extractions (content_hash, key, payload) VALUES (?, ?, ?)",
+                     (content_hash, key, json.dumps(payload, ensure_ascii=False)))
+
+    # --- async API (ל-AsyncScraper ול-RuleEngine) ---
+    async def lookup(self, url: str) -> Optional[CachedResponse]:
+        return await self.pool.run_transaction(self._lookup, url)
+
+    async def store(self, url: str, final_url: str, status: int, headers: Dict[str, str], content: bytes) -> str:
+        return await self.pool.run_transaction(self._store, url, final_url, status, headers, content)
+
+    async def refresh(self, url: str, headers: Dict[str, str]):
+        await self.pool.run_transaction(self._refresh, url, headers)
+
+    async def get_extraction(self, content_hash: str, key: str) -> Optional[Dict[str, Any]]:
+        payload = await self.pool.run(self._get_extraction, content_hash, key)
+        if payload is not None:
+            self.extraction_hits += 1
+        return payload
+
+    async def put_extraction(self, content_hash: str, key: str, payload: Dict[str, Any]):
+        await self.pool.run_transaction(self._put_extraction, content_hash, key, payload)
+
+    def _stats(self, conn):
+        self._ensure_schema(conn)
+        row = conn.execute("SELECT bodies, size, raw_size FROM http_cache_totals WHERE id = 1").fetchone()
+        entries = conn.execute("SELECT COUNT(*) FROM http_responses").fetchone()[0]
+        return entries, row
+
+    async def stats(self) -> Dict[str, int]:
+        # על thread של ה-DB - /system/health נקרא ב-polling ולא חוסם את ה-event loop
+        entries, row = await self.pool.run(self._stats)
+        return {"entries": entries, "bodies": row["bodies"], "bytes": row["size"], "raw_bytes": row["raw_size"],
+                "hits": self.hits, "revalidated": self.revalidated, "misses": self.misses,
+                "stored": self.stored, "evictions": self.evictions, "extraction_hits": self.extraction_hits}
+
+    def close(self):
+        self.pool.close_all()
+        self._ready = False
+
+
+# מופע משותף - ה-scraper המשותף וה-page_extractor כותבים לאותו קובץ
+http_cache = HttpCache(os.getenv("EMPIRE_HTTP_CACHE", "http_cache.db"))
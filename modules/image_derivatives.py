@@ -0,0 +1,116 @@
+import io
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from fastapi.staticfiles import StaticFiles
+
+from modules.lazy import lazy_import
+
+# Pillow אופציונלי - בלעדיו מוגש רק המקור. נטען בתהליך הקידוד, לא בשרת
+Image = lazy_import("PIL.Image", optional=True)
+
+logger = logging.getLogger("EmpireOS.ImageDerivatives")
+
+# שם -> (צלע מקסימלית בפיקסלים, quality של WebP)
+DerivativeSpec = Dict[str, Tuple[int, int]]
+DEFAULT_DERIVATIVES: DerivativeSpec = {
+    "thumb": (160, 75),   # כרטיסים וטבלאות בדשבורד
+    "webp": (512, 82),    # תצוגה מלאה - אותו גודל כמו ה-PNG, בערך עשירית מהמשקל
+}
+
+# קבצים עם hash תוכן בשם לא משתנים לעולם - מותר לדפדפן לשמור אותם לשנה
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12,64}\.(?:png|webp|jpe?g)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def render_derivatives(source: str, output_dir: str, specs: DerivativeSpec) -> Dict[str, str]:
+    """רץ ב-process נפרד: מקטין ומקודד ל-WebP. מחזיר {שם: שם קובץ עם hash התוכן}"""
+    stem = os.path.basename(source).split(".")[0]
+    results = {}
+    with Image.open(source) as image:
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        for name, (size, quality) in specs.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, "WEBP", quality=quality, method=4)
+            data = buffer.getvalue()
+            filename = f"{stem}.{name}.{content_hash(data)}.webp"
+            path = os.path.join(output_dir, filename)
+            with open(f"{path}.part", "wb") as f:
+                f.write(data)
+            os.replace(f"{path}.part", path)
+            results[name] = filename
+    return results
+
+
+# =================================================================
+# DERIVATIVE BUILDER (PROCESS POOL - קידוד תמונה הוא CPU טהור)
+# =================================================================
+class DerivativeBuilder:
+    """thumbnail + WebP לכל תמונה שנשמרת. הקידוד רץ ב-ProcessPool כדי לא לתפוס את ה-GIL של השרת"""
+
+    def __init__(self, specs: Optional[DerivativeSpec] = None, max_workers: int = 2):
+        self.specs = specs or DEFAULT_DERIVATIVES
+        self.max_workers = max_workers
+        self.built = 0
+        self.failures = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def build(self, source: str) -> Dict[str, str]:
+        """{שם: שם קובץ} ליד המקור. כשל בקידוד לא מפיל את התמונה - פשוט בלי נגזרות"""
+        if not self.available:
+            return {}
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.executor, render_derivatives, source, os.path.dirname(source), self.specs)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Derivatives failed for {source}: {type(e).__name__}: {e}")
+            return {}
+        self.built += 1
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        return {"available": self.available, "built": self.built, "failures": self.failures}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles רגיל, ועוד Cache-Control ארוך לקבצים שיש בשמם hash תוכן"""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if HASHED_NAME.search(str(full_path)):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+# מופע משותף - pool תהליכים אחד לכל ה-pipelines
+derivative_builder = DerivativeBuilder(max_workers=int(os.getenv("EMPIRE_IMAGE_PROCESSES", 2)))
@@ -0,0 +1,424 @@
+import os
+import json
+import time
+import hashlib
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from modules.lazy import lazy_import
+from modules.db_pool import ConnectionPool
+from modules.image_derivatives import DerivativeBuilder
+
+logger = logging.getLogger("EmpireOS.ImagePipeline")
+
+# ה-SDK של OpenAI (aiohttp, requests) ו-httpx נטענים ב-start / ב-job הראשון, לא ב-import של השרת.
+# ה-SDK קורא את OPENAI_API_KEY מהסביבה כשהוא נטען
+openai = lazy_import("openai")
+httpx = lazy_import("httpx")
+
+# prompt -> URL זמני של התמונה שנוצרה
+GenerateFn = Callable[[str], Awaitable[str]]
+# (product_id, image_path ציבורי, {שם נגזרת: path ציבורי}) - עדכון ה-DB / דחיפת image-ready
+ReadyFn = Callable[[int, str, Dict[str, str]], Awaitable[Any]]
+
+
+async def dalle_image_url(prompt: str, size: str = "512x512") -> str:
+    """DALL-E דרך ה-SDK הסינכרוני - ב-thread כדי לא לחסום את ה-event loop"""
+    response = await asyncio.to_thread(openai.Image.create, prompt=prompt, n=1, size=size)
+    return response['data'][0]['url']
+
+
+def prompt_hash(prompt: str) -> str:
+    """מפתח התמונה: prompt מנורמל (רווחים / אותיות גדולות לא משנים את התמונה)"""
+    return hashlib.sha256(" ".join(prompt.lower().split()).encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class ImageJob:
+    id: int
+    product_id: int
+    prompt: str
+    prompt_hash: str
+    attempts: int = 0
+
+
+# =================================================================
+# BOUNDED IMAGE GENERATION PIPELINE (PERSISTED JOBS)
+# =================================================================
+class ImagePipeline:
+    """תור תמונות חסום עם מספר workers קבוע. כל job נשמר ב-DB לפני שהוא נכנס לתור,
+    כך שתמונות שלא הסתיימו ממשיכות אחרי ריסטארט.
+
+    התמונות נשמרות לפי hash של ה-prompt: prompt שכבר יש לו תמונה מקבל אותה מיד,
+    prompt שכבר בתור מצטרף ל-job הקיים, וכל מוצר מחזיק reference לקובץ (release במחיקה)"""
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS image_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            prompt TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            image_path TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_image_jobs_status ON image_jobs (status, next_attempt_at)",
+        # מוצר -> התמונה שלו (גם לפני שהיא נוצרה)
+        """CREATE TABLE IF NOT EXISTS image_refs (
+            product_id INTEGER PRIMARY KEY,
+            prompt_hash TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_image_refs_hash ON image_refs (prompt_hash)",
+        # קובץ אחד לכל prompt, עם מונה הפניות
+        """CREATE TABLE IF NOT EXISTS image_assets (
+            prompt_hash TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            refcount INTEGER NOT NULL,
+            variants TEXT NOT NULL DEFAULT '{}',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    )
+    # job פעיל אחד לכל prompt - בקשות מקבילות לאותו prompt מצטרפות אליו (INSERT OR IGNORE)
+    ACTIVE_JOB_INDEX = ("CREATE UNIQUE INDEX IF NOT EXISTS idx_image_jobs_active ON image_jobs (prompt_hash) "
+                        "WHERE status IN ('pending', 'running')")
+
+    def __init__(self, pool: ConnectionPool, output_dir: str, url_prefix: str,
+                 on_ready: Optional[ReadyFn] = None, generate: GenerateFn = dalle_image_url,
+                 derivatives: Optional[DerivativeBuilder] = None,
+                 filename: str = "{prompt_hash}.{content_hash}.png", workers: int = 2, queue_size: int = 32,
+                 max_attempts: int = 4, backoff: float = 5.0, max_backoff: float = 300.0,
+                 poll_interval: float = 5.0, chunk_size: int = 64 * 1024, timeout: float = 60.0,
+                 visibility_timeout: float = 600.0, autostart: bool = True):
+        # workers: מגביל קריאות DALL-E והורדות במקביל. queue_size: jobs בזיכרון - השאר מחכים ב-DB
+        # autostart: submit מפעיל את ה-pipeline אם הוא לא רץ. False כשרק ה-worker המנהיג מריץ אותו -
+        # ב-workers האחרים submit רק כותב את ה-job ל-DB וה-feeder של המנהיג אוסף אותו
+        # max_attempts: ניסיונות (generate + download) לפני status='failed'. backoff אקספוננציאלי + jitter
+        # visibility_timeout: job שנשאר running יותר מזה (worker שנפל, מנהיג קודם שהודח) חוזר ל-pending
+        self.pool = pool
+        self.output_dir = output_dir
+        self.url_prefix = url_prefix.rstrip("/")
+        self.on_ready = on_ready
+        self.generate = generate
+        self.derivatives = derivatives
+        self.filename = filename
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.visibility_timeout = visibility_timeout
+        self.autostart = autostart
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.deduplicated = 0
+        self.expired = 0
+        self._last_reap = 0.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[int] = set()
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def initialize(self):
+        """טבלאות ה-jobs/assets - לפני submit/start הראשון (ה-constructor לא נוגע ב-DB)"""
+        with self.pool.transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._upgrade(conn)
+            conn.execute(self.ACTIVE_JOB_INDEX)
+
+    @staticmethod
+    def _upgrade(conn):
+        """טבלאות מגרסאות קודמות: variants ב-image_assets, prompt_hash ב-image_jobs (לפני ה-dedup)"""
+        if "variants" not in {row["name"] for row in conn.execute("PRAGMA table_info(image_assets)")}:
+            conn.execute("ALTER TABLE image_assets ADD COLUMN variants TEXT NOT NULL DEFAULT '{}'")
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(image_jobs)")}
+        if "prompt_hash" in columns:
+            return
+        conn.execute("ALTER TABLE image_jobs ADD COLUMN prompt_hash TEXT")
+        for row in conn.execute("SELECT id, product_id, prompt FROM image_jobs").fetchall():
+            digest = prompt_hash(row["prompt"])
+            conn.execute("UPDATE image_jobs SET prompt_hash = ? WHERE id = ?", (digest, row["id"]))
+            conn.execute("INSERT OR IGNORE INTO image_refs (product_id, prompt_hash) VALUES (?, ?)",
+                         (row["product_id"], digest))
+        # כמה jobs פעילים לאותו prompt - נשאר הראשון
+        conn.execute("UPDATE image_jobs SET status = 'merged' WHERE status IN ('pending', 'running') AND id NOT IN "
+                     "(SELECT MIN(id) FROM image_jobs WHERE status IN ('pending', 'running') GROUP BY prompt_hash)")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    # --- lifecycle ---
+    def start(self):
+        if self.running:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queued = set()
+        self._wakeup = asyncio.Event()
+        self._last_reap = 0.0
+        self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        self._tasks = [asyncio.create_task(self._feeder(), name="image-feeder")]
+        self._tasks += [asyncio.create_task(self._worker(), name=f"image-worker-{i}") for i in range(self.workers)]
+        logger.info(f"Image pipeline started: {self.workers} workers, queue {self.queue_size}")
+
+    async def stop(self):
+        """עצירה - jobs באמצע חוזרים ל-pending ב-start הבא"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queue = None
+        self._queued = set()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # --- API ---
+    def _public(self, filename: str, variants: Dict[str, str]) -> Tuple[str, Dict[str, str]]:
+        return (f"{self.url_prefix}/{filename}",
+                {name: f"{self.url_prefix}/{variant}" for name, variant in variants.items()})
+
+    def _attach(self, conn, product_id: int, prompt: str, digest: str) -> Tuple[Optional[tuple], bool, List[str]]:
+        """((image_path, variants) אם כבר קיים, האם נוצר job חדש, קבצים ישנים של המוצר שנשארו בלי references)"""
+        orphaned: List[str] = []
+        previous = conn.execute("SELECT prompt_hash FROM image_refs WHERE product_id = ?", (product_id,)).fetchone()
+        conn.execute("INSERT OR REPLACE INTO image_refs (product_id, prompt_hash) VALUES (?, ?)", (product_id, digest))
+        if previous is not None and previous["prompt_hash"] != digest:
+            orphaned = self._unref(conn, previous["prompt_hash"])
+        elif previous is not None:
+            conn.execute("UPDATE image_assets SET refcount = refcount - 1 WHERE prompt_hash = ?", (digest,))
+        asset = conn.execute("SELECT filename, variants FROM image_assets WHERE prompt_hash = ?", (digest,)).fetchone()
+        if asset is not None:
+            conn.execute("UPDATE image_assets SET refcount = refcount + 1 WHERE prompt_hash = ?", (digest,))
+            return self._public(asset["filename"], json.loads(asset["variants"])), False, orphaned
+        created = conn.execute(
+            "INSERT OR IGNORE INTO image_jobs (product_id, prompt, prompt_hash, updated_at) VALUES (?, ?, ?, ?)",
+            (product_id, prompt, digest, time.time())).rowcount
+        return None, bool(created), orphaned
+
+    def _unref(self, conn, digest: str) -> List[str]:
+        """מוריד reference. מחזיר את הקבצים (מקור + נגזרות) למחיקה אם זה היה האחרון"""
+        conn.execute("UPDATE image_assets SET refcount = refcount - 1 WHERE prompt_hash = ?", (digest,))
+        row = conn.execute("SELECT filename, variants, refcount FROM image_assets WHERE prompt_hash = ?",
+                           (digest,)).fetchone()
+        if row is None or row["refcount"] > 0:
+            return []
+        conn.execute("DELETE FROM image_assets WHERE prompt_hash = ?", (digest,))
+        return [row["filename"], *json.loads(row["variants"]).values()]
+
+    def _remove_files(self, filenames: List[str]):
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(self.output_dir, filename))
+            except FileNotFoundError:
+                pass
+
+    async def submit(self, product_id: int, prompt: str) -> Optional[str]:
+        """מקשר את המוצר לתמונה של ה-prompt. אם היא כבר קיימת - on_ready מיד בלי DALL-E;
+        אחרת job חדש (או הצטרפות ל-job פעיל) ומעיר את ה-feeder. לא חוסם גם כשהתור מלא"""
+        existing, created, orphaned = await self.pool.run_transaction(
+            self._attach, product_id, prompt, prompt_hash(prompt))
+        self._remove_files(orphaned)
+        if existing is not None or not created:
+            self.deduplicated += 1
+        if existing is not None:
+            image_path, variants = existing
+            if self.on_ready is not None:
+                await self.on_ready(product_id, image_path, variants)
+            return image_path
+        if not self.running and self.autostart:
+            self.start()
+        if self.running:
+            self._wakeup.set()
+        return None
+
+    async def release(self, product_id: int):
+        """המוצר נמחק - מוריד את ה-reference שלו, ומוחק את הקובץ כשאף מוצר כבר לא משתמש בו"""
+        def _release(conn):
+            row = conn.execute("SELECT prompt_hash FROM image_refs WHERE product_id = ?", (product_id,)).fetchone()
+            if row is None:
+                return []
+            conn.execute("DELETE FROM image_refs WHERE product_id = ?", (product_id,))
+            return self._unref(conn, row["prompt_hash"])
+        self._remove_files(await self.pool.run_transaction(_release))
+
+    async def stats(self) -> Dict[str, Any]:
+        rows = await self.pool.fetch_all("SELECT status, COUNT(*) AS n FROM image_jobs GROUP BY status")
+        assets = await self.pool.fetch_one("SELECT COUNT(*) AS n, COALESCE(SUM(refcount), 0) AS refs "
+                                           "FROM image_assets")
+        return {"jobs": {row["status"]: row["n"] for row in rows},
+                "assets": assets["n"], "references": assets["refs"],
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "in_flight": self._in_flight, "completed": self.completed,
+                "failed": self.failed, "retried": self.retried, "deduplicated": self.deduplicated,
+                "expired": self.expired}
+
+    # --- feeder: DB -> תור חסום ---
+    def _claim(self, conn, limit: int) -> List[ImageJob]:
+        rows = conn.execute(
+            "SELECT id, product_id, prompt, prompt_hash, attempts FROM image_jobs "
+            "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (time.time(), limit + len(self._queued))).fetchall()
+        jobs = [ImageJob(row["id"], row["product_id"], row["prompt"], row["prompt_hash"], row["attempts"])
+                for row in rows if row["id"] not in self._queued]
+        return jobs[:limit]
+
+    def _reap(self, conn, before: float) -> int:
+        """jobs שנשארו running (worker שנפל באמצע, מנהיג קודם שהודח) חוזרים ל-pending.
+        jobs שעדיין בתור/בעבודה אצלנו לא נוגעים בהם"""
+        rows = conn.execute("SELECT id FROM image_jobs WHERE status = 'running' AND IFNULL(updated_at, 0) < ?",
+                            (before,)).fetchall()
+        expired = [(row["id"],) for row in rows if row["id"] not in self._queued]
+        conn.executemany("UPDATE image_jobs SET status = 'pending' WHERE id = ? AND status = 'running'", expired)
+        return len(expired)
+
+    async def _feeder(self):
+        # ב-start כל job שנשאר running (קריסה / ריסטארט) חוזר לתור מיד; אחר כך רק אחרי visibility_timeout
+        age = 0.0
+        while True:
+            try:
+                if time.monotonic() - self._last_reap >= self.poll_interval:
+                    self._last_reap = time.monotonic()
+                    expired = await self.pool.run_transaction(self._reap, time.time() - age)
+                    age = self.visibility_timeout
+                    if expired:
+                        self.expired += expired
+                        logger.warning(f"{expired} abandoned image jobs returned to the queue")
+                free = self.queue_size - self._queue.qsize()
+                if free > 0:
+                    for job in await self.pool.run(self._claim, free):
+                        self._queued.add(job.id)
+                        await self._queue.put(job)
+            except Exception as e:
+                # DB נעול/עסוק - מנסים שוב בסבב הבא
+                logger.error(f"Image job feed failed: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- workers ---
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self._process(job)
+            except Exception as e:
+                # שגיאת DB מחוץ ל-generate/download - ה-worker ממשיך, וה-job חוזר לתור עם backoff
+                error = f"{type(e).__name__}: {e}"
+                logger.error(f"Image job #{job.id} (product #{job.product_id}) crashed: {error}")
+                try:
+                    await self._fail(job, job.attempts + 1, error)
+                except Exception as e:
+                    # גם זה נכשל - ה-visibility timeout יחזיר אותו ל-pending
+                    logger.error(f"Could not requeue image job #{job.id}: {e}")
+            finally:
+                self._in_flight -= 1
+                self._queued.discard(job.id)
+                self._queue.task_done()
+                # מקום התפנה בתור - ה-feeder מושך את ה-job הבא מה-DB
+                self._wakeup.set()
+
+    async def _process(self, job: ImageJob):
+        attempt = job.attempts + 1
+        await self.pool.execute("UPDATE image_jobs SET status = 'running', attempts = ?, updated_at = ? WHERE id = ?",
+                                (attempt, time.time(), job.id))
+        try:
+            logger.info(f"Generating image {job.prompt_hash[:8]} for product #{job.product_id} (attempt {attempt})")
+            image_url = await self.generate(job.prompt)
+            partial = os.path.join(self.output_dir, f"{job.prompt_hash}.{job.id}.part")
+            digest = await self._download(image_url, partial)
+            # hash התוכן בשם הקובץ - מוגש עם cache ארוך (ImmutableStaticFiles) בלי סכנה לגרסה ישנה
+            filename = self.filename.format(prompt_hash=job.prompt_hash, content_hash=digest,
+                                            product_id=job.product_id, job_id=job.id)
+            os.replace(partial, os.path.join(self.output_dir, filename))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._fail(job, attempt, f"{type(e).__name__}: {e}")
+            return
+
+        variants = await self.derivatives.build(os.path.join(self.output_dir, filename)) if self.derivatives else {}
+        image_path, public_variants = self._public(filename, variants)
+
+        def _complete(conn):
+            # ה-job עבר לניסיון חדש (visibility timeout) - התוצאה שלנו לא דורסת אותו
+            if not conn.execute(
+                    "UPDATE image_jobs SET status = 'done', image_path = ?, error = NULL, updated_at = ? "
+                    "WHERE id = ? AND status IN ('pending', 'running') AND attempts <= ?",
+                    (image_path, time.time(), job.id, attempt)).rowcount:
+                return None
+            # כל המוצרים שביקשו את ה-prompt בזמן שה-job היה בתור מקבלים את אותו קובץ
+            products = [row["product_id"] for row in conn.execute(
+                "SELECT product_id FROM image_refs WHERE prompt_hash = ?", (job.prompt_hash,))]
+            if products:
+                conn.execute("INSERT OR REPLACE INTO image_assets (prompt_hash, filename, refcount, variants) "
+                             "VALUES (?, ?, ?, ?)", (job.prompt_hash, filename, len(products), json.dumps(variants)))
+            return products
+
+        products = await self.pool.run_transaction(_complete)
+        if products is None:
+            logger.warning(f"Image job #{job.id} was reclaimed by a newer attempt - result dropped")
+            self._remove_files([filename, *variants.values()])
+            return
+        self.completed += 1
+        if not products:
+            # כל המוצרים נמחקו בזמן היצירה
+            self._remove_files([filename, *variants.values()])
+            return
+        if self.on_ready is not None:
+            for product_id in products:
+                # ה-job כבר done - כשל בעדכון מוצר אחד לא עוצר את השאר
+                try:
+                    await self.on_ready(product_id, image_path, public_variants)
+                except Exception as e:
+                    logger.error(f"Image ready callback failed for product #{product_id}: {e}")
+        logger.info(f"Image {job.prompt_hash[:8]} saved as {image_path} for {len(products)} product(s)")
+
+    async def _download(self, url: str, partial: str) -> str:
+        """הורדה בחלקים ישר לקובץ זמני (התמונה לא נטענת כולה לזיכרון). מחזיר hash של התוכן.
+        ה-rename לשם הסופי אחרי ההורדה - קובץ חלקי לא נחשף לעולם"""
+        digest = hashlib.sha256()
+        try:
+            async with self._client.stream("GET", url) as response:
+                response.raise_for_status()
+                with open(partial, "wb") as f:
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        digest.update(chunk)
+                        f.write(chunk)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return digest.hexdigest()[:16]
+
+    async def _fail(self, job: ImageJob, attempt: int, error: str):
+        if attempt >= self.max_attempts:
+            self.failed += 1
+            logger.error(f"Image job #{job.id} (product #{job.product_id}) failed permanently: {error}")
+            await self.pool.execute("UPDATE image_jobs SET status = 'failed', attempts = ?, error = ?, updated_at = ? "
+                                    "WHERE id = ? AND status IN ('pending', 'running') AND attempts <= ?",
+                                    (attempt, error, time.time(), job.id, attempt))
+            return
+        self.retried += 1
+        delay = min(self.backoff * (2 ** (attempt - 1)), self.max_backoff) * random.uniform(0.5, 1.0)
+        logger.warning(f"Image job #{job.id} failed ({error}), retrying in {delay:.0f}s")
+        await self.pool.execute(
+            "UPDATE image_jobs SET status = 'pending', attempts = ?, error = ?, next_attempt_at = ?, updated_at = ? "
+            "WHERE id = ? AND status IN ('pending', 'running') AND attempts <= ?",
+            (attempt, error, time.time() + delay, time.time(), job.id, attempt))
@@ -0,0 +1,354 @@
+import json
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from modules.db_pool import ConnectionPool
+
+logger = logging.getLogger("EmpireOS.JobQueue")
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class PermanentJobError(Exception):
+    """נזרק מ-handler כשאין טעם לנסות שוב (URL בלי מחיר, קלט לא תקין) - ה-job עובר ישר ל-dead"""
+
+
+class JobFailed(Exception):
+    """ה-job הסתיים ב-dead (נדחה או שנגמרו הניסיונות)"""
+
+    def __init__(self, job_id: int, error: Optional[str], rejected: bool = False):
+        super().__init__(error or "job failed")
+        self.job_id = job_id
+        self.rejected = rejected
+
+
+class JobPending(Exception):
+    """ה-job עדיין בתור/רץ כשנגמר זמן ההמתנה - התוצאה תהיה ב-/api/jobs/{id}"""
+
+    def __init__(self, job_id: int):
+        super().__init__(f"job {job_id} is still pending")
+        self.job_id = job_id
+
+
+@dataclass
+class JobType:
+    name: str
+    handler: Handler
+    # מקסימום jobs מהסוג הזה שרצים בו-זמנית - על כל ה-workers יחד (נספר ב-DB)
+    concurrency: int = 2
+    max_attempts: int = 3
+    # זמן ריצה מקסימלי לניסיון; ה-claim פג (visibility timeout) אחרי timeout + visibility_margin
+    timeout: float = 120.0
+    backoff: float = 5.0
+    max_backoff: float = 300.0
+
+
+@dataclass
+class Job:
+    id: int
+    type: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+
+
+# =================================================================
+# DURABLE JOB QUEUE (טבלת jobs בכספת, כל worker צורך)
+# =================================================================
+class JobQueue:
+    """תור עבודות מתמיד: כל job נכתב ל-DB לפני שהוא רץ, כך שריסטארט לא מאבד כלום ופרץ של
+    בקשות לא פותח tasks בלי גבול.
+
+    כל worker של uvicorn מריץ dispatcher שתופס jobs ב-UPDATE ... RETURNING אטומי לפי עדיפות,
+    עד מגבלת המקביליות של הסוג (גלובלית, לפי ה-running ב-DB). ניסיון שנכשל חוזר לתור עם backoff
+    אקספוננציאלי, ואחרי max_attempts עובר ל-dead. job של worker שמת חוזר לתור כשה-visibility
+    timeout שלו פג. at-least-once: handler יכול לרוץ שוב אחרי קריסה באמצע"""
+
+    MANUAL = 10        # בקשה מהממשק - לפני סריקות אוטונומיות
+    BACKGROUND = 0
+
+    def __init__(self, pool: ConnectionPool, worker_id: str, types: Optional[Dict[str, JobType]] = None,
+                 poll_interval: float = 1.0, visibility_margin: float = 30.0, retention: float = 24 * 3600,
+                 reap_interval: float = 15.0):
+        # retention: כמה זמן jobs שהסתיימו (done) נשמרים לסטטיסטיקה לפני מחיקה. dead נשמרים עד retry
+        self.pool = pool
+        self.worker_id = worker_id
+        self.poll_interval = poll_interval
+        self.visibility_margin = visibility_margin
+        self.retention = retention
+        self.reap_interval = reap_interval
+        self.types: Dict[str, JobType] = types if types is not None else {}
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dead = 0
+        self.expired = 0
+        self._in_flight: Dict[str, int] = {name: 0 for name in self.types}
+        self._finished: Deque[float] = deque()
+        self._running: Set[asyncio.Task] = set()
+        self._waiters: Dict[int, Set[asyncio.Event]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_reap = 0.0
+
+    def register(self, name: str, handler: Handler, **options) -> JobType:
+        """סוג job חדש (ב-import של ה-router, כמו engine.add_service)"""
+        job_type = JobType(name, handler, **options)
+        self.types[name] = job_type
+        self._in_flight.setdefault(name, 0)
+        return job_type
+
+    # --- lifecycle ---
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._dispatcher(), name="job-dispatcher")
+        logger.info(f"Job queue started: {', '.join(f'{t.name} x{t.concurrency}' for t in self.types.values())}")
+
+    async def stop(self):
+        """עוצר את ה-dispatcher ואת ה-jobs שרצים, ומחזיר אותם לתור בלי לספור ניסיון"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        running, self._running = list(self._running), set()
+        for job_task in running:
+            job_task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        requeued = await self.pool.run_transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'queued', attempts = attempts - 1, worker = NULL, visible_until = NULL "
+            "WHERE status = 'running' AND worker = ?", (self.worker_id,)).rowcount)
+        if requeued:
+            logger.info(f"Returned {requeued} interrupted jobs to the queue")
+
+    # --- producer API ---
+    def _insert(self, conn, job_type: JobType, payload: str, priority: int, run_at: float,
+                dedupe_key: Optional[str]) -> int:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO jobs (type, payload, priority, max_attempts, run_at, dedupe_key, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_type.name, payload, priority, job_type.max_attempts, run_at, dedupe_key, time.time()))
+        if cursor.rowcount:
+            return cursor.lastrowid
+        # כבר יש job פעיל עם אותו dedupe_key - מצטרפים אליו
+        return conn.execute("SELECT id FROM jobs WHERE type = ? AND dedupe_key = ? AND status IN ('queued', 'running')",
+                            (job_type.name, dedupe_key)).fetchone()["id"]
+
+    async def enqueue(self, job_type: str, payload: Optional[Dict[str, Any]] = None, priority: int = BACKGROUND,
+                      delay: float = 0.0, dedupe_key: Optional[str] = None) -> int:
+        """שומר job ומחזיר את ה-id שלו. עם dedupe_key - job פעיל קיים מוחזר במקום חדש"""
+        if job_type not in self.types:
+            raise KeyError(f"Unknown job type: {job_type}")
+        job_id = await self.pool.run_transaction(self._insert, self.types[job_type], json.dumps(payload or {}),
+                                                 priority, time.time() + delay, dedupe_key)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def wait(self, job_id: int, timeout: Optional[float] = None) -> Any:
+        """מחכה לסיום ה-job (גם אם רץ ב-worker אחר). התוצאה של ה-handler, JobFailed אם dead,
+        JobPending אם נגמר ה-timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        event = asyncio.Event()
+        self._waiters.setdefault(job_id, set()).add(event)
+        delay = 0.02
+        try:
+            while True:
+                row = await self.pool.fetch_one("SELECT status, result, last_error, rejected FROM jobs WHERE id = ?",
+                                                (job_id,))
+                if row is None:
+                    raise JobFailed(job_id, "job not found")
+                if row["status"] == "done":
+                    return json.loads(row["result"]) if row["result"] is not None else None
+                if row["status"] == "dead":
+                    raise JobFailed(job_id, row["last_error"], rejected=bool(row["rejected"]))
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise JobPending(job_id)
+                # סיום מקומי מעיר מיד; job שרץ ב-worker אחר נבדק ב-polling הולך וגדל
+                try:
+                    await asyncio.wait_for(event.wait(), delay if remaining is None else min(delay, remaining))
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                delay = min(delay * 2, self.poll_interval)
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    async def run(self, job_type: str, payload: Optional[Dict[str, Any]] = None, priority: int = MANUAL,
+                  dedupe_key: Optional[str] = None, wait: Optional[float] = 30.0) -> Any:
+        """enqueue + wait. wait=0 - מחזיר מיד (JobPending עם ה-id), None - מחכה עד הסוף"""
+        job_id = await self.enqueue(job_type, payload, priority=priority, dedupe_key=dedupe_key)
+        if wait is not None and wait <= 0:
+            raise JobPending(job_id)
+        return await self.wait(job_id, wait)
+
+    async def retry(self, job_id: int) -> bool:
+        """מחזיר job מה-dead-letter לתור עם מונה ניסיונות מאופס"""
+        updated = await self.pool.run_transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, rejected = 0, run_at = ?, finished_at = NULL "
+            "WHERE id = ? AND status = 'dead'", (time.time(), job_id)).rowcount)
+        if updated and self._wakeup is not None:
+            self._wakeup.set()
+        return bool(updated)
+
+    # --- dispatcher ---
+    def _claim(self, conn, job_type: JobType, free: int, now: float) -> List[Job]:
+        # ספירת ה-running והתפיסה באותה פקודה (נעילת כותב אחת) - המגבלה גלובלית לכל ה-workers
+        rows = conn.execute("""
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = :worker,
+                            started_at = :now, visible_until = :visible
+            WHERE id IN (
+                SELECT id FROM jobs WHERE status = 'queued' AND type = :type AND run_at <= :now
+                ORDER BY priority DESC, id
+                LIMIT max(0, min(:free, :limit - (SELECT COUNT(*) FROM jobs WHERE status = 'running' AND type = :type)))
+            )
+            RETURNING id, payload, attempts, max_attempts, priority
+        """, {"worker": self.worker_id, "now": now, "visible": now + job_type.timeout + self.visibility_margin,
+              "type": job_type.name, "free": free, "limit": job_type.concurrency}).fetchall()
+        rows.sort(key=lambda row: (-row["priority"], row["id"]))
+        return [Job(row["id"], job_type.name, json.loads(row["payload"]), row["attempts"], row["max_attempts"])
+                for row in rows]
+
+    def _reap(self, conn, now: float) -> int:
+        """jobs שה-claim שלהם פג (ה-worker מת באמצע) חוזרים לתור או ל-dead; done ישנים נמחקים"""
+        expired = conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END, "
+            "worker = NULL, visible_until = NULL, last_error = 'visibility timeout expired (worker lost)', "
+            "finished_at = CASE WHEN attempts >= max_attempts THEN :now END "
+            "WHERE status = 'running' AND visible_until < :now", {"now": now}).rowcount
+        conn.execute("DELETE FROM jobs WHERE status = 'done' AND finished_at < ?", (now - self.retention,))
+        return expired
+
+    async def _dispatcher(self):
+        while True:
+            try:
+                if time.monotonic() - self._last_reap >= self.reap_interval:
+                    self._last_reap = time.monotonic()
+                    expired = await self.pool.run_transaction(self._reap, time.time())
+                    if expired:
+                        self.expired += expired
+                        logger.warning(f"{expired} jobs lost their worker and were requeued")
+                for job_type in self.types.values():
+                    free = job_type.concurrency - self._in_flight[job_type.name]
+                    if free <= 0:
+                        continue
+                    for job in await self.pool.run_transaction(self._claim, job_type, free, time.time()):
+                        self._in_flight[job_type.name] += 1
+                        task = asyncio.create_task(self._execute(job_type, job), name=f"job-{job.id}")
+                        self._running.add(task)
+                        task.add_done_callback(self._running.discard)
+            except Exception as e:
+                # DB נעול/עסוק - מנסים שוב בסבב הבא
+                logger.error(f"Job dispatch failed: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- execution ---
+    async def _execute(self, job_type: JobType, job: Job):
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(job_type.handler(job.payload), timeout=job_type.timeout)
+        except asyncio.CancelledError:
+            raise
+        except PermanentJobError as e:
+            await self._fail(job, job_type, f"{type(e).__name__}: {e}", permanent=True)
+        except Exception as e:
+            error = f"timed out after {job_type.timeout:.0f}s" if isinstance(e, asyncio.TimeoutError) \
+                else f"{type(e).__name__}: {e}"
+            await self._fail(job, job_type, error, permanent=False)
+        else:
+            await self._finish(job, "UPDATE jobs SET status = 'done', result = ?, finished_at = ?, visible_until = NULL "
+                                    "WHERE id = ? AND worker = ? AND status = 'running'",
+                               (json.dumps(result), time.time(), job.id, self.worker_id))
+            self.completed += 1
+            self._finished.append(time.monotonic())
+            logger.debug(f"Job #{job.id} ({job.type}) done in {time.monotonic() - started:.2f}s")
+        finally:
+            self._in_flight[job_type.name] -= 1
+            # מקום התפנה - ה-dispatcher תופס את הבא
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _fail(self, job: Job, job_type: JobType, error: str, permanent: bool):
+        self.failed += 1
+        if not permanent and job.attempts < job.max_attempts:
+            # backoff אקספוננציאלי + jitter, כדי שכשל של שירות חיצוני לא יחזור על כל ה-jobs באותה שנייה
+            delay = min(job_type.max_backoff, job_type.backoff * 2 ** (job.attempts - 1)) * random.uniform(0.8, 1.2)
+            self.retried += 1
+            logger.warning(f"Job #{job.id} ({job.type}) attempt {job.attempts}/{job.max_attempts} failed: {error} "
+                           f"- retrying in {delay:.1f}s")
+            await self._finish(job, "UPDATE jobs SET status = 'queued', run_at = ?, last_error = ?, worker = NULL, "
+                                    "visible_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                               (time.time() + delay, error, job.id, self.worker_id))
+            return
+        self.dead += 1
+        logger.error(f"Job #{job.id} ({job.type}) moved to dead-letter after {job.attempts} attempts: {error}")
+        await self._finish(job, "UPDATE jobs SET status = 'dead', last_error = ?, rejected = ?, finished_at = ?, "
+                                "visible_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                           (error, int(permanent), time.time(), job.id, self.worker_id))
+
+    async def _finish(self, job: Job, sql: str, params: tuple):
+        # worker = אנחנו: אם ה-claim פג ו-job עבר למישהו אחר, התוצאה שלנו לא דורסת אותו
+        if not await self.pool.run_transaction(lambda conn: conn.execute(sql, params).rowcount):
+            logger.warning(f"Job #{job.id} ({job.type}) was reclaimed by another worker - result dropped")
+        for event in self._waiters.get(job.id, ()):
+            event.set()
+
+    # --- status ---
+    def jobs_per_minute(self) -> float:
+        now = time.monotonic()
+        while self._finished and now - self._finished[0] > 300:
+            self._finished.popleft()
+        return round(len(self._finished) / 5, 2)
+
+    def metrics(self) -> Dict[str, Any]:
+        """מצב ה-worker הזה בלבד (ללא DB) - ל-/system/health"""
+        return {"worker": self.worker_id, "running": self.running, "in_flight": dict(self._in_flight),
+                "jobs_per_minute": self.jobs_per_minute(), "completed": self.completed, "failed": self.failed,
+                "retried": self.retried, "dead": self.dead, "expired": self.expired}
+
+    async def stats(self) -> Dict[str, Any]:
+        """מצב התור כולו (כל ה-workers): ספירה לפי סוג/סטטוס, עומק, גיל ה-job הוותיק ותפוקה ב-5 הדקות האחרונות"""
+        def _stats(conn):
+            now = time.time()
+            counts = conn.execute("SELECT type, status, COUNT(*) AS n FROM jobs GROUP BY type, status").fetchall()
+            oldest = conn.execute("SELECT type, MIN(created_at) AS created FROM jobs WHERE status = 'queued' "
+                                  "AND run_at <= ? GROUP BY type", (now,)).fetchall()
+            recent = conn.execute(
+                "SELECT type, COUNT(*) AS n, AVG(started_at - created_at) AS wait, AVG(finished_at - started_at) AS run "
+                "FROM jobs WHERE status = 'done' AND finished_at >= ? GROUP BY type", (now - 300,)).fetchall()
+            return counts, {row["type"]: now - row["created"] for row in oldest}, recent
+
+        counts, oldest, recent = await self.pool.run(_stats)
+        types = {name: {"concurrency": t.concurrency, "max_attempts": t.max_attempts, "timeout": t.timeout,
+                        "queued": 0, "running": 0, "done": 0, "dead": 0, "oldest_queued_seconds": None,
+                        "done_per_minute": 0.0, "avg_wait_seconds": None, "avg_run_seconds": None}
+                 for name, t in self.types.items()}
+        for row in counts:
+            types.setdefault(row["type"], {})[row["status"]] = row["n"]
+        for name, age in oldest.items():
+            types.setdefault(name, {})["oldest_queued_seconds"] = round(age, 1)
+        for row in recent:
+            types.setdefault(row["type"], {}).update(
+                done_per_minute=round(row["n"] / 5, 2), avg_wait_seconds=round(row["wait"], 3),
+                avg_run_seconds=round(row["run"], 3))
+        totals = {status: sum(t.get(status, 0) for t in types.values()) for status in ("queued", "running", "done", "dead")}
+        return {"totals": totals, "types": types, "this_worker": self.metrics()}
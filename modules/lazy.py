@@ -0,0 +1,38 @@
+import sys
+import types
+import importlib
+import importlib.util
+from typing import Any, Optional
+
+
+# =================================================================
+# LAZY IMPORTS (תלויות כבדות נטענות בשימוש הראשון, לא ב-import של השרת)
+# =================================================================
+class LazyModule(types.ModuleType):
+    """placeholder למודול: ה-import האמיתי קורה בגישה הראשונה לתכונה שלו"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = name
+
+    def _load(self) -> types.ModuleType:
+        module = importlib.import_module(self.__dict__["_lazy_target"])
+        # גישות הבאות לא עוברות שוב דרך __getattr__
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        loaded = self.__dict__["_lazy_target"] in sys.modules
+        return f"<lazy module '{self.__dict__['_lazy_target']}' ({'loaded' if loaded else 'not loaded'})>"
+
+
+def lazy_import(name: str, optional: bool = False) -> Optional[types.ModuleType]:
+    """מודול שנטען בשימוש הראשון. optional=True: None אם החבילה לא מותקנת (נבדק בלי לטעון אותה)"""
+    if name in sys.modules:
+        return sys.modules[name]
+    if optional and importlib.util.find_spec(name.partition(".")[0]) is None:
+        return None
+    return LazyModule(name)
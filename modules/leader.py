@@ -0,0 +1,167 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from modules.db_pool import ConnectionPool
+
+logger = logging.getLogger("EmpireOS.Leader")
+
+Callback = Callable[[], Any]
+
+
+def default_holder_id() -> str:
+    """מזהה ייחודי ל-worker: host:pid + סיומת אקראית (pid יכול לחזור אחרי ריסטארט)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# =================================================================
+# LEADER ELECTION (lease בטבלת leases של הכספת)
+# =================================================================
+class LeaderLease:
+    """בחירת מנהיג בין תהליכים שחולקים את אותו קובץ SQLite: מי שמחזיק ב-lease שלא פג
+    מריץ את שירותי הרקע, וכל השאר רק מגישים API.
+
+    כל worker מנסה כל renew_interval שניות UPSERT אטומי שמצליח רק אם ה-lease שלו או שפג.
+    המנהיג מאריך אותו באותה פעולה; אם המנהיג מת, ה-lease פג אחרי ttl ו-worker אחר לוקח אותו.
+    מנהיג שלא הצליח להאריך (DB נעול) מוותר בעצמו לפני שה-lease פג, כדי שלא יהיו שני מנהיגים"""
+
+    CLAIM_SQL = """
+        INSERT INTO leases (name, holder, term, expires_at, acquired_at, renewed_at)
+        VALUES (:name, :holder, 1, :expires_at, :now, :now)
+        ON CONFLICT (name) DO UPDATE SET
+            term = CASE WHEN leases.holder = excluded.holder THEN leases.term ELSE leases.term + 1 END,
+            acquired_at = CASE WHEN leases.holder = excluded.holder THEN leases.acquired_at ELSE excluded.acquired_at END,
+            holder = excluded.holder,
+            expires_at = excluded.expires_at,
+            renewed_at = excluded.renewed_at
+        WHERE leases.holder = excluded.holder OR leases.expires_at < :now
+    """
+
+    def __init__(self, pool: ConnectionPool, name: str = "background-services", holder_id: Optional[str] = None,
+                 ttl: float = 15.0, renew_interval: Optional[float] = None,
+                 on_elected: Optional[Callback] = None, on_demoted: Optional[Callback] = None):
+        # ttl: כמה זמן אחרי החידוש האחרון ה-lease נחשב בתוקף (= זמן ה-failover המקסימלי כשהמנהיג מת)
+        # renew_interval: ברירת מחדל ttl/3 - שני חידושים יכולים להיכשל לפני שהמנהיג מוותר
+        self.pool = pool
+        self.name = name
+        self.holder_id = holder_id or default_holder_id()
+        self.ttl = ttl
+        self.renew_interval = renew_interval or ttl / 3
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        self.term = 0
+        self.leader: Optional[str] = None
+        self.elections = 0
+        self.demotions = 0
+        self.renewals = 0
+        self.failures = 0
+        # monotonic של תחילת החידוש המוצלח האחרון - ה-lease בתוקף לפחות עד + ttl
+        self._renewed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    # --- SQL (על thread של ה-DB) ---
+    def _claim(self, conn, now: float) -> Tuple[Optional[str], int]:
+        conn.execute(self.CLAIM_SQL, {"name": self.name, "holder": self.holder_id,
+                                      "expires_at": now + self.ttl, "now": now})
+        row = conn.execute("SELECT holder, term FROM leases WHERE name = ?", (self.name,)).fetchone()
+        return (row["holder"], row["term"]) if row is not None else (None, 0)
+
+    def _release(self, conn) -> int:
+        # רק אם עדיין שלנו - לא מוחקים lease שכבר עבר למישהו אחר
+        return conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?",
+                            (self.name, self.holder_id)).rowcount
+
+    # --- lifecycle ---
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=f"lease-{self.name}")
+        logger.info(f"Contending for lease '{self.name}' as {self.holder_id} (ttl {self.ttl:.0f}s)")
+
+    async def stop(self):
+        """כיבוי מסודר: עוצר את השירותים ומשחרר את ה-lease, כך שה-failover מיידי ולא אחרי ttl"""
+        task, self._task = self._task, None
+        if task is not None:
+            # לא cancel: חידוש שכבר רץ על thread של ה-DB היה יכול לקחת את ה-lease שוב אחרי השחרור
+            self._stopping.set()
+            await asyncio.gather(task, return_exceptions=True)
+        if self.is_leader:
+            await self._demote("shutting down")
+            try:
+                await self.pool.run_transaction(self._release)
+            except Exception as e:
+                logger.warning(f"Could not release lease '{self.name}': {e}")
+
+    # --- election loop ---
+    async def tick(self) -> bool:
+        """ניסיון אחד לקחת/להאריך את ה-lease. מחזיר האם התהליך הזה המנהיג"""
+        started = time.monotonic()
+        try:
+            holder, term = await self.pool.run_transaction(self._claim, time.time())
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Lease '{self.name}' renewal failed: {e}")
+            # בלי חידוש מוצלח, ה-lease פג אצל האחרים - מוותרים לפני כן (עם מרווח של חידוש אחד)
+            if self.is_leader and started - self._renewed_at > self.ttl - self.renew_interval:
+                await self._demote("renewal deadline missed")
+            return self.is_leader
+
+        self.leader = holder
+        if holder == self.holder_id:
+            self._renewed_at = started
+            self.renewals += 1
+            if not self.is_leader:
+                self.is_leader = True
+                self.term = term
+                self.elections += 1
+                logger.info(f"Elected leader of '{self.name}' (term {term}) - starting background services")
+                try:
+                    await self._call(self.on_elected)
+                except Exception as e:
+                    logger.error(f"Starting background services after election failed: {e}")
+        elif self.is_leader:
+            await self._demote(f"lease taken over by {holder}")
+        return self.is_leader
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            await self.tick()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.renew_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _demote(self, reason: str):
+        self.is_leader = False
+        self.demotions += 1
+        logger.warning(f"Stepping down as leader of '{self.name}': {reason}")
+        try:
+            await self._call(self.on_demoted)
+        except Exception as e:
+            logger.error(f"Stopping background services after demotion failed: {e}")
+
+    @staticmethod
+    async def _call(callback: Optional[Callback]):
+        if callback is None:
+            return
+        result = callback()
+        if inspect.isawaitable(result):
+            await result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "holder_id": self.holder_id, "is_leader": self.is_leader,
+                "leader": self.leader, "term": self.term, "ttl": self.ttl,
+                "elections": self.elections, "demotions": self.demotions,
+                "renewals": self.renewals, "failures": self.failures}
@@ -1,44 +1,25 @@
-import os
-import sqlite3
 import random
-import uvicorn
-import openai
-import requests
-from bs4 import BeautifulSoup
-from fastapi import FastAPI, Request, Query
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from pytrends.request import TrendReq
-from dotenv import load_dotenv
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Request, Response, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from modules.engine import engine
+from modules.job_queue import PermanentJobError
+from modules.pagination import KeysetPage
+from modules.scraper import scraper
+from modules.extraction_rules import page_extractor
+from modules.bulk_import import BulkImport, parse_url_list
+from modules.economics import PricingRules
 
 # --- הגדרות מערכת ---
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# נתיבי ה-scout תחת /scout, על הכספת המשותפת של modules.engine
+router = APIRouter(prefix="/scout", tags=["scout"])
 
-app = FastAPI(title="EmpireOS - All-in-One Command Center")
-app.mount("/static", StaticFiles(directory="dashboard"), name="static")
-templates = Jinja2Templates(directory="dashboard")
-
-DB_PATH = 'empire_data.db'
 SHIPPING_COST = 5.50
 ADS_COST_ESTIMATE = 10.0
 TARGET_MARGIN = 0.30 
-
-# --- בסיס נתונים ---
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS products
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                  title TEXT, cost REAL, suggested_price REAL, 
-                  profit REAL, demand_score INTEGER, competition TEXT, 
-                  url TEXT, ai_prompt TEXT, ad_copy_he TEXT,
-                  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-    conn.commit()
-    conn.close()
-
-init_db()
+PRICING = PricingRules(shipping=SHIPPING_COST, ads=ADS_COST_ESTIMATE, margin=TARGET_MARGIN)
+ANALYSIS_WORKERS = 4
+JOB_WAIT = 30.0
 
 # --- מנוע הסריקה והבינה (The Engine) ---
 class EmpireEngine:
@@ -56,15 +37,14 @@ class EmpireEngine:
         return random.uniform(40.0, 85.0)
 
     @staticmethod
-    def analyze(niche_or_url):
-        headers = {'User-Agent': 'Mozilla/5.0'}
+    async def analyze(niche_or_url):
         if niche_or_url.startswith('http'):
             try:
-                res = requests.get(niche_or_url, headers=headers, timeout=10)
-                soup = BeautifulSoup(res.content, 'html.parser')
-                title = soup.find('h1').text.strip() if soup.find('h1') else "Analyzed Product"
-                price_tag = soup.select_one('[class*="price"]')
-                cost = float(price_tag.text.replace('$', '').replace(',', '').strip()) if price_tag else 20.0
+                res = await scraper.fetch(niche_or_url)
+                fields = await page_extractor.extract_response(res)
+                title = fields.title or "Analyzed Product"
+                if fields.price is None: return None
+                cost = fields.price
             except: return None
         else:
             title = f"Premium {niche_or_url.capitalize()} Pro"
@@ -74,61 +54,85 @@ class EmpireEngine:
         market_avg = EmpireEngine.check_competitor_price(title)
         demand_score, competition = EmpireEngine.get_market_confidence(title)
         
-        suggested = (cost + SHIPPING_COST + ADS_COST_ESTIMATE) / (1 - TARGET_MARGIN)
-        profit = suggested - cost - SHIPPING_COST - ADS_COST_ESTIMATE
+        econ = PRICING.quote(cost, demand_score)
 
         return {
-            "title": title, "cost": round(cost, 2), "suggested_price": round(suggested, 2),
-            "profit": round(profit, 2), "demand": demand_score, "competition": competition,
+            "title": title, "cost": round(cost, 2), "suggested_price": econ['suggested_price'],
+            "profit": econ['profit'], "demand": demand_score, "competition": competition,
             "market_avg": round(market_avg, 2), "url": niche_or_url if niche_or_url.startswith('http') else "N/A"
         }
 
 # --- נתיבי FastAPI ---
 
-@app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+async def analysis_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    data = await EmpireEngine.analyze(payload["niche"])
+    if not data: raise PermanentJobError("Failed to analyze niche/URL")
+
+    params = product_params(data)
+    await engine.writer.execute(PRODUCT_INSERT_SQL, params)
+
+    return {**data, "ad_copy": {"he": params[-1], "en": "Top Trending Item"}}
 
-@app.get("/inventory-page", response_class=HTMLResponse)
-async def inventory_page(request: Request):
-    return templates.TemplateResponse("inventory.html", {"request": request})
+engine.jobs.register("scout.analysis", analysis_job, concurrency=ANALYSIS_WORKERS)
 
-@app.post("/run")
-async def run_analysis(niche: str = Query(...)):
-    data = EmpireEngine.analyze(niche)
-    if not data: return JSONResponse(status_code=400, content={"status": "Error"})
+@router.post("/run")
+async def run_analysis(niche: str = Query(...), wait: bool = True):
+    data = await engine.jobs.run("scout.analysis", {"niche": niche}, wait=JOB_WAIT if wait else 0)
+    return {"status": "Success", "data": data}
 
+PRODUCT_INSERT_SQL = """INSERT INTO products (title, cost, suggested_price, profit, demand_score, competition, url, ai_prompt, ad_copy_he, source_type) 
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'SCOUT')"""
+
+def product_params(data: Dict[str, Any]) -> tuple:
     ai_prompt = f"Professional studio product photography of {data['title']}, high-end lighting"
     ad_he = f"הזדמנות עסקית: {data['title']} עם ביקוש של {data['demand']}%!"
-
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""INSERT INTO products (title, cost, suggested_price, profit, demand_score, competition, url, ai_prompt, ad_copy_he) 
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-              (data['title'], data['cost'], data['suggested_price'], data['profit'], data['demand'], data['competition'], data['url'], ai_prompt, ad_he))
-    conn.commit()
-    conn.close()
-
-    return {"status": "Success", "data": {**data, "ad_copy": {"he": ad_he, "en": "Top Trending Item"}}}
-
-@app.get("/api/inventory")
-async def get_all():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM products ORDER BY id DESC")
-    rows = [dict(row) for row in c.fetchall()]
-    conn.close()
+    return (data['title'], data['cost'], data['suggested_price'], data['profit'], data['demand'],
+            data['competition'], data['url'], ai_prompt, ad_he)
+
+async def persist_products(rows: List[Dict[str, Any]]):
+    await engine.writer.execute_group([(PRODUCT_INSERT_SQL, product_params(r)) for r in rows])
+
+@router.post("/run/bulk")
+async def run_bulk_analysis(request: Request, concurrency: int = Query(32, ge=1, le=128)):
+    """ניתוח מרוכז של רשימת URL-ים (JSON / CSV) - התקדמות חוזרת כ-NDJSON"""
+    try:
+        urls = parse_url_list(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    importer = BulkImport(EmpireEngine.analyze, persist_products, concurrency=concurrency)
+    return StreamingResponse(importer.ndjson(urls), media_type="application/x-ndjson")
+
+INVENTORY_PAGE = KeysetPage(
+    table="products",
+    columns=("id", "title", "cost", "suggested_price", "profit", "demand_score", "competition",
+             "url", "ai_prompt", "ad_copy_he", "created_at"),
+    sort_keys=("id",),
+    heavy_columns=("ai_prompt", "ad_copy_he"),
+)
+
+@router.get("/api/inventory")
+async def get_all(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(INVENTORY_PAGE.default_limit, ge=1, le=INVENTORY_PAGE.max_limit),
+    min_profit: Optional[float] = None,
+    max_profit: Optional[float] = None,
+    fields: Optional[str] = None,
+):
+    try:
+        sql, params, limit = INVENTORY_PAGE.build(fields=fields, cursor=cursor, limit=limit, filters=[
+            ("profit", ">=", min_profit),
+            ("profit", "<=", max_profit),
+        ])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rows, next_cursor = INVENTORY_PAGE.paginate(await engine.pool.fetch_all(sql, params), limit)
+    response.headers.update(INVENTORY_PAGE.link_headers(next_cursor, request.url))
     return rows
 
-@app.delete("/api/delete/{p_id}")
+@router.delete("/api/delete/{p_id}")
 async def delete_item(p_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM products WHERE id = ?", (p_id,))
-    conn.commit()
-    conn.close()
+    await engine.purge(p_id)
     return {"status": "deleted"}
-
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,321 @@
+import sqlite3
+import logging
+from typing import Callable, List, Sequence, Tuple, Union
+
+logger = logging.getLogger("EmpireOS.Migrations")
+
+# צעד במיגרציה: פקודת SQL או פונקציה שמקבלת את החיבור (למיגרציות נתונים)
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+Migration = Tuple[int, str, Sequence[Step]]
+
+# =================================================================
+# VERSIONED MIGRATION RUNNER (PRAGMA user_version)
+# =================================================================
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection, migrations: Sequence[Migration]) -> int:
+    """מריץ את כל המיגרציות שגרסתן גבוהה מ-user_version, כל אחת בטרנזקציה משלה"""
+    version = current_version(conn)
+    for target, description, steps in sorted(migrations, key=lambda m: m[0]):
+        if target <= version:
+            continue
+        # BEGIN IMMEDIATE: נעילת הכותב לפני בדיקת הגרסה - כמה workers עולים יחד על אותה כספת
+        conn.execute("BEGIN IMMEDIATE")
+        version = current_version(conn)
+        if target <= version:
+            # worker אחר כבר הריץ אותה
+            conn.rollback()
+            continue
+        logger.info(f"Migrating database v{version} -> v{target}: {description}")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration v{target} failed, database left at v{version}")
+            raise
+        version = target
+    return version
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Sequence = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN - מחזיר את שורות התוכנית (לבדיקת שימוש באינדקסים)"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def uses_full_scan(plan: Sequence[str], table: str) -> bool:
+    """True אם התוכנית סורקת את הטבלה בלי אינדקס"""
+    return any(step.strip() == f"SCAN {table}" for step in plan)
+
+
+# =================================================================
+# VAULT SCHEMA (empire_vault_v10.db - הכספת המשותפת של modules.engine)
+# =================================================================
+# מילוי מחדש של טבלת הסיכומים מתוך products (משמש גם את פקודת ה-repair)
+NICHE_STATS_REBUILD = [
+    "DELETE FROM niche_stats",
+    """
+    INSERT INTO niche_stats (niche, product_count, golden_count, profit_sum, demand_sum)
+    SELECT IFNULL(niche, ''), COUNT(*), SUM(is_golden = 1), IFNULL(SUM(profit), 0), IFNULL(SUM(demand_score), 0)
+    FROM products GROUP BY IFNULL(niche, '')
+    """,
+]
+
+VAULT_MIGRATIONS: List[Migration] = [
+    (1, "base schema", [
+        # טבלת מוצרים - המחסן המרכזי
+        '''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            niche TEXT,
+            cost REAL,
+            suggested_price REAL,
+            profit REAL,
+            demand_score INTEGER,
+            competition TEXT,
+            ad_budget REAL,
+            url TEXT,
+            ai_prompt TEXT,
+            ad_copy_he TEXT,
+            image_path TEXT,
+            is_golden INTEGER DEFAULT 0,
+            source_type TEXT,
+            trend_rating TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        # טבלת התראות (שדרוג 3)
+        '''
+        CREATE TABLE IF NOT EXISTS system_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            severity TEXT,
+            message TEXT,
+            is_read INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        # טבלת היסטוריית סריקות
+        '''
+        CREATE TABLE IF NOT EXISTS scan_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            niche TEXT,
+            results_found INTEGER,
+            status TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    (2, "secondary indexes for vault sort, filters and stats", [
+        # מיון הכספת: ORDER BY is_golden DESC, created_at DESC, id DESC (ה-rowid מובלע באינדקס)
+        "CREATE INDEX IF NOT EXISTS idx_products_golden_created ON products (is_golden, created_at)",
+        # פילטר נישה + אותו מיון, וגם GROUP BY niche כ-covering index
+        "CREATE INDEX IF NOT EXISTS idx_products_niche ON products (niche, is_golden, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_products_source_type ON products (source_type, is_golden, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_products_profit ON products (profit)",
+        "CREATE INDEX IF NOT EXISTS idx_system_alerts_created ON system_alerts (created_at)",
+    ]),
+    (3, "per-niche aggregates maintained by triggers", [
+        # niche NULL נשמר כ-'' כדי שה-PRIMARY KEY וה-UPSERT יעבדו
+        """
+        CREATE TABLE IF NOT EXISTS niche_stats (
+            niche TEXT PRIMARY KEY,
+            product_count INTEGER NOT NULL DEFAULT 0,
+            golden_count INTEGER NOT NULL DEFAULT 0,
+            profit_sum REAL NOT NULL DEFAULT 0,
+            demand_sum INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_niche_stats_insert AFTER INSERT ON products
+        BEGIN
+            INSERT INTO niche_stats (niche, product_count, golden_count, profit_sum, demand_sum)
+            VALUES (IFNULL(NEW.niche, ''), 1, NEW.is_golden = 1, IFNULL(NEW.profit, 0), IFNULL(NEW.demand_score, 0))
+            ON CONFLICT (niche) DO UPDATE SET
+                product_count = product_count + 1,
+                golden_count = golden_count + excluded.golden_count,
+                profit_sum = profit_sum + excluded.profit_sum,
+                demand_sum = demand_sum + excluded.demand_sum;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_niche_stats_delete AFTER DELETE ON products
+        BEGIN
+            UPDATE niche_stats SET
+                product_count = product_count - 1,
+                golden_count = golden_count - (OLD.is_golden = 1),
+                profit_sum = profit_sum - IFNULL(OLD.profit, 0),
+                demand_sum = demand_sum - IFNULL(OLD.demand_score, 0)
+            WHERE niche = IFNULL(OLD.niche, '');
+            DELETE FROM niche_stats WHERE niche = IFNULL(OLD.niche, '') AND product_count <= 0;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_niche_stats_update
+        AFTER UPDATE OF niche, is_golden, profit, demand_score ON products
+        BEGIN
+            UPDATE niche_stats SET
+                product_count = product_count - 1,
+                golden_count = golden_count - (OLD.is_golden = 1),
+                profit_sum = profit_sum - IFNULL(OLD.profit, 0),
+                demand_sum = demand_sum - IFNULL(OLD.demand_score, 0)
+            WHERE niche = IFNULL(OLD.niche, '');
+            INSERT INTO niche_stats (niche, product_count, golden_count, profit_sum, demand_sum)
+            VALUES (IFNULL(NEW.niche, ''), 1, NEW.is_golden = 1, IFNULL(NEW.profit, 0), IFNULL(NEW.demand_score, 0))
+            ON CONFLICT (niche) DO UPDATE SET
+                product_count = product_count + 1,
+                golden_count = golden_count + excluded.golden_count,
+                profit_sum = profit_sum + excluded.profit_sum,
+                demand_sum = demand_sum + excluded.demand_sum;
+            DELETE FROM niche_stats WHERE niche = IFNULL(OLD.niche, '') AND product_count <= 0;
+        END
+        """,
+        *NICHE_STATS_REBUILD,
+    ]),
+    (4, "cache generation counter bumped on products/system_alerts writes", [
+        # מונה יחיד שכל כתיבה מעלה - נקרא ע"י ResponseCache (עובד גם בין processes)
+        """
+        CREATE TABLE IF NOT EXISTS cache_generation (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            value INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO cache_generation (id, value) VALUES (1, 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cache_generation_products_insert AFTER INSERT ON products
+        BEGIN
+            UPDATE cache_generation SET value = value + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cache_generation_products_update AFTER UPDATE ON products
+        BEGIN
+            UPDATE cache_generation SET value = value + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cache_generation_products_delete AFTER DELETE ON products
+        BEGIN
+            UPDATE cache_generation SET value = value + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cache_generation_system_alerts_insert AFTER INSERT ON system_alerts
+        BEGIN
+            UPDATE cache_generation SET value = value + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cache_generation_system_alerts_update AFTER UPDATE ON system_alerts
+        BEGIN
+            UPDATE cache_generation SET value = value + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cache_generation_system_alerts_delete AFTER DELETE ON system_alerts
+        BEGIN
+            UPDATE cache_generation SET value = value + 1 WHERE id = 1;
+        END
+        """,
+    ]),
+    (5, "image derivative paths (thumbnail + WebP)", [
+        "ALTER TABLE products ADD COLUMN image_thumb TEXT",
+        "ALTER TABLE products ADD COLUMN image_webp TEXT",
+    ]),
+    (6, "pending actions queue for the React command center", [
+        # פעולות שממתינות לאישור המשתמש (למשל הגדלת תקציב למוצר זהב)
+        """
+        CREATE TABLE IF NOT EXISTS pending_actions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT,
+            title TEXT,
+            desc TEXT,
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_pending_actions_status ON pending_actions (status)",
+        *(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cache_generation_pending_actions_{event.lower()} AFTER {event} ON pending_actions
+        BEGIN
+            UPDATE cache_generation SET value = value + 1 WHERE id = 1;
+        END
+        """ for event in ("INSERT", "UPDATE", "DELETE")),
+    ]),
+    (7, "leases for leader election between uvicorn workers", [
+        # מחזיק אחד לכל שם; term עולה בכל החלפת מחזיק (fencing token)
+        """
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            term INTEGER NOT NULL DEFAULT 1,
+            expires_at REAL NOT NULL,
+            acquired_at REAL NOT NULL,
+            renewed_at REAL NOT NULL
+        )
+        """,
+    ]),
+    (8, "durable job queue (scans) with retries and dead-letter", [
+        # status: queued -> running -> done | dead (dead-letter: נכשל סופית / נדחה, מחכה ל-retry ידני)
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            run_at REAL NOT NULL,
+            visible_until REAL,
+            worker TEXT,
+            dedupe_key TEXT,
+            result TEXT,
+            last_error TEXT,
+            rejected INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        )
+        """,
+        # claim: ה-job הבא מכל סוג לפי עדיפות, וספירת ה-running לכל סוג (מגבלת מקביליות)
+        "CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, type, priority DESC, id)",
+        # visibility timeout שפג (worker שמת) + ניקוי done ישנים + throughput
+        "CREATE INDEX IF NOT EXISTS idx_jobs_visible ON jobs (status, visible_until)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (status, finished_at)",
+        # job פעיל אחד לכל (type, dedupe_key) - למשל נישה שכבר בתור
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (type, dedupe_key) "
+        "WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running')",
+    ]),
+    (9, "pricing overrides shared by all workers", [
+        # שורה לכל סט חוקים; NULL = ברירת המחדל מהקוד (modules.economics.load_pricing)
+        """
+        CREATE TABLE IF NOT EXISTS pricing_overrides (
+            name TEXT PRIMARY KEY,
+            shipping REAL,
+            ads REAL,
+            margin REAL,
+            updated_at REAL NOT NULL
+        )
+        """,
+    ]),
+    (10, "append-only event log tailed by every worker (SSE)", [
+        # AUTOINCREMENT: id לא חוזר גם אחרי ניקוי הישנים - הוא ה-id של SSE (Last-Event-ID)
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_events_created ON events (created_at)",
+    ]),
+]
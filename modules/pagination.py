@@ -0,0 +1,99 @@
+import json
+import base64
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# =================================================================
+# KEYSET PAGINATION + FILTERS + FIELD PROJECTION
+# =================================================================
+class KeysetPage:
+    """בונה שאילתות keyset ("WHERE (keys) < cursor") במקום SELECT * על כל הטבלה"""
+
+    FILTER_OPERATORS = ("=", ">=", "<=")
+
+    def __init__(self, table: str, columns: Sequence[str], sort_keys: Sequence[str],
+                 heavy_columns: Sequence[str] = (), default_limit: int = 50, max_limit: int = 500):
+        # sort_keys ממוינים DESC, והאחרון חייב להיות ייחודי (id) כדי שה-cursor יהיה יציב
+        self.table = table
+        self.columns = tuple(columns)
+        self.sort_keys = tuple(sort_keys)
+        self.heavy_columns = tuple(heavy_columns)
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+        self.light_columns = tuple(c for c in self.columns if c not in self.heavy_columns)
+
+    # --- projection ---
+    def select_columns(self, fields: Optional[str]) -> Tuple[str, ...]:
+        """ברירת מחדל: בלי עמודות הטקסט הכבדות. מפתחות המיון תמיד נכללים (עבור ה-cursor)"""
+        if not fields:
+            requested = self.light_columns
+        else:
+            requested = tuple(f.strip() for f in fields.split(",") if f.strip())
+            unknown = [f for f in requested if f not in self.columns]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        missing_keys = tuple(k for k in self.sort_keys if k not in requested)
+        return requested + missing_keys
+
+    # --- cursor ---
+    @staticmethod
+    def encode_cursor(values: Iterable[Any]) -> str:
+        raw = json.dumps(list(values), separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> List[Any]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError):
+            raise ValueError("Malformed cursor")
+        if not isinstance(values, list) or len(values) != len(self.sort_keys):
+            raise ValueError("Malformed cursor")
+        return values
+
+    # --- query ---
+    def build(self, fields: Optional[str] = None, cursor: Optional[str] = None,
+              limit: Optional[int] = None,
+              filters: Sequence[Tuple[str, str, Any]] = ()) -> Tuple[str, List[Any], int]:
+        """מחזיר (sql, params, limit). filters = [(column, op, value)], ערכי None מדולגים"""
+        limit = min(max(1, limit or self.default_limit), self.max_limit)
+        columns = self.select_columns(fields)
+
+        where, params = [], []
+        for column, op, value in filters:
+            if value is None:
+                continue
+            if column not in self.columns or op not in self.FILTER_OPERATORS:
+                raise ValueError(f"Unsupported filter: {column} {op}")
+            where.append(f"{column} {op} ?")
+            params.append(value)
+
+        if cursor:
+            keys = ", ".join(self.sort_keys)
+            marks = ", ".join("?" for _ in self.sort_keys)
+            where.append(f"({keys}) < ({marks})")
+            params.extend(self.decode_cursor(cursor))
+
+        sql = f"SELECT {', '.join(columns)} FROM {self.table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ", ".join(f"{k} DESC" for k in self.sort_keys)
+        # שורה אחת עודפת כדי לדעת אם יש עמוד נוסף
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+        return sql, params, limit
+
+    def paginate(self, rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """חותך את השורה העודפת ומחזיר (rows, next_cursor)"""
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, self.encode_cursor(last[k] for k in self.sort_keys)
+
+    @staticmethod
+    def link_headers(next_cursor: Optional[str], url: Any) -> Dict[str, str]:
+        """כותרות X-Next-Cursor ו-Link: rel="next" לעמוד הבא"""
+        if not next_cursor:
+            return {}
+        next_url = str(url.include_query_params(cursor=next_cursor))
+        return {"X-Next-Cursor": next_cursor, "Link": f'<{next_url}>; rel="next"'}
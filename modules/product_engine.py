@@ -1,37 +1,20 @@
-import os
-import sqlite3
 import random
-import uvicorn
-import openai
-import requests
 import logging
 import asyncio
-import sys
-import uuid
-from datetime import datetime
-from typing import List, Optional, Dict, Any, Tuple
-from bs4 import BeautifulSoup
-from fastapi import FastAPI, Request, Query, HTTPException, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from pytrends.request import TrendReq
-from dotenv import load_dotenv
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Query
+from modules.engine import engine
+from modules.job_queue import PermanentJobError
+from modules.trend_cache import trend_cache
+from modules.scraper import scraper
+from modules.extraction_rules import page_extractor
+from modules.economics import PricingRules
 
 # =================================================================
 # 1. SETUP & CONFIGURATION
 # =================================================================
-load_dotenv()
-
 class EmpireConfig:
     VERSION = "12.0.1-MASTER"
-    DB_PATH = 'empire_data.db'
-    LOG_FILE = "empire_runtime.log"
-    
-    # Filesystem
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    STATIC_DIR = os.path.join(BASE_DIR, "dashboard")
-    IMG_DIR = os.path.join(STATIC_DIR, "assets", "product_images")
     
     # Financials
     SHIPPING_COST = 5.50
@@ -39,109 +22,45 @@ class EmpireConfig:
     TARGET_MARGIN = 0.35  # רווח מטרה 35%
     GOLDEN_PROFIT_MIN = 26.0
     GOLDEN_DEMAND_MIN = 80
+    PRICING = PricingRules(shipping=SHIPPING_COST, ads=ADS_COST_ESTIMATE, margin=TARGET_MARGIN,
+                           golden_profit=GOLDEN_PROFIT_MIN, golden_demand=GOLDEN_DEMAND_MIN)
     
     # Automation
     AUTO_SCAN_HOURS = 4 
+    SCAN_WORKERS = 4
+    JOB_WAIT = 30.0
 
-# יצירת תיקיות תשתית
-for p in [EmpireConfig.STATIC_DIR, EmpireConfig.IMG_DIR]:
-    os.makedirs(p, exist_ok=True)
-
-# הגדרת לוגים מקצועית
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)s | %(message)s',
-    handlers=[logging.FileHandler(EmpireConfig.LOG_FILE), logging.StreamHandler(sys.stdout)]
-)
-logger = logging.getLogger("EmpireOS")
+logger = logging.getLogger("EmpireOS.Product")
 
-app = FastAPI(title="EmpireOS Master Controller")
-app.mount("/static", StaticFiles(directory=EmpireConfig.STATIC_DIR), name="static")
-templates = Jinja2Templates(directory=EmpireConfig.STATIC_DIR)
-
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# נתיבי מנוע המוצרים תחת /product, על הכספת המשותפת של modules.engine
+router = APIRouter(prefix="/product", tags=["product"])
 
 # =================================================================
-# 2. DATABASE LAYER (ENHANCED)
-# =================================================================
-class DatabaseManager:
-    @staticmethod
-    def get_conn():
-        conn = sqlite3.connect(EmpireConfig.DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
-
-    @classmethod
-    def init_db(cls):
-        with cls.get_conn() as conn:
-            # טבלת מוצרים משודרגת עם נתיב תמונה וסוג סריקה
-            conn.execute('''CREATE TABLE IF NOT EXISTS products
-                         (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                          title TEXT, cost REAL, suggested_price REAL, 
-                          profit REAL, demand_score INTEGER, url TEXT,
-                          ai_prompt TEXT, ad_copy_he TEXT, image_path TEXT,
-                          is_golden INTEGER DEFAULT 0, scan_type TEXT DEFAULT 'Manual',
-                          timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-            
-            # טבלת התראות (שדרוג 3)
-            conn.execute('''CREATE TABLE IF NOT EXISTS system_alerts
-                         (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                          msg TEXT, severity TEXT, is_read INTEGER DEFAULT 0,
-                          timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-            conn.commit()
-        logger.info("Database Synchronized.")
-
-DatabaseManager.init_db()
-
-# =================================================================
-# 3. AI & MARKET INTELLIGENCE (UPGRADES 2 & 3)
+# 2. AI & MARKET INTELLIGENCE (UPGRADES 2 & 3)
 # =================================================================
 class EmpireIntelligence:
     @staticmethod
     def get_trends(keyword: str) -> int:
         """ניתוח מגמות אמיתי מגוגל טרנדס"""
         try:
-            pytrends = TrendReq(hl='en-US', tz=360)
-            pytrends.build_payload([keyword], timeframe='now 7-d')
-            data = pytrends.interest_over_time()
-            return int(data[keyword].iloc[-1]) if not data.empty else random.randint(70, 90)
+            data = trend_cache.get_interest(keyword, timeframe='now 7-d')
+            return int(data[-1]) if data else random.randint(70, 90)
         except: return random.randint(60, 85)
 
     @staticmethod
     async def generate_product_image(product_id: int, prompt: str):
-        """שדרוג 2: יצירת תמונה ב-DALL-E ושמירה מקומית"""
-        if not openai.api_key: return
-        try:
-            logger.info(f"Generating AI image for product #{product_id}")
-            response = await asyncio.to_thread(
-                openai.Image.create, prompt=prompt, n=1, size="512x512"
-            )
-            img_url = response['data'][0]['url']
-            img_data = requests.get(img_url).content
-            
-            filename = f"prod_{product_id}_{uuid.uuid4().hex[:4]}.png"
-            filepath = os.path.join(EmpireConfig.IMG_DIR, filename)
-            
-            with open(filepath, 'wb') as f:
-                f.write(img_data)
-            
-            # עדכון הנתיב ב-DB
-            with DatabaseManager.get_conn() as conn:
-                conn.execute("UPDATE products SET image_path = ? WHERE id = ?", 
-                             (f"/static/assets/product_images/{filename}", product_id))
-                conn.commit()
-        except Exception as e:
-            logger.error(f"Image Gen Failed: {e}")
+        """שדרוג 2: יצירת תמונה ב-DALL-E ושמירה מקומית (דרך התור החסום)"""
+        if not engine.settings.openai_api_key: return
+        logger.info(f"Queueing AI image for product #{product_id}")
+        await engine.images.submit(product_id, prompt)
 
     @staticmethod
-    def log_system_alert(msg: str, severity: str = "INFO"):
-        """שדרוג 3: רישום התראה למרכז הבקרה"""
-        with DatabaseManager.get_conn() as conn:
-            conn.execute("INSERT INTO system_alerts (msg, severity) VALUES (?, ?)", (msg, severity))
-            conn.commit()
+    def system_alert(msg: str, severity: str = "INFO") -> tuple:
+        """שדרוג 3: התראה למרכז הבקרה - פקודה שנכתבת באותה קבוצה כמו המוצר"""
+        return ("INSERT INTO system_alerts (message, severity) VALUES (?, ?)", (msg, severity))
 
 # =================================================================
-# 4. CORE ENGINE & ORCHESTRATOR
+# 3. CORE ENGINE & ORCHESTRATOR
 # =================================================================
 class EmpireEngine:
     @staticmethod
@@ -152,48 +71,57 @@ class EmpireEngine:
         # לוגיקת סריקה (הורחבה מהקוד שלך)
         if niche_or_url.startswith('http'):
             try:
-                headers = {'User-Agent': 'Mozilla/5.0'}
-                res = requests.get(niche_or_url, headers=headers, timeout=10)
-                soup = BeautifulSoup(res.content, 'html.parser')
-                title = soup.find('h1').text.strip() if soup.find('h1') else "Scraped Asset"
-                cost = random.uniform(20.0, 45.0) # סימולציה אם לא נמצא מחיר ב-Scraping
+                res = await scraper.fetch(niche_or_url)
+                fields = await page_extractor.extract_response(res)
+                title = fields.title or "Scraped Asset"
+                if fields.price is None:
+                    logger.warning(f"No price found on {niche_or_url}")
+                    return None
+                cost = fields.price
             except: return None
         else:
             title = f"Professional {niche_or_url.title()} Kit"
             cost = random.uniform(15.0, 40.0)
 
         # חישובים פיננסיים
-        suggested = (cost + EmpireConfig.SHIPPING_COST + EmpireConfig.ADS_COST_ESTIMATE) / (1 - EmpireConfig.TARGET_MARGIN)
-        profit = suggested - cost - EmpireConfig.SHIPPING_COST - EmpireConfig.ADS_COST_ESTIMATE
-        demand = EmpireIntelligence.get_trends(niche_or_url if not niche_or_url.startswith('http') else title)
-        
-        is_gold = 1 if profit >= EmpireConfig.GOLDEN_PROFIT_MIN and demand >= EmpireConfig.GOLDEN_DEMAND_MIN else 0
+        demand = await asyncio.to_thread(EmpireIntelligence.get_trends,
+                                         niche_or_url if not niche_or_url.startswith('http') else title)
+        econ = EmpireConfig.PRICING.quote(cost, demand)
+        profit = econ['profit']
+        is_gold = econ['is_golden']
         ai_prompt = f"Commercial product shot of {title}, luxury studio lighting, high resolution 8k"
-        ad_he = f"הזדמנות עסקית: {title}! רווח פוטנציאלי של ${round(profit, 2)} ליחידה."
+        ad_he = f"הזדמנות עסקית: {title}! רווח פוטנציאלי של ${profit} ליחידה."
 
         # שמירה ל-DB
-        with DatabaseManager.get_conn() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""INSERT INTO products 
-                             (title, cost, suggested_price, profit, demand_score, url, ai_prompt, ad_copy_he, is_golden, scan_type) 
-                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                          (title, round(cost, 2), round(suggested, 2), round(profit, 2), 
-                           demand, niche_or_url if niche_or_url.startswith('http') else "N/A", 
-                           ai_prompt, ad_he, is_gold, scan_type))
-            new_id = cursor.lastrowid
-            conn.commit()
+        statements = [("""INSERT INTO products 
+                         (title, cost, suggested_price, profit, demand_score, url, ai_prompt, ad_copy_he, is_golden, source_type) 
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                      (title, round(cost, 2), econ['suggested_price'], profit, 
+                       demand, niche_or_url if niche_or_url.startswith('http') else "N/A", 
+                       ai_prompt, ad_he, is_gold, scan_type))]
+
+        # התראה אם זה מוצר זהב (שדרוג 3) - באותה טרנזקציה כמו המוצר
+        if is_gold:
+            statements.append(EmpireIntelligence.system_alert(f"🌟 מוצר זהב אותר: {title} (${profit} רווח)", "GOLDEN"))
+
+        new_id = (await engine.writer.execute_group(statements))[0]
 
         # הפעלת יצירת תמונה (שדרוג 2)
-        asyncio.create_task(EmpireIntelligence.generate_product_image(new_id, ai_prompt))
-        
-        # התראה אם זה מוצר זהב (שדרוג 3)
-        if is_gold:
-            EmpireIntelligence.log_system_alert(f"🌟 מוצר זהב אותר: {title} (${round(profit, 2)} רווח)", "GOLDEN")
+        await EmpireIntelligence.generate_product_image(new_id, ai_prompt)
         
         return new_id
 
+async def process_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    new_id = await EmpireEngine.process_niche(payload["niche"], scan_type=payload["scan_type"])
+    if new_id is None:
+        # URL בלי מחיר / סריקה שנכשלה - לא מנסים שוב
+        raise PermanentJobError("Failed to analyze niche/URL")
+    return {"id": new_id}
+
+engine.jobs.register("product.scan", process_job, concurrency=EmpireConfig.SCAN_WORKERS)
+
 # =================================================================
-# 5. AUTOMATION WORKER (שדרוג 1)
+# 4. AUTOMATION WORKER (שדרוג 1)
 # =================================================================
 async def autonomous_scanner():
     """לופ סריקה אוטונומי שרץ ברקע ללא הפסקה"""
@@ -209,5 +137,12 @@ async def autonomous_scanner():
         await asyncio.sleep(EmpireConfig.AUTO_SCAN_HOURS * 3600)
 
 # =================================================================
-# 6. API ROUTES
+# 5. API ROUTES
 # =================================================================
+
+@router.post("/process")
+async def process_request(niche: str = Query(...), scan_type: Optional[str] = "Manual", wait: bool = True):
+    """ניתוח נישה/URL דרך המנוע - job בתור (כשל ניתוח -> 400 דרך ה-handler של JobFailed)"""
+    result = await engine.jobs.run("product.scan", {"niche": niche, "scan_type": scan_type},
+                                   wait=EmpireConfig.JOB_WAIT if wait else 0)
+    return {"status": "Processed", **result}
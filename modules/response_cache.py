@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger("EmpireOS.ResponseCache")
+
+# =================================================================
+# IN-PROCESS RESPONSE CACHE (GENERATION INVALIDATION + ETAG)
+# =================================================================
+@dataclass
+class CachedResponse:
+    generation: int
+    etag: str
+    body: bytes
+    headers: Dict[str, str]
+    media_type: Optional[str]
+
+
+class ResponseCache:
+    """מטמון תשובות לפי route + query. כל כתיבה מעלה את ה-generation ופוסלת את כל הרשומות"""
+
+    def __init__(self, generation_source: Optional[Callable[[], Awaitable[int]]] = None,
+                 max_entries: int = 512):
+        # generation_source: מונה חיצוני (למשל טבלה שמתעדכנת ב-triggers). אחרת - מונה מקומי + bump()
+        self.generation_source = generation_source or self._local_generation
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def _local_generation(self) -> int:
+        return self._generation
+
+    def bump(self):
+        """פסילת המטמון אחרי כתיבה (כשאין generation_source חיצוני)"""
+        with self._lock:
+            self._generation += 1
+
+    def get(self, key: Hashable, generation: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.generation != generation:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """מגיש GET-ים מהמטמון ומחזיר 304 כש-If-None-Match תואם ל-ETag"""
+
+    SKIP_HEADERS = {"content-length", "etag", "date", "server"}
+
+    def __init__(self, app, cache: ResponseCache, paths: Iterable[str]):
+        super().__init__(app)
+        self.cache = cache
+        self.paths = frozenset(paths)
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method != "GET" or request.url.path not in self.paths:
+            return await call_next(request)
+
+        # ה-generation נקרא לפני השאילתה: תשובה חדשה מדי לכל היותר תיפסל מוקדם
+        generation = await self.cache.generation_source()
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+        entry = self.cache.get(key, generation)
+
+        if entry is None:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in self.SKIP_HEADERS}
+            # ETag לפי תוכן: גם אחרי פסילה, אם הנתונים לא השתנו הלקוח יקבל 304
+            etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            entry = CachedResponse(generation, etag, body, headers, response.media_type)
+            self.cache.put(key, entry)
+
+        validators = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if entry.etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=validators)
+        return Response(content=entry.body, headers={**entry.headers, **validators},
+                        media_type=entry.media_type)
@@ -0,0 +1,189 @@
+import time
+import heapq
+import random
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("EmpireOS.Scheduler")
+
+# =================================================================
+# CONCURRENT MULTI-NICHE SCAN SCHEDULER
+# =================================================================
+@dataclass
+class NicheState:
+    interval: float
+    next_run: float = 0.0
+    runs: int = 0
+    failures: int = 0
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    last_finished: Optional[float] = None
+
+
+def load_niche_catalog(path: str) -> List[str]:
+    """קטלוג נישות מקובץ טקסט - נישה אחת בכל שורה, '#' להערות"""
+    with open(path, encoding="utf-8") as f:
+        niches = [line.split("#", 1)[0].strip() for line in f]
+    return list(dict.fromkeys(n for n in niches if n))
+
+
+class NicheScheduler:
+    """מתזמן סריקות לכל הנישות במקביל דרך מאגר workers חסום (asyncio)"""
+
+    def __init__(self, scan_fn: Callable[[str], Awaitable[Any]], niches: Iterable[str],
+                 interval: float, intervals: Optional[Dict[str, float]] = None,
+                 workers: int = 4, queue_size: int = 16, jitter: float = 0.1,
+                 startup_spread: float = 30.0,
+                 prefetch: Optional[Callable[[List[str]], Awaitable[Any]]] = None,
+                 prefetch_batch: int = 5, prefetch_horizon: float = 120.0):
+        # jitter: סטייה יחסית אקראית מהאינטרוול, כדי שהנישות לא יפגעו ב-API באותה שנייה
+        # startup_spread: פיזור הסריקה הראשונה של כל נישה על פני X שניות מהעלייה
+        # prefetch: נקרא עם כל הנישות שהגיע זמנן יחד, לפני שהן נכנסות לתור (למשל trends ב-batch).
+        # הרשימה מרופדת בנישות הקרובות (עד prefetch_horizon שניות) לכפולה של prefetch_batch
+        self.scan_fn = scan_fn
+        self.prefetch = prefetch
+        self.prefetch_batch = prefetch_batch
+        self.prefetch_horizon = prefetch_horizon
+        self.workers = workers
+        self.jitter = jitter
+        self.startup_spread = startup_spread
+        overrides = intervals or {}
+        self.niches: Dict[str, NicheState] = {
+            niche: NicheState(interval=overrides.get(niche, interval)) for niche in niches
+        }
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self._due: List[Tuple[float, str]] = []
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight = 0
+        self._completed: Deque[float] = deque()
+        self._started_at: Optional[float] = None
+        self.total_runs = 0
+        self.total_failures = 0
+
+    # --- lifecycle ---
+    def start(self):
+        if self._tasks:
+            return
+        now = time.monotonic()
+        self._started_at = now
+        self._due = []
+        for niche, state in self.niches.items():
+            state.next_run = now + random.uniform(0, self.startup_spread)
+            self._due.append((state.next_run, niche))
+        heapq.heapify(self._due)
+        self._tasks = [asyncio.create_task(self._dispatcher(), name="scheduler-dispatch")]
+        self._tasks += [asyncio.create_task(self._worker(i), name=f"scheduler-worker-{i}")
+                        for i in range(self.workers)]
+        logger.info(f"Scheduler online: {len(self.niches)} niches, {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _reschedule(self, niche: str):
+        state = self.niches[niche]
+        spread = state.interval * self.jitter
+        state.next_run = time.monotonic() + state.interval + random.uniform(-spread, spread)
+        heapq.heappush(self._due, (state.next_run, niche))
+        self._wakeup.set()
+
+    # --- dispatcher: מעביר נישות שהגיע זמנן לתור ---
+    async def _dispatcher(self):
+        while True:
+            if not self._due:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            due_at, niche = self._due[0]
+            delay = due_at - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            now = time.monotonic()
+            due = []
+            while self._due and self._due[0][0] <= now:
+                due.append(heapq.heappop(self._due)[1])
+            if self.prefetch is not None:
+                upcoming = [n for due_at, n in heapq.nsmallest(
+                    -len(due) % self.prefetch_batch, self._due) if due_at <= now + self.prefetch_horizon]
+                try:
+                    await self.prefetch(due + upcoming)
+                except Exception as e:
+                    logger.warning(f"Prefetch failed for {len(due)} niches: {e}")
+            # backpressure: כשכל ה-workers עמוסים והתור מלא, ה-dispatcher נחסם כאן
+            # והנישות הבאות פשוט מחכות ב-heap (כל נישה נמצאת לכל היותר פעם אחת בתור)
+            for niche in due:
+                await self.queue.put(niche)
+
+    # --- workers ---
+    async def _worker(self, index: int):
+        while True:
+            niche = await self.queue.get()
+            state = self.niches[niche]
+            self._in_flight += 1
+            started = time.monotonic()
+            try:
+                await self.scan_fn(niche)
+                state.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                state.failures += 1
+                self.total_failures += 1
+                state.last_error = str(e)
+                logger.error(f"Scan failed for niche '{niche}': {e}")
+            finally:
+                finished = time.monotonic()
+                self._in_flight -= 1
+                state.runs += 1
+                state.last_duration = round(finished - started, 3)
+                state.last_finished = finished
+                self.total_runs += 1
+                self._completed.append(finished)
+                self.queue.task_done()
+            # התזמון הבא נספר מסוף הסריקה - סריקה איטית לא נערמת על עצמה
+            self._reschedule(niche)
+
+    # --- metrics ---
+    def scans_per_minute(self) -> float:
+        now = time.monotonic()
+        while self._completed and self._completed[0] < now - 60:
+            self._completed.popleft()
+        return float(len(self._completed))
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "running": bool(self._tasks),
+            "niches": len(self.niches),
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "overdue": sum(1 for due_at, _ in self._due if due_at <= now),
+            "scans_per_minute": self.scans_per_minute(),
+            "total_runs": self.total_runs,
+            "total_failures": self.total_failures,
+            "uptime_seconds": round(now - self._started_at, 1) if self._started_at else 0,
+            "per_niche": {
+                niche: {
+                    "interval": state.interval,
+                    "runs": state.runs,
+                    "failures": state.failures,
+                    "last_duration": state.last_duration,
+                    "last_error": state.last_error,
+                    "next_run_in": round(max(0.0, state.next_run - now), 1),
+                }
+                for niche, state in self.niches.items()
+            },
+        }
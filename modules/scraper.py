@@ -0,0 +1,198 @@
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Union
+from urllib.parse import urlsplit
+
+from modules.lazy import lazy_import
+from modules.http_cache import HttpCache, http_cache
+
+# נטען ב-fetch הראשון (ה-client נוצר בשימוש), לא ב-import של השרת
+httpx = lazy_import("httpx")
+
+logger = logging.getLogger("EmpireOS.Scraper")
+
+# סטטוסים זמניים שכדאי לנסות שוב (throttling / תקלות שרת)
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class ScrapeError(Exception):
+    """כשל סופי בהורדת דף (אחרי כל ה-retries)"""
+
+    def __init__(self, url: str, message: str, status: Optional[int] = None):
+        super().__init__(f"{url}: {message}")
+        self.url = url
+        self.status = status
+
+
+@dataclass
+class ScrapeResult:
+    url: str
+    final_url: str
+    status: int
+    content: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+    attempts: int = 1
+    content_hash: Optional[str] = None  # מפתח מטמון החילוץ (רק כשהתגובה נשמרה ב-HttpCache)
+    cache: str = "miss"                 # miss / hit (מהדיסק, בלי רשת) / revalidated (304)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    @property
+    def encoding(self) -> Optional[str]:
+        content_type = self.headers.get("content-type", "")
+        for part in content_type.split(";"):
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"')
+        return None
+
+
+# =================================================================
+# ASYNC SCRAPING ENGINE (HTTPX KEEP-ALIVE POOL + PER-HOST LIMITS)
+# =================================================================
+class AsyncScraper:
+    """מנוע הורדה אסינכרוני משותף - pool חיבורים אחד, הגבלה לכל host, timeouts ו-retries"""
+
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+    def __init__(self, timeout: float = 10.0, connect_timeout: float = 5.0,
+                 max_connections: int = 100, max_keepalive: int = 20, per_host: int = 4,
+                 retries: int = 3, backoff: float = 0.5, max_backoff: float = 8.0,
+                 headers: Optional[Dict[str, str]] = None, cache: Optional[HttpCache] = None):
+        # retries: ניסיונות נוספים אחרי הראשון. backoff אקספוננציאלי + jitter, או Retry-After מהשרת
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # gzip/deflate תמיד; br מתווסף אוטומטית ע"י httpx כשחבילת brotli מותקנת
+        self.headers = {"User-Agent": self.USER_AGENT, **(headers or {})}
+        self.cache = cache
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        # ה-client וה-semaphores קשורים ל-event loop - נוצרים מחדש אם הלופ התחלף (למשל ב-TestClient)
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                headers=self.headers, timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_keepalive),
+                follow_redirects=True,
+            )
+            self._loop = loop
+            self._host_limits = {}
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    def _delay(self, attempt: int, response: Optional["httpx.Response"]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        delay = min(self.backoff * (2 ** attempt), self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> ScrapeResult:
+        """GET עם retries. זורק ScrapeError על כשל סופי או סטטוס שגיאה שלא שווה ניסיון נוסף"""
+        # headers מותאמים לבקשה עוקפים את המטמון (התגובה עשויה להיות שונה)
+        cache = self.cache if headers is None else None
+        cached = await cache.lookup(url) if cache is not None else None
+        if cached is not None and cache.is_fresh(cached):
+            cache.hits += 1
+            return self._from_cache(cached, "hit", attempts=0)
+
+        client = self.client
+        request_headers = cached.validators() if cached is not None else headers
+        async with self._host_limit(url):
+            for attempt in range(self.retries + 1):
+                response = None
+                self.requests += 1
+                try:
+                    response = await client.get(url, headers=request_headers)
+                    if response.status_code == 304 and cached is not None:
+                        cache.revalidated += 1
+                        await cache.refresh(url, dict(response.headers))
+                        return self._from_cache(cached, "revalidated", attempts=attempt + 1)
+                    if response.status_code == 304:
+                        # validators של הקורא (headers=...) בלי עותק במטמון - אין גוף להחזיר
+                        error = ScrapeError(url, "HTTP 304 without a cached copy", 304)
+                        break
+                    if response.status_code < 400:
+                        result = ScrapeResult(
+                            url=url, final_url=str(response.url), status=response.status_code,
+                            content=response.content, headers=dict(response.headers),
+                            elapsed=response.elapsed.total_seconds(), attempts=attempt + 1,
+                        )
+                        if cache is not None:
+                            cache.misses += 1
+                            if "no-store" not in response.headers.get("cache-control", ""):
+                                result.content_hash = await cache.store(
+                                    url, result.final_url, result.status, result.headers, result.content)
+                        return result
+                    error = ScrapeError(url, f"HTTP {response.status_code}", response.status_code)
+                    if response.status_code not in RETRY_STATUSES:
+                        break
+                except httpx.TransportError as e:
+                    error = ScrapeError(url, f"{type(e).__name__}: {e}")
+                except httpx.HTTPError as e:
+                    # גוף gzip/brotli פגום, יותר מדי redirects - ניסיון נוסף יחזיר את אותו דף
+                    error = ScrapeError(url, f"{type(e).__name__}: {e}")
+                    break
+                if attempt < self.retries:
+                    self.retried += 1
+                    await asyncio.sleep(self._delay(attempt, response))
+        self.failures += 1
+        logger.warning(f"Scrape failed: {error}")
+        raise error
+
+    @staticmethod
+    def _from_cache(cached, state: str, attempts: int) -> ScrapeResult:
+        return ScrapeResult(url=cached.url, final_url=cached.final_url, status=cached.status,
+                            content=cached.content, headers=cached.headers, attempts=attempts,
+                            content_hash=cached.content_hash, cache=state)
+
+    async def fetch_many(self, urls: Iterable[str]) -> List[Union[ScrapeResult, ScrapeError]]:
+        """הורדה מקבילית - כל URL מחזיר תוצאה או ScrapeError במקום (לפי הסדר)"""
+        async def _one(url):
+            try:
+                return await self.fetch(url)
+            except ScrapeError as e:
+                return e
+        return await asyncio.gather(*(_one(url) for url in urls))
+
+    def stats(self) -> Dict[str, int]:
+        stats = {"requests": self.requests, "retried": self.retried, "failures": self.failures,
+                 "hosts": len(self._host_limits)}
+        if self.cache is not None:
+            stats.update(cache_hits=self.cache.hits, cache_revalidated=self.cache.revalidated)
+        return stats
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+# מופע משותף - כל המודולים חולקים את אותו pool של חיבורי keep-alive ואת מטמון הדפים
+scraper = AsyncScraper(cache=http_cache)
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from modules.db_pool import ConnectionPool
+
+logger = logging.getLogger("EmpireOS.TrendCache")
+
+# (keywords, timeframe) -> {keyword: סדרת ה-interest_over_time}
+TrendFetcher = Callable[[List[str], str], Dict[str, List[int]]]
+
+# גוגל טרנדס מקבל עד 5 מילים ב-payload אחד
+MAX_KEYWORDS_PER_PAYLOAD = 5
+
+
+class TrendLookupError(Exception):
+    """Google Trends לא זמין עבור המילה (כשל חי או כשל שמור ב-negative cache)"""
+
+
+# מתחת לשיא הזה בתוך payload משותף הסדרה מעוגלת מדי (ערכים 0-3 הם 4 מדרגות) כדי למתוח אותה ל-0-100:
+# מילה כזו נשלפת שוב בלי המילים החזקות, וגוגל מנרמל אותה מחדש ברזולוציה מלאה
+MIN_SHARED_PEAK = 25
+
+# (keywords, timeframe) -> {keyword: הסדרה כפי שגוגל החזיר, מנורמלת למילה החזקה ב-payload}
+RawQuery = Callable[[List[str], str], Dict[str, List[float]]]
+
+
+def query_google(keywords: List[str], timeframe: str) -> Dict[str, List[float]]:
+    """payload אחד של interest_over_time - רשימה ריקה למילה בלי נתונים"""
+    # pytrends מושך איתו את pandas - נטען רק בקריאה הראשונה לגוגל
+    from pytrends.request import TrendReq
+    pytrends = TrendReq(hl='en-US', tz=360)
+    pytrends.build_payload(keywords, timeframe=timeframe)
+    data = pytrends.interest_over_time()
+    return {keyword: [] if data.empty or keyword not in data else [float(v) for v in data[keyword].tolist()]
+            for keyword in keywords}
+
+
+def fetch_interest(keywords: List[str], timeframe: str, query: RawQuery = query_google) -> Dict[str, List[int]]:
+    """קריאה אחת ל-Google Trends לעד 5 מילים - כל סדרה מנורמלת לשיא 100 שלה, כמו בשאילתה של מילה בודדת"""
+    raw = query(keywords, timeframe)
+    # בתוך payload משותף הסקאלה יחסית למילה החזקה ביותר; המילים החלשות נשלפות שוב בלי החזקות
+    # (שוב יחד, עד שכל מילה קרובה לשיא ה-payload שלה או לבד), כדי שהציון לא יהיה תלוי בשכנות
+    # ב-batch וזהה, עד כדי עיגול, לשליפה בודדת
+    group = list(keywords)
+    while len(group) > 1:
+        weak = [k for k in group if raw.get(k) and max(raw[k]) < MIN_SHARED_PEAK]
+        if not weak or len(weak) == len(group):
+            break  # אין מילים חלשות, או שכולן אפס (בלי עניין בכלל)
+        raw.update(query(weak, timeframe))
+        group = weak
+    results: Dict[str, List[int]] = {}
+    for keyword in keywords:
+        column = raw.get(keyword) or []
+        peak = max(column, default=0)
+        results[keyword] = [int(round(v * 100 / peak)) for v in column] if peak > 0 else [0] * len(column)
+    return results
+
+
+class _Batch:
+    """batch פתוח של מילים שמחכות לאותה קריאת interest_over_time"""
+
+    def __init__(self, timeframe: str):
+        self.timeframe = timeframe
+        self.keywords: Dict[str, str] = {}  # מפתח מנורמל -> המילה כפי שנשאלה
+        self.futures: Dict[str, Future] = {}
+        self.full = threading.Event()
+
+
+# =================================================================
+# PERSISTENT TREND CACHE (SQLITE, TTL + LRU + NEGATIVE CACHING)
+# =================================================================
+class TrendCache:
+    """מטמון משותף לכל קוראי Google Trends - נשמר ב-SQLite ושורד ריסטארטים ו-processes"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS trend_cache (
+            keyword TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            ok INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            PRIMARY KEY (keyword, timeframe)
+        )
+    """
+    INDEX = "CREATE INDEX IF NOT EXISTS idx_trend_cache_accessed ON trend_cache (accessed_at)"
+
+    def __init__(self, db_path: str, ttl: float = 6 * 3600, negative_ttl: float = 10 * 60,
+                 max_entries: int = 5000, fetcher: TrendFetcher = fetch_interest,
+                 batch_size: int = MAX_KEYWORDS_PER_PAYLOAD, batch_window: float = 0.25):
+        # negative_ttl: כשל (throttling / שגיאת רשת) נשמר לזמן קצר כדי לא להפציץ את גוגל שוב מיד
+        # batch_window: כמה זמן החטאה ראשונה מחכה שמילים נוספות יצטרפו ל-payload שלה
+        self.pool = ConnectionPool(db_path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.fetcher = fetcher
+        self.batch_size = min(batch_size, MAX_KEYWORDS_PER_PAYLOAD)
+        self.batch_window = batch_window
+        self.upstream_requests = 0
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self._ready = False
+        self._lock = threading.Lock()
+        self._open_batches: Dict[str, _Batch] = {}
+
+    @staticmethod
+    def _normalize(keyword: str) -> str:
+        return " ".join(keyword.lower().split())
+
+    def _connection(self):
+        conn = self.pool.get_connection()
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    with self.pool.transaction() as c:
+                        c.execute(self.SCHEMA)
+                        c.execute(self.INDEX)
+                    self._ready = True
+        return conn
+
+    # --- storage ---
+    def _load(self, keyword: str, timeframe: str) -> Optional[Tuple[bool, str]]:
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT ok, payload, fetched_at FROM trend_cache WHERE keyword = ? AND timeframe = ?",
+            (keyword, timeframe)).fetchone()
+        if row is None:
+            return None
+        ttl = self.ttl if row["ok"] else self.negative_ttl
+        if time.time() - row["fetched_at"] > ttl:
+            return None
+        with self.pool.transaction() as c:
+            c.execute("UPDATE trend_cache SET accessed_at = ? WHERE keyword = ? AND timeframe = ?",
+                      (time.time(), keyword, timeframe))
+        return bool(row["ok"]), row["payload"]
+
+    def _store(self, keyword: str, timeframe: str, ok: bool, payload: str):
+        now = time.time()
+        self._connection()
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO trend_cache (keyword, timeframe, ok, payload, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (keyword, timeframe, int(ok), payload, now, now))
+            # LRU: מחיקת הרשומות שלא נקראו הכי הרבה זמן מעבר לתקרה
+            overflow = conn.execute("SELECT COUNT(*) FROM trend_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM trend_cache WHERE rowid IN "
+                    "(SELECT rowid FROM trend_cache ORDER BY accessed_at LIMIT ?)", (overflow,))
+                self.evictions += overflow
+
+    # --- batching ---
+    def _join_batch(self, key: str, keyword: str, timeframe: str) -> Tuple[Future, Optional[_Batch]]:
+        """מצרף החטאה ל-batch הפתוח. מחזיר (future, batch) - batch רק למי שפתח אותו ואחראי להריץ"""
+        with self._lock:
+            batch = self._open_batches.get(timeframe)
+            if batch is not None and key in batch.futures:
+                return batch.futures[key], None
+            owner = None
+            if batch is None:
+                batch = owner = self._open_batches[timeframe] = _Batch(timeframe)
+            future: Future = Future()
+            batch.keywords[key] = keyword
+            batch.futures[key] = future
+            if len(batch.keywords) >= self.batch_size:
+                self._open_batches.pop(timeframe, None)
+                batch.full.set()
+            return future, owner
+
+    def _run_batch(self, batch: _Batch):
+        keys = list(batch.keywords)
+        keywords = [batch.keywords[k] for k in keys]
+        self.misses += len(keys)
+        self.upstream_requests += 1
+        entries: List[Tuple[str, bool, str]] = []
+        try:
+            try:
+                results = self.fetcher(keywords, batch.timeframe)
+            except Exception as e:
+                logger.warning(f"Trends fetch failed for {keywords}: {e}")
+                error = str(e) or type(e).__name__
+                for key in keys:
+                    batch.futures[key].set_exception(TrendLookupError(error))
+                    entries.append((key, False, error))
+            else:
+                for key, keyword in zip(keys, keywords):
+                    values = results.get(keyword, [])
+                    batch.futures[key].set_result(values)
+                    entries.append((key, True, json.dumps(values)))
+        finally:
+            # קורא שמחכה ב-future.result() (בלי timeout) לא נשאר תקוע גם אם משהו למעלה נכשל
+            for future in batch.futures.values():
+                if not future.done():
+                    future.set_exception(TrendLookupError("trends batch aborted"))
+        # שמירה למטמון רק אחרי שכל הקוראים קיבלו תשובה - DB נעול/דיסק מלא לא מפיל את ה-batch
+        for key, ok, payload in entries:
+            try:
+                self._store(key, batch.timeframe, ok=ok, payload=payload)
+            except Exception as e:
+                logger.warning(f"Could not cache trends for '{key}': {e}")
+
+    def _cached(self, key: str, timeframe: str) -> Optional[List[int]]:
+        """ערך מהמטמון או None בהחטאה. זורק TrendLookupError על כשל שמור או על כשל של trend_cache.db"""
+        try:
+            cached = self._load(key, timeframe)
+        except sqlite3.Error as e:
+            # קובץ המטמון נעול/פגום: אותו כשל כמו גוגל שלא זמין, והקוראים חוזרים לציון ברירת המחדל
+            logger.warning(f"Trend cache unavailable for '{key}': {e}")
+            raise TrendLookupError(f"trend cache unavailable: {e}") from e
+        if cached is None:
+            return None
+        ok, payload = cached
+        if ok:
+            self.hits += 1
+            return json.loads(payload)
+        self.negative_hits += 1
+        raise TrendLookupError(payload)
+
+    # --- public API ---
+    def get_interest(self, keyword: str, timeframe: str = 'now 7-d') -> List[int]:
+        """סדרת העניין של המילה מהמטמון, או מגוגל בהחטאה. זורק TrendLookupError בכשל"""
+        key = self._normalize(keyword)
+        values = self._cached(key, timeframe)
+        if values is not None:
+            return values
+
+        # החטאות מקבילות (ה-workers של ה-scheduler) מצטרפות ל-payload משותף של עד 5 מילים
+        future, batch = self._join_batch(key, keyword, timeframe)
+        if batch is not None:
+            batch.full.wait(self.batch_window)
+            with self._lock:
+                if self._open_batches.get(timeframe) is batch:
+                    del self._open_batches[timeframe]
+            self._run_batch(batch)
+        return future.result()
+
+    def get_interest_many(self, keywords: Iterable[str], timeframe: str = 'now 7-d') -> Dict[str, List[int]]:
+        """שליפה מרוכזת (prefetch): ההחטאות נשלפות ב-payloads של 5. מילים שנכשלו לא מוחזרות"""
+        results: Dict[str, List[int]] = {}
+        missing: Dict[str, str] = {}
+        for keyword in keywords:
+            key = self._normalize(keyword)
+            try:
+                values = self._cached(key, timeframe)
+            except TrendLookupError:
+                continue
+            if values is None:
+                missing.setdefault(key, keyword)
+            else:
+                results[keyword] = values
+
+        pending = list(missing.items())
+        for i in range(0, len(pending), self.batch_size):
+            batch = _Batch(timeframe)
+            for key, keyword in pending[i:i + self.batch_size]:
+                batch.keywords[key] = keyword
+                batch.futures[key] = Future()
+            self._run_batch(batch)
+            for key, future in batch.futures.items():
+                if future.exception() is None:
+                    results[batch.keywords[key]] = future.result()
+        return results
+
+    async def stats(self) -> Dict[str, int]:
+        # COUNT על thread של ה-DB - /system/health נקרא ב-polling ולא חוסם את ה-event loop
+        entries = await self.pool.run(
+            lambda conn: self._connection().execute("SELECT COUNT(*) FROM trend_cache").fetchone()[0])
+        return {"entries": entries, "hits": self.hits, "misses": self.misses,
+                "negative_hits": self.negative_hits, "evictions": self.evictions,
+                "upstream_requests": self.upstream_requests}
+
+    def close(self):
+        self.pool.close_all()
+        self._ready = False
+
+
+# מופע משותף לכל המודולים (main_controller, dashboard/app.py, ads_manager, product_engine)
+trend_cache = TrendCache(os.getenv("EMPIRE_TREND_CACHE", "trend_cache.db"))
@@ -0,0 +1,198 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from modules.db_pool import ConnectionPool
+
+logger = logging.getLogger("EmpireOS.WriteBatcher")
+
+Statement = Tuple[str, Sequence[Any]]
+
+
+@dataclass
+class _WriteOp:
+    statements: List[Statement]
+    want_ids: bool
+    group: bool
+    future: "asyncio.Future[Any]"
+
+
+# =================================================================
+# GROUP COMMIT WRITER (כותב יחיד, טרנזקציה אחת לכל קבוצת כתיבות)
+# =================================================================
+class WriteBatcher:
+    """כל הכתיבות של ה-scanners עוברות דרך task כותב אחד: מה שהצטבר בתור נכתב
+    בטרנזקציה אחת (commit אחד, נעילת כותב אחת), ו-UPDATE-ים רצופים עם אותו SQL ב-executemany"""
+
+    def __init__(self, pool: ConnectionPool, max_batch: int = 512, linger: float = 0.002,
+                 queue_size: int = 4096):
+        # linger: כמה זמן הכותב מחכה לכתיבות נוספות אחרי שהתור התרוקן (group commit)
+        self.pool = pool
+        self.max_batch = max_batch
+        self.linger = linger
+        self.queue_size = queue_size
+        self.batches = 0
+        self.operations = 0
+        self.statements = 0
+        self.failures = 0
+        self.largest_batch = 0
+        self.commit_seconds = 0.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # thread אחד = חיבור אחד מה-pool שמחזיק את כל הכתיבות
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # --- lifecycle ---
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="empire-writer")
+        self._task = asyncio.create_task(self._run(), name="empire-writer")
+        logger.info("WriteBatcher started")
+
+    async def stop(self):
+        """מנקז את מה שכבר בתור ואז עוצר"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown(wait=True)
+        self._task = self._queue = self._executor = None
+
+    # --- public API ---
+    async def submit(self, sql: str, params: Sequence[Any] = (), returning_id: bool = False) -> "asyncio.Future[Any]":
+        """מכניס כתיבה לתור ומחזיר future: lastrowid אם returning_id, אחרת None. התור חסום (backpressure)"""
+        return await self._put([(sql, params)], want_ids=returning_id, group=False)
+
+    async def submit_group(self, statements: Sequence[Statement]) -> "asyncio.Future[List[int]]":
+        """כמה פקודות שחייבות להיכתב יחד (מוצר + התראה). future של lastrowid לכל פקודה"""
+        return await self._put(list(statements), want_ids=True, group=True)
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """INSERT בודד - מחכה ל-commit ומחזיר lastrowid"""
+        return await (await self.submit(sql, params, returning_id=True))
+
+    async def execute_group(self, statements: Sequence[Statement]) -> List[int]:
+        return await (await self.submit_group(statements))
+
+    async def write(self, sql: str, params: Sequence[Any] = ()):
+        """UPDATE/INSERT שלא צריך את ה-id - מצטרף ל-executemany של פקודות זהות באותה קבוצה"""
+        await (await self.submit(sql, params))
+
+    async def _put(self, statements: List[Statement], want_ids: bool, group: bool) -> "asyncio.Future[Any]":
+        if self._task is None or self._task.done():
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_WriteOp(statements, want_ids, group, future))
+        return future
+
+    # --- writer task ---
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.linger
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                results = await loop.run_in_executor(self._executor, self._commit, batch)
+            except Exception as e:
+                # ה-commit עצמו נכשל (דיסק מלא, DB נעול) - כל הקבוצה נכשלת
+                self.failures += len(batch)
+                logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+                results = [e] * len(batch)
+            for op, result in zip(batch, results):
+                if not op.future.done():
+                    if isinstance(result, Exception):
+                        op.future.set_exception(result)
+                    else:
+                        op.future.set_result(result)
+                self._queue.task_done()
+
+    def _commit(self, batch: List[_WriteOp]) -> List[Any]:
+        """רץ על ה-thread של הכותב. savepoint לכל פעולה - פקודה שנכשלת לא מפילה את שאר הקבוצה"""
+        conn = self.pool.get_connection()
+        started = time.perf_counter()
+        results: List[Any] = [None] * len(batch)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            i = 0
+            while i < len(batch):
+                op = batch[i]
+                # רצף כתיבות בודדות עם אותו SQL שלא צריכות id -> executemany אחד
+                j = i
+                if not op.want_ids and not op.group:
+                    while (j + 1 < len(batch) and not batch[j + 1].want_ids and not batch[j + 1].group
+                           and batch[j + 1].statements[0][0] == op.statements[0][0]):
+                        j += 1
+                if j > i and self._apply_many(conn, batch[i:j + 1]):
+                    i = j + 1
+                    continue
+                results[i] = self._apply(conn, op)
+                i += 1
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.commit_seconds += time.perf_counter() - started
+        self.batches += 1
+        self.operations += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.failures += sum(isinstance(r, Exception) for r in results)
+        return results
+
+    def _apply_many(self, conn, run: List[_WriteOp]) -> bool:
+        conn.execute("SAVEPOINT write_run")
+        try:
+            conn.executemany(run[0].statements[0][0], [op.statements[0][1] for op in run])
+        except Exception:
+            # אחת הפקודות ברצף נכשלה - חוזרים עליהן אחת-אחת כדי שרק היא תיכשל
+            conn.execute("ROLLBACK TO write_run")
+            conn.execute("RELEASE write_run")
+            return False
+        conn.execute("RELEASE write_run")
+        self.statements += len(run)
+        return True
+
+    def _apply(self, conn, op: _WriteOp) -> Any:
+        conn.execute("SAVEPOINT write_op")
+        try:
+            ids = [conn.execute(sql, params).lastrowid for sql, params in op.statements]
+        except Exception as e:
+            conn.execute("ROLLBACK TO write_op")
+            conn.execute("RELEASE write_op")
+            return e
+        conn.execute("RELEASE write_op")
+        self.statements += len(op.statements)
+        if op.group:
+            return ids
+        return ids[0] if op.want_ids else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches, "operations": self.operations, "statements": self.statements,
+            "failures": self.failures, "largest_batch": self.largest_batch,
+            "avg_batch": round(self.operations / self.batches, 1) if self.batches else 0.0,
+            "commit_ms_avg": round(self.commit_seconds / self.batches * 1000, 2) if self.batches else 0.0,
+        }
@@ -5,5 +5,5 @@ echo ---------------------------------------
 :: בדיקה אם הספריות מותקנות
 pip install -r requirements.txt
 :: הרצת השרת
-python main.py
+python main.py %*
 pause
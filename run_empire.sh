@@ -1,4 +1,4 @@
 #!/bin/bash
 echo "Starting EmpireOS Autonomous Server..."
 pip install -r requirements.txt
-python3 main.py
+python3 main.py "$@"